@@ -0,0 +1,47 @@
+from collections import Counter
+
+from django.contrib import admin
+from django.http import HttpResponse
+
+from .models import RequestProfile
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'url_name',
+        'path',
+        'duration_ms',
+        'samples',
+        'created',
+    )
+    list_filter = ('url_name',)
+    search_fields = ('path',)
+    exclude = ('stacks',)
+    actions = ('download_flamegraph',)
+    empty_value_display = '-пусто-'
+
+    def download_flamegraph(self, request, queryset):
+        """Сливает стеки выбранных профилей, корень стека - имя URL."""
+        merged = Counter()
+        for url_name, stacks in queryset.values_list('url_name', 'stacks'):
+            for line in stacks.splitlines():
+                stack, _, count = line.rpartition(' ')
+                merged[f'{url_name};{stack}'] += int(count)
+        response = HttpResponse(
+            '\n'.join(f'{stack} {count}' for stack, count in sorted(
+                merged.items()
+            )),
+            content_type='text/plain; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="flamegraph.collapsed.txt"'
+        )
+        return response
+
+    download_flamegraph.short_description = (
+        'Скачать стеки для flamegraph.pl / speedscope'
+    )
+
+
+admin.site.register(RequestProfile, RequestProfileAdmin)
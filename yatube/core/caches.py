@@ -0,0 +1,17 @@
+"""Общий ли кэш у процессов сервера.
+
+LocMemCache живет в памяти одного процесса: запись и удаление ключа в
+одном воркере не видны другим. Кэши, которые сбрасываются сигналами
+(сессии, пользователь, поиск по имени), корректны только с общим
+бэкендом вроде memcached.
+"""
+from django.conf import settings
+
+LOCAL_BACKENDS = frozenset({
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+})
+
+
+def is_shared(alias='default'):
+    return settings.CACHES[alias]['BACKEND'] not in LOCAL_BACKENDS
@@ -0,0 +1,70 @@
+"""Отдача файлов с поддержкой Range: докачка больших выгрузок."""
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """(начало, конец включительно) одного диапазона, None - отдать файл
+    целиком, ValueError - диапазон за пределами файла."""
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        # Несколько диапазонов и прочие единицы не поддерживаются
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N - последние N байт
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(request, path, content_type, filename=None):
+    """Файл целиком или запрошенный диапазон (206)."""
+    size = os.path.getsize(path)
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        response = FileResponse(
+            open(path, 'rb'), content_type=content_type,
+            as_attachment=filename is not None, filename=filename or '',
+        )
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(path, start, end - start + 1),
+            status=206, content_type=content_type,
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        if filename is not None:
+            response['Content-Disposition'] = (
+                f'attachment; filename="{filename}"'
+            )
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,112 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from yatube import asgi
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность WSGI и ASGI при медленном '
+        'вводе-выводе клиента и ожидании базы и кэша в представлении '
+        '(имитируются задержками на каждый запрос).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--clients', type=int, default=100)
+        parser.add_argument(
+            '--delay', type=float, default=0.05,
+            help='Задержка медленного клиента на запрос, в секундах.',
+        )
+        parser.add_argument(
+            '--backend-delay', type=float, default=0.01,
+            help='Ожидание базы и кэша в представлении на запрос, '
+                 'в секундах.',
+        )
+
+    def scope(self, path):
+        return {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'localhost')],
+        }
+
+    def slow_backend(self, run_django, delay):
+        """Django с ожиданием базы и кэша: оно идет в потоке Django и
+        держит поток и при WSGI, и при ASGI."""
+
+        def run(environ):
+            time.sleep(delay)
+            return run_django(environ)
+
+        return run
+
+    def run_wsgi(self, options):
+        """Поток воркера занят на все время медленного ввода-вывода."""
+        environ = asgi.build_environ(self.scope(options['path']), b'')
+
+        def handle(_):
+            time.sleep(options['delay'])
+            asgi.run_django(dict(environ))
+
+        with ThreadPoolExecutor(options['workers']) as pool:
+            list(pool.map(handle, range(options['requests'])))
+
+    def run_asgi(self, options):
+        """Ожидание клиента не занимает поток, Django - в пуле."""
+        scope = self.scope(options['path'])
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            pass
+
+        async def handle(limit):
+            async with limit:
+                await asyncio.sleep(options['delay'])
+                await asgi.application(scope, receive, send)
+
+        async def main():
+            limit = asyncio.Semaphore(options['clients'])
+            await asyncio.gather(
+                *(handle(limit) for _ in range(options['requests']))
+            )
+
+        asyncio.run(main())
+
+    def handle(self, *args, **options):
+        # Пул ASGI того же размера, что и число WSGI-воркеров
+        asgi.executor = ThreadPoolExecutor(options['workers'])
+        run_django = asgi.run_django
+        asgi.run_django = self.slow_backend(
+            run_django, options['backend_delay']
+        )
+        try:
+            results = []
+            for name, runner in (('WSGI', self.run_wsgi),
+                                 ('ASGI', self.run_asgi)):
+                start = time.perf_counter()
+                runner(options)
+                results.append((name, time.perf_counter() - start))
+        finally:
+            asgi.run_django = run_django
+        for name, elapsed in results:
+            self.stdout.write(
+                f'{name}: {options["requests"]} запросов за {elapsed:.2f} с, '
+                f'{options["requests"] / elapsed:.1f} запр/с'
+            )
+        if options['backend_delay']:
+            # Ожидание базы держит поток пула, и ASGI его не обгоняет
+            self.stdout.write(
+                'предел пула при ожидании базы: '
+                f'{options["workers"] / options["backend_delay"]:.1f} '
+                'запр/с'
+            )
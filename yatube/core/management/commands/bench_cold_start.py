@@ -0,0 +1,67 @@
+import statistics
+
+from django.core.management.base import BaseCommand
+
+from .import_profile import run_script
+
+# Выполняется в новом процессе: импорт wsgi.application и два запроса
+COLD_START_SCRIPT = """
+import io, json, sys, time
+
+start = time.perf_counter()
+from yatube.wsgi import application
+imported = time.perf_counter()
+
+
+def get(path):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80',
+        'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http',
+    }
+    status = []
+    body = b''.join(application(environ, lambda s, h: status.append(s)))
+    return status[0], len(body)
+
+
+status, _ = get(sys.argv[1])
+first = time.perf_counter()
+get(sys.argv[1])
+second = time.perf_counter()
+json.dump({
+    'status': status,
+    'import': imported - start,
+    'first': first - imported,
+    'second': second - first,
+}, sys.stdout)
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Холодный старт: время от импорта wsgi.application до первого '
+        'ответа index в новом процессе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/')
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        results = [
+            run_script(COLD_START_SCRIPT, options['path'])
+            for _ in range(options['runs'])
+        ]
+        self.stdout.write(
+            f'{options["path"]} -> {results[0]["status"]}, '
+            f'медиана по {len(results)} запускам:'
+        )
+        for key, label in (('import', 'импорт wsgi.application'),
+                           ('first', 'первый запрос'),
+                           ('second', 'второй запрос')):
+            median = statistics.median(result[key] for result in results)
+            self.stdout.write(f'{label:>24}: {median * 1000:7.1f} мс')
+        total = statistics.median(
+            result['import'] + result['first'] for result in results
+        )
+        self.stdout.write(f'{"до первого ответа":>24}: {total * 1000:7.1f} мс')
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from core.middleware.compression import brotli, compress_bytes
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет экономию трафика и затраты CPU на сжатие '
+        'отрисованных страниц index.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        client = Client()
+        encodings = ['gzip'] + (['br'] if brotli is not None else [])
+        url = reverse('posts:index')
+        for number in range(1, options['pages'] + 1):
+            response = client.get(url, {'page': number})
+            body = response.content
+            self.stdout.write(f'index?page={number}: {len(body)} байт')
+            for encoding in encodings:
+                start = time.perf_counter()
+                for _ in range(options['repeat']):
+                    compressed = compress_bytes(body, encoding)
+                elapsed = (time.perf_counter() - start) / options['repeat']
+                saved = 100 * (1 - len(compressed) / len(body))
+                self.stdout.write(
+                    f'  {encoding:>4}: {len(compressed)} байт, '
+                    f'экономия {saved:.1f}%, '
+                    f'{elapsed * 1000:.3f} мс на ответ'
+                )
+        if brotli is None:
+            self.stdout.write('brotli не установлен, замерен только gzip')
@@ -0,0 +1,81 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from core.query_budget import track_queries
+from posts import lookups
+from posts.models import Group, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет, сколько запросов экономит кэш posts.lookups '
+        'на страницах и лентах группы и автора.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--group', help='slug группы')
+        parser.add_argument('--user', help='username автора')
+
+    def request(self, path):
+        """Запрос к представлению без middleware: (запросов, секунд)."""
+        request = RequestFactory().get(path)
+        request.user = AnonymousUser()
+        match = resolve(path)
+        start = time.perf_counter()
+        with track_queries() as log:
+            response = match.func(request, *match.args, **match.kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return log.count, time.perf_counter() - start
+
+    def measure(self, path, requests, forget):
+        queries = seconds = 0
+        for _ in range(requests):
+            if forget is not None:
+                forget()
+            count, duration = self.request(path)
+            queries += count
+            seconds += duration
+        return queries / requests, seconds / requests
+
+    def handle(self, *args, **options):
+        slug = options['group'] or Group.objects.values_list(
+            'slug', flat=True
+        ).first()
+        username = options['user'] or Post.objects.values_list(
+            'author__username', flat=True
+        ).first()
+        if slug is None or username is None:
+            raise CommandError('Нужны хотя бы одна группа и один пост.')
+        pages = [
+            ('group', slug, reverse('posts:group_post', args=[slug])),
+            ('group', slug, reverse('posts:group_feed', args=[slug, 'rss'])),
+            ('user', username, reverse('posts:profile', args=[username])),
+            (
+                'user', username,
+                reverse('posts:profile_feed', args=[username, 'rss']),
+            ),
+        ]
+        requests = options['requests']
+        for kind, name, path in pages:
+            # Первый запрос прогревает кэши лент и шаблонов
+            self.request(path)
+            cold, cold_time = self.measure(
+                path, requests, lambda: lookups.forget(kind, name)
+            )
+            warm, warm_time = self.measure(path, requests, None)
+            self.stdout.write(
+                f'{path}: без кэша {cold:.1f} запросов '
+                f'({cold_time * 1000:.2f} мс), с кэшем {warm:.1f} '
+                f'({warm_time * 1000:.2f} мс), экономия '
+                f'{cold - warm:.1f} запросов на запрос'
+            )
+        for kind in ('group', 'user'):
+            ratio = lookups.hit_ratio(kind)
+            if ratio is not None:
+                self.stdout.write(f'попадания {kind}: {ratio:.0%}')
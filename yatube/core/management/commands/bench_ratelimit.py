@@ -0,0 +1,46 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache, caches
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from core.ratelimit import ratelimit
+
+
+def plain_view(request):
+    return HttpResponse('ok')
+
+
+class Command(BaseCommand):
+    help = 'Замеряет задержку, которую добавляет core.ratelimit.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000)
+
+    def measure(self, view, requests):
+        factory = RequestFactory()
+        request = factory.post('/')
+        request.user = AnonymousUser()
+        start = time.perf_counter()
+        for _ in range(requests):
+            view(request)
+        return (time.perf_counter() - start) / requests
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        # Лимит заведомо больше числа запросов: замеряем только учет
+        limited_view = ratelimit(f'{requests * 2}/h', group='bench')(
+            plain_view
+        )
+        cache.clear()
+        plain = self.measure(plain_view, requests)
+        limited = self.measure(limited_view, requests)
+        backend = caches['default'].__class__.__name__
+        self.stdout.write(
+            f'без лимита: {plain * 1e6:.1f} мкс, '
+            f'с лимитом: {limited * 1e6:.1f} мкс, '
+            f'накладные расходы: {(limited - plain) * 1e6:.1f} мкс на запрос '
+            f'(кэш: {backend})'
+        )
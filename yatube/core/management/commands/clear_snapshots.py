@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core import snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет все статические снимки страниц (после деплоя шаблонов); '
+        'снимки пишутся заново при первых анонимных запросах.'
+    )
+
+    def handle(self, *args, **options):
+        if not snapshots.is_enabled():
+            self.stdout.write('Снимки выключены (STATIC_SNAPSHOTS)')
+            return
+        snapshots.clear()
+        self.stdout.write(f'Снимки удалены: {snapshots.snapshot_root()}')
@@ -0,0 +1,134 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Что импортирует профилируемый процесс: то же, что и воркер WSGI
+TARGET = 'yatube.wsgi'
+
+# Выполняется в отдельном процессе, чтобы модули грузились с нуля.
+# -X importtime не видит importlib.import_module, которым Django грузит
+# приложения, модели, admin.py и URLconf, поэтому замер ставится на
+# _find_and_load - через нее проходят оба вида импорта.
+PROFILE_SCRIPT = """
+import json, sys, time
+from importlib import _bootstrap, import_module
+
+original = _bootstrap._find_and_load
+rows = []
+stack = [0.0]
+
+
+def timed(name, *args):
+    stack.append(0.0)
+    start = time.perf_counter()
+    found = False
+    try:
+        module = original(name, *args)
+        found = True
+        return module
+    finally:
+        elapsed = time.perf_counter() - start
+        children = stack.pop()
+        stack[-1] += elapsed
+        rows.append((name, elapsed - children, elapsed, found))
+
+
+_bootstrap._find_and_load = timed
+import_module(sys.argv[1])
+from django.urls import get_resolver
+get_resolver().url_patterns
+_bootstrap._find_and_load = original
+json.dump(rows, sys.stdout)
+"""
+
+
+def run_script(script, *args):
+    """Выполняет скрипт в новом процессе Python, возвращает его JSON."""
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [settings.BASE_DIR, env.get('PYTHONPATH')])
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', script, *args],
+        env=env, cwd=settings.BASE_DIR,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if result.returncode:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout)
+
+
+def group_by_package(rows):
+    """Собственное время, сложенное по пакетам верхнего уровня."""
+    totals = defaultdict(lambda: [0, 0])
+    for name, own, _, _ in rows:
+        item = totals[name.split('.')[0]]
+        item[0] += own
+        item[1] += 1
+    return sorted(
+        ((package, own, count) for package, (own, count) in totals.items()),
+        key=lambda item: item[1], reverse=True,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Разбивка времени импорта по модулям при старте воркера '
+        '(включая загрузку URLconf), замер в отдельном процессе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default=TARGET)
+        parser.add_argument('--limit', type=int, default=30)
+        parser.add_argument(
+            '--sort', choices=('cumulative', 'self'), default='cumulative',
+        )
+        parser.add_argument(
+            '--packages', action='store_true',
+            help='Сложить собственное время по пакетам верхнего уровня.',
+        )
+        parser.add_argument(
+            '--project', action='store_true',
+            help='Только модули проекта.',
+        )
+
+    def profile(self, module):
+        return run_script(PROFILE_SCRIPT, module)
+
+    def handle(self, *args, **options):
+        rows = self.profile(options['module'])
+        total = sum(own for _, own, _, _ in rows)
+        self.stdout.write(
+            f'{options["module"]}: {len(rows)} модулей, '
+            f'{total * 1000:.1f} мс на импорт'
+        )
+        limit = options['limit']
+        if options['packages']:
+            for package, own, count in group_by_package(rows)[:limit]:
+                self.stdout.write(
+                    f'{own * 1000:9.1f} мс {own * 100 / total:5.1f}% '
+                    f'{count:5} {package}'
+                )
+            return
+        if options['project']:
+            apps = {
+                app.split('.')[0] for app in settings.INSTALLED_APPS
+                if not app.startswith(('django.', 'sorl.'))
+            } | {'yatube'}
+            rows = [row for row in rows if row[0].split('.')[0] in apps]
+        index = 2 if options['sort'] == 'cumulative' else 1
+        rows.sort(key=lambda row: row[index], reverse=True)
+        self.stdout.write(f'{"свое, мс":>10} {"всего, мс":>10}  модуль')
+        for name, own, cumulative, found in rows[:limit]:
+            # Неудачные попытки импорта тоже стоят времени: поиск по sys.path
+            note = '' if found else ' (не найден)'
+            self.stdout.write(
+                f'{own * 1000:10.1f} {cumulative * 1000:10.1f}  {name}{note}'
+            )
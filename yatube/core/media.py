@@ -0,0 +1,71 @@
+"""Отдача загруженных файлов (MEDIA_ROOT).
+
+За фронтенд-сервером Django только проверяет путь и отвечает
+заголовком, а сам файл отдает сервер:
+- MEDIA_ACCEL = 'x-accel': nginx, X-Accel-Redirect на internal-локацию
+  MEDIA_ACCEL_PREFIX (alias на MEDIA_ROOT);
+- MEDIA_ACCEL = 'x-sendfile': Apache mod_xsendfile и lighttpd, X-Sendfile
+  с абсолютным путем.
+Без фронтенда (MEDIA_ACCEL = None) файл отдает FileResponse: целиком -
+через wsgi.file_wrapper, который у gunicorn и uWSGI делает sendfile(2)
+без копирования в Python, диапазоны - через core.http. ETag и
+Last-Modified считаются по stat() файла, так что повторный запрос
+картинки получает 304 без чтения файла.
+"""
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .http import file_response
+from .storage import is_content_addressed
+
+# Кэш браузера для файлов с изменяемыми именами, секунд
+MAX_AGE = 24 * 60 * 60
+# Имя по хэшу содержимого не меняет содержимое никогда
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+ACCEL_PREFIX = '/protected-media/'
+
+
+def cache_control(name):
+    if is_content_addressed(name):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    max_age = getattr(settings, 'MEDIA_MAX_AGE', MAX_AGE)
+    return f'public, max-age={max_age}'
+
+
+def media_response(request, name):
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+    stat = os.stat(path)
+    content_type, _ = mimetypes.guess_type(path)
+    content_type = content_type or 'application/octet-stream'
+    accel = getattr(settings, 'MEDIA_ACCEL', None)
+    if accel == 'x-accel':
+        prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', ACCEL_PREFIX)
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = prefix + quote(name)
+    elif accel == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(stat.st_mtime)
+        )
+        if response is None:
+            response = file_response(request, path, content_type)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control(name)
+    return response
@@ -0,0 +1,43 @@
+# core/metrics.py
+"""Метрики процесса: счетчики и замеры времени.
+
+Хранятся в памяти процесса воркера и отдаются страницей /metrics/.
+"""
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timings = {}
+
+
+def incr(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name, seconds, calls=1):
+    """Добавляет замер: число вызовов, суммарное и максимальное время."""
+    with _lock:
+        item = _timings.setdefault(
+            name, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+        )
+        item['calls'] += calls
+        item['total_ms'] += seconds * 1000
+        item['max_ms'] = max(item['max_ms'], seconds * 1000 / calls)
+
+
+def snapshot():
+    with _lock:
+        return {
+            'counters': dict(_counters),
+            'timings': {
+                name: dict(item) for name, item in _timings.items()
+            },
+        }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timings.clear()
@@ -0,0 +1,158 @@
+# core/middleware/compression.py
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    # brotli - необязательная зависимость, без неё отдаём только gzip
+    brotli = None
+
+
+# Ответы короче этого размера сжимать невыгодно
+MIN_SIZE = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Сжимаем только текст; картинки, архивы и прочее уже сжаты
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/atom+xml',
+    'application/rss+xml',
+    'image/svg+xml',
+)
+
+re_encoding = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*$')
+
+
+def accepted_encodings(header):
+    """Разбирает Accept-Encoding в словарь {кодировка: q}."""
+    encodings = {}
+    for item in header.lower().split(','):
+        match = re_encoding.match(item)
+        if not match:
+            continue
+        name, q = match.groups()
+        try:
+            encodings[name] = float(q) if q is not None else 1.0
+        except ValueError:
+            continue
+    return encodings
+
+
+def choose_encoding(header):
+    """Выбирает лучшую из поддерживаемых кодировок или None."""
+    encodings = accepted_encodings(header)
+    wildcard = encodings.get('*', 0)
+    supported = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_q = None, 0
+    for name in supported:
+        q = encodings.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class Compressor:
+    """Потоковый компрессор: каждый кусок сразу сбрасывается клиенту."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # 16 + MAX_WBITS - формат gzip с заголовком и контрольной суммой
+            self._obj = zlib.compressobj(
+                GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+
+    def compress(self, data):
+        if self.encoding == 'br':
+            return self._obj.process(data) + self._obj.flush()
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._obj.finish()
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+def compress_bytes(data, encoding):
+    """Сжимает содержимое целиком."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return obj.compress(data) + obj.flush()
+
+
+def compress_stream(chunks, encoding):
+    """Сжимает итератор байтовых кусков, не накапливая их в памяти."""
+    compressor = Compressor(encoding)
+    for chunk in chunks:
+        if not chunk:
+            continue
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '').lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжимает ответы в brotli или gzip по заголовку Accept-Encoding.
+
+    В отличие от GZipMiddleware, потоковые ответы сжимаются по кускам
+    и отдаются клиенту сразу, без буферизации всего ответа.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        # Сжатое тело не совпало бы с запрошенным диапазоном байтов
+        if response.status_code == 206 or response.has_header(
+            'Content-Range'
+        ):
+            return response
+        if not is_compressible(response):
+            return response
+        min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', MIN_SIZE)
+        if not response.streaming and len(response.content) < min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            compressed = compress_bytes(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # Сжатый ответ уже не побайтно равен исходному - ETag слабый
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
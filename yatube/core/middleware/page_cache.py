@@ -0,0 +1,73 @@
+# core/middleware/page_cache.py
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_max_age, patch_cache_control, patch_vary_headers,
+)
+from django.utils.http import http_date
+
+from core import metrics, page_cache, snapshots
+
+
+class SharedPageCacheMiddleware:
+    """Общий для всех пользователей кэш страниц с дырой под шапку
+    (core.page_cache). Стоит после аутентификации: шапке нужен
+    request.user. Готовый ответ не проходит через middleware ниже,
+    поэтому заголовки защиты (XFrameOptionsMiddleware) стоят выше.
+
+    Время отрисовки хранится вместе со страницей и отдается в Expires и
+    max-age, как у cache_page, и точно - в response.rendered_at:
+    SnapshotMiddleware не запишет снимком страницу, отрисованную до
+    сброса снимков."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not page_cache.is_enabled():
+            return self.get_response(request)
+        match = page_cache.resolve_shared(request)
+        if match is None:
+            return self.get_response(request)
+        # Шапка выделяет активный пункт меню по resolver_match
+        request.resolver_match = match
+        key = page_cache.cache_key(request)
+        timeout = getattr(
+            settings, 'SHARED_PAGE_CACHE_TIMEOUT', page_cache.TIMEOUT
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.incr('page_cache:hit')
+            content, content_type, rendered = cached
+            response = HttpResponse(
+                page_cache.stitch(content, request),
+                content_type=content_type,
+            )
+        else:
+            metrics.incr('page_cache:miss')
+            request.page_cache_holes = True
+            started = time.time()
+            response = self.get_response(request)
+            if (
+                response.status_code != 200
+                or response.streaming
+                or not page_cache.has_holes(response.content)
+            ):
+                return response
+            rendered = snapshots.rendered_at(response, started)
+            if not response.cookies:
+                cache.set(
+                    key,
+                    (response.content, response['Content-Type'], rendered),
+                    timeout=timeout,
+                )
+            response.content = page_cache.stitch(response.content, request)
+        # Готовая страница содержит шапку конкретного пользователя
+        patch_vary_headers(response, ('Cookie',))
+        patch_cache_control(response, private=True, max_age=timeout)
+        response['Expires'] = http_date(rendered + get_max_age(response))
+        response.rendered_at = rendered
+        return response
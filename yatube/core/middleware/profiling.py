@@ -0,0 +1,121 @@
+# core/middleware/profiling.py
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+from core.models import RequestProfile
+
+# Доля профилируемых запросов; 0 - только по заголовку от сотрудника
+SAMPLE_RATE = 0
+# Интервал между снимками стека, секунд
+INTERVAL = 0.005
+# Заголовок, которым сотрудник включает профилирование запроса
+HEADER = 'HTTP_X_PROFILE'
+
+# Пути, которые отрезаются от имен файлов в стеках
+STRIP_PREFIXES = tuple(sorted(
+    {settings.BASE_DIR + os.sep}
+    | {path + os.sep for path in sys.path if path},
+    key=len, reverse=True,
+))
+
+
+def frame_name(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    for prefix in STRIP_PREFIXES:
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+            break
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+def collapse(frame, stop=None):
+    """Стек в формате 'внешний;...;внутренний' до кадра stop."""
+    names = []
+    while frame is not None and frame is not stop:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Периодически снимает стек потока запроса из отдельного потока."""
+
+    def __init__(self, thread_id, interval, stop_frame=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stop_frame = stop_frame
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.counts[collapse(frame, self.stop_frame)] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return '\n'.join(
+            f'{stack} {count}' for stack, count in self.counts.most_common()
+        )
+
+
+class ProfilingMiddleware:
+    """Сэмплирующий профайлер запросов.
+
+    Профилирует долю PROFILING_SAMPLE_RATE запросов или запрос сотрудника
+    с заголовком X-Profile. Когда профилирование выключено, на запрос
+    уходит проверка заголовка и настройки.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        if HEADER in request.META:
+            user = getattr(request, 'user', None)
+            return user is not None and user.is_staff
+        rate = getattr(settings, 'PROFILING_SAMPLE_RATE', SAMPLE_RATE)
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        sampler = StackSampler(
+            threading.get_ident(),
+            getattr(settings, 'PROFILING_INTERVAL', INTERVAL),
+            # Кадры сервера и внешних middleware в стек не попадают
+            stop_frame=sys._getframe(),
+        )
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        self.store(request, sampler, time.perf_counter() - start)
+        return response
+
+    def store(self, request, sampler, duration):
+        match = request.resolver_match
+        RequestProfile.objects.create(
+            url_name=match.view_name if match else '-',
+            path=request.get_full_path()[:500],
+            duration_ms=int(duration * 1000),
+            samples=sum(sampler.counts.values()),
+            stacks=sampler.collapsed(),
+        )
@@ -0,0 +1,43 @@
+from django.db import connection
+
+from core import query_budget
+
+
+class QueryBudgetMiddleware:
+    """Проверяет бюджет запросов представления и ищет N+1.
+
+    Стоит последним, поэтому считает запросы представления и его
+    шаблонов, а не сессии и middleware выше. Бюджет берется из
+    @query_budget у представления; у представлений без бюджета
+    проверяется только N+1. У потокового ответа (ленты RSS/Atom)
+    учитываются и запросы, сделанные при отдаче тела.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with query_budget.track_queries() as log:
+            request.query_log = log
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is None:
+            return response
+        if response.streaming and not getattr(
+            response, 'file_to_stream', None
+        ):
+            # Файлы не трогаем: замена тела отключила бы sendfile
+            response.streaming_content = self.stream(
+                response.streaming_content, log, match.view_name
+            )
+        else:
+            query_budget.report(match.view_name, log)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_log.budget = getattr(view_func, 'query_budget', None)
+
+    def stream(self, content, log, name):
+        with connection.execute_wrapper(log):
+            yield from content
+        query_budget.report(name, log)
@@ -0,0 +1,46 @@
+# core/middleware/snapshots.py
+import time
+
+from django.http import HttpResponse
+
+from core import metrics, snapshots
+
+
+class SnapshotMiddleware:
+    """Отдает анонимным читателям готовые HTML-снимки (core.snapshots).
+
+    Стоит сразу после сжатия и XFrameOptionsMiddleware: попадание в
+    снимок не доходит до сессий, аутентификации и представления.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not snapshots.is_enabled():
+            return self.get_response(request)
+        path = snapshots.eligible(request)
+        if path is None:
+            return self.get_response(request)
+        content = snapshots.read(path)
+        if content is not None:
+            metrics.incr('snapshots:hit')
+            response = HttpResponse(content)
+            response['X-Snapshot'] = 'hit'
+            return response
+        metrics.incr('snapshots:miss')
+        started = time.time()
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and response['Content-Type'].startswith('text/html')
+            and not (user is not None and user.is_authenticated)
+        ):
+            snapshots.write(
+                path, response.content,
+                snapshots.rendered_at(response, started),
+            )
+        return response
@@ -0,0 +1,44 @@
+# core/middleware/template_timing.py
+import logging
+
+from core import metrics, template_timing
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateTimingMiddleware:
+    """Разбивка времени отрисовки по шаблонам для каждого запроса.
+
+    Пишет заголовок Server-Timing и строку в лог, суммирует в метрики.
+    Включается и выключается на лету через /metrics/.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not template_timing.is_enabled():
+            return self.get_response(request)
+        template_timing.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings = template_timing.stop()
+        if not timings:
+            return response
+        entries = sorted(
+            timings.items(), key=lambda item: item[1][1], reverse=True
+        )
+        parts = []
+        for number, ((kind, name), (calls, seconds)) in enumerate(entries):
+            metrics.observe(f'{kind}:{name}', seconds, calls)
+            parts.append(
+                f'tpl{number};desc="{kind} {name} x{calls}";'
+                f'dur={seconds * 1000:.2f}'
+            )
+        response['Server-Timing'] = ', '.join(parts)
+        logger.info('%s %s', request.path, ', '.join(
+            f'{kind}:{name} x{calls} {seconds * 1000:.2f}ms'
+            for (kind, name), (calls, seconds) in entries
+        ))
+        return response
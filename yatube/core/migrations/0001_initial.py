@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_name', models.CharField(db_index=True, max_length=200, verbose_name='Имя URL')),
+                ('path', models.CharField(max_length=500, verbose_name='Адрес')),
+                ('duration_ms', models.PositiveIntegerField(verbose_name='Длительность, мс')),
+                ('samples', models.PositiveIntegerField(verbose_name='Сэмплов')),
+                ('stacks', models.TextField(verbose_name='Стеки (collapsed)')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Снят')),
+            ],
+            options={
+                'ordering': ('-created',),
+            },
+        ),
+    ]
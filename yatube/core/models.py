@@ -0,0 +1,28 @@
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """Профиль одного запроса в формате collapsed-стеков для flamegraph."""
+    url_name = models.CharField('Имя URL', max_length=200, db_index=True)
+    path = models.CharField('Адрес', max_length=500)
+    duration_ms = models.PositiveIntegerField('Длительность, мс')
+    samples = models.PositiveIntegerField('Сэмплов')
+    stacks = models.TextField('Стеки (collapsed)')
+    created = models.DateTimeField('Снят', auto_now_add=True)
+
+    class Meta:
+        ordering = ('-created',)
+
+    def __str__(self):
+        return f'{self.url_name} {self.path}'
+
+
+class StoredFile(models.Model):
+    """Файл хранилища с адресацией по содержимому (core.storage)."""
+    name = models.CharField('Имя', max_length=255, unique=True)
+    refs = models.PositiveIntegerField('Ссылок', default=1)
+    size = models.BigIntegerField('Размер, байт')
+    created = models.DateTimeField('Загружен', auto_now_add=True)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,81 @@
+"""Общий кэш страниц для вошедших пользователей.
+
+Страница отличается от пользователя к пользователю только шапкой
+(includes/header.html: имя, ссылки по правам) и вкладками лент
+(includes/switcher.html, только для вошедших). Под кэшем шаблоны
+выводят вместо них метки {% page_cache_hole %}, и HTML страницы
+целиком кладется в кэш один на всех, вошедших и анонимов; ключ - путь
+с параметрами. При ответе метки заменяются фрагментами, отрисованными
+для текущего пользователя: это маленькие шаблоны без запросов к базе,
+им нужен только request.
+
+Подходят только страницы из SHARED_VIEWS: профиль и пост содержат
+кнопки и формы конкретного пользователя. Включается настройкой
+SHARED_PAGE_CACHE.
+"""
+import re
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.urls import Resolver404, resolve
+from django.utils.encoding import iri_to_uri
+
+SHARED_VIEWS = frozenset({
+    'posts:index',
+    'posts:group_post',
+    'posts:groups',
+    'posts:trending',
+    'about:author',
+    'about:tech',
+})
+# Шаблоны, которые можно выводить дырой
+HOLES = frozenset({'includes/header.html', 'includes/switcher.html'})
+# Столько же живет cache_page анонимных страниц
+TIMEOUT = 20
+
+HOLE_RE = re.compile(rb'<!--page-cache-hole:([\w./-]+)-->')
+
+
+def is_enabled():
+    return getattr(settings, 'SHARED_PAGE_CACHE', False)
+
+
+def marker(template_name):
+    return f'<!--page-cache-hole:{template_name}-->'
+
+
+def cache_key(request):
+    return f'page:{iri_to_uri(request.get_full_path())}'
+
+
+def resolve_shared(request):
+    """Совпадение URL, если страницу можно отдавать из общего кэша."""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return None
+    return match if match.view_name in SHARED_VIEWS else None
+
+
+def stitch(content, request):
+    """Подставляет в HTML шапку и прочие дыры для текущего
+    пользователя."""
+    rendered = {}
+
+    def fill(match):
+        name = match.group(1).decode()
+        if name not in HOLES:
+            return b''
+        if name not in rendered:
+            rendered[name] = render_to_string(
+                name, request=request
+            ).encode()
+        return rendered[name]
+
+    return HOLE_RE.sub(fill, content)
+
+
+def has_holes(content):
+    return HOLE_RE.search(content) is not None
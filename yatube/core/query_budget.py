@@ -0,0 +1,127 @@
+"""Бюджет SQL-запросов на представление и поиск N+1.
+
+    @query_budget(4)
+    def index(request): ...
+
+QueryBudgetMiddleware считает запросы каждого представления через
+connection.execute_wrapper (работает и без DEBUG) и группирует их по
+форме: SQL без чисел и с одинаковыми списками IN. Форма, повторенная
+N_PLUS_ONE_THRESHOLD раз и больше, - признак N+1: запрос в цикле по
+строкам, например обращение к post.author без select_related.
+
+В работе превышение бюджета и N+1 пишутся в лог со стеком вызова,
+который сделал лишний запрос, и считаются в core.metrics. С настройкой
+QUERY_BUDGET_STRICT (в тестах) вместо лога бросается QueryBudgetExceeded.
+"""
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Сколько одинаковых запросов за представление считается N+1
+N_PLUS_ONE_THRESHOLD = 3
+# Сколько кадров стека выводить
+STACK_LIMIT = 8
+
+NUMBER_RE = re.compile(r'\b\d+\b')
+PLACEHOLDERS_RE = re.compile(r'%s(?:\s*,\s*%s)+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries):
+    """Объявляет, сколько запросов к базе может сделать представление."""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def shape(sql):
+    """Форма запроса: без чисел и длины списков IN."""
+    return PLACEHOLDERS_RE.sub('%s, ...', NUMBER_RE.sub('?', sql))
+
+
+def _stack():
+    """Кадры проекта, из которых пришел запрос, без Django и библиотек."""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-3]
+        if 'site-packages' not in frame.filename
+        and __file__ != frame.filename
+    ]
+    return ''.join(traceback.format_list(frames[-STACK_LIMIT:]))
+
+
+class QueryLog:
+    """Запросы одного представления."""
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.count = 0
+        self.shapes = Counter()
+        self.stacks = {}
+        self.threshold = getattr(
+            settings, 'N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD
+        )
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        sql_shape = shape(sql)
+        self.shapes[sql_shape] += 1
+        # Стек снимается только для подозрительных запросов: первого
+        # сверх бюджета и первого повтора формы после порога
+        if self.budget is not None and self.count == self.budget + 1:
+            self.stacks['budget'] = (sql, _stack())
+        if self.shapes[sql_shape] == self.threshold:
+            self.stacks[sql_shape] = (sql, _stack())
+        return execute(sql, params, many, context)
+
+    def n_plus_one(self):
+        return {
+            sql_shape: count for sql_shape, count in self.shapes.items()
+            if count >= self.threshold
+        }
+
+    def problems(self):
+        """Описание превышения бюджета и N+1 или пустой список."""
+        problems = []
+        if self.budget is not None and self.count > self.budget:
+            sql, stack = self.stacks['budget']
+            problems.append(
+                f'{self.count} запросов при бюджете {self.budget}; '
+                f'первый лишний: {sql}\n{stack}'
+            )
+        for sql_shape, count in self.n_plus_one().items():
+            sql, stack = self.stacks[sql_shape]
+            problems.append(f'N+1: {count} раз {sql_shape}\n{stack}')
+        return problems
+
+
+@contextmanager
+def track_queries(budget=None):
+    """Считает запросы блока: with track_queries(3) as log: ..."""
+    log = QueryLog(budget)
+    with connection.execute_wrapper(log):
+        yield log
+
+
+def report(name, log):
+    """Логирует или (QUERY_BUDGET_STRICT) бросает найденные проблемы."""
+    problems = log.problems()
+    if not problems:
+        return
+    metrics.incr(f'query_budget:{name}')
+    message = f'{name}: ' + '\n'.join(problems)
+    if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
@@ -0,0 +1,85 @@
+# core/ratelimit.py
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60)."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period]
+
+
+def client_key(request, key):
+    """Пользователь для авторизованных, иначе IP-адрес."""
+    if key == 'user' and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{request.META.get("REMOTE_ADDR", "")}'
+
+
+def hit(name, limit, window, now=None):
+    """Скользящее окно по двум счетчикам фиксированных окон.
+
+    Возвращает 0, если запрос разрешен, иначе через сколько секунд
+    можно повторить. cache.add + cache.incr атомарны в бэкендах кэша,
+    поэтому параллельные запросы не теряют хиты.
+    """
+    now = time.time() if now is None else now
+    bucket = int(now // window)
+    current_key = f'rl:{name}:{bucket}'
+    cache.add(current_key, 0, timeout=window * 2)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        # Ключ успел истечь между add и incr
+        cache.set(current_key, 1, timeout=window * 2)
+        current = 1
+    previous = cache.get(f'rl:{name}:{bucket - 1}', 0)
+    elapsed = now - bucket * window
+    weight = 1 - elapsed / window
+    if previous * weight + current <= limit:
+        return 0
+    if current > limit:
+        # Даже без прошлого окна лимит исчерпан - ждем следующего окна
+        return math.ceil(window - elapsed)
+    # Ждем, пока вклад прошлого окна не упадет ниже лимита
+    needed = (previous * weight + current - limit) / previous
+    return max(1, math.ceil(needed * window))
+
+
+def ratelimit(rate, key='user', methods=('POST',), group=None):
+    """Ограничивает частоту вызовов представления.
+
+    @ratelimit('10/m') - не больше 10 POST в минуту на пользователя
+    (анонимов считаем по IP). При превышении отвечает 429 с Retry-After.
+    """
+    limit, window = parse_rate(rate)
+
+    def decorator(view_func):
+        name = group or f'{view_func.__module__}.{view_func.__name__}'
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if (
+                getattr(settings, 'RATELIMIT_ENABLE', True)
+                and (methods is None or request.method in methods)
+            ):
+                retry_after = hit(
+                    f'{name}:{client_key(request, key)}', limit, window
+                )
+                if retry_after:
+                    response = render(
+                        request, 'core/429.html',
+                        {'retry_after': retry_after}, status=429,
+                    )
+                    response['Retry-After'] = str(retry_after)
+                    return response
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
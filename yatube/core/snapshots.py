@@ -0,0 +1,193 @@
+"""Статические снимки страниц для анонимных читателей.
+
+Анонимный GET без параметров к странице из SNAPSHOT_VIEWS сначала ищет
+готовый HTML в SNAPSHOT_ROOT/<путь>/index.html и отдает его без
+сессий, представления и шаблонов (SnapshotMiddleware). Если снимка
+нет, страница рендерится как обычно и записывается на диск. Изменения
+постов, комментариев и групп удаляют снимки только затронутых страниц
+(invalidate), а задача core.publish_snapshots рендерит их заново.
+Раскладка каталога подходит и для try_files в nginx.
+
+Включается настройкой STATIC_SNAPSHOTS.
+"""
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_max_age
+from django.utils.http import parse_http_date_safe
+
+from jobs.queue import enqueue
+
+SNAPSHOT_VIEWS = frozenset({
+    'posts:index',
+    'posts:group_post',
+    'posts:profile',
+    'posts:post_detail',
+    'about:author',
+    'about:tech',
+})
+FILE_NAME = 'index.html'
+# Время последнего сброса - mtime этого файла в SNAPSHOT_ROOT, общего
+# для всех воркеров: страница, отрисованная раньше, не пишется
+STAMP_NAME = '.invalidated'
+# Перерисовка ждет, пока истечет cache_page страниц (20 секунд), иначе
+# снимок записался бы из старой копии
+PUBLISH_DELAY = 20
+
+
+def is_enabled():
+    return getattr(settings, 'STATIC_SNAPSHOTS', False)
+
+
+def snapshot_root():
+    default = os.path.join(settings.BASE_DIR, 'snapshots')
+    return getattr(settings, 'SNAPSHOT_ROOT', default)
+
+
+def snapshot_path(path):
+    """Файл снимка для пути страницы или None для странного пути."""
+    parts = [part for part in path.split('/') if part]
+    if any(part in ('.', '..') or '\\' in part for part in parts):
+        return None
+    return os.path.join(snapshot_root(), *parts, FILE_NAME)
+
+
+def eligible(request):
+    """Путь снимка, если запрос можно обслужить снимком."""
+    if request.method not in ('GET', 'HEAD') or request.GET:
+        return None
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        # Вошедший пользователь (или анонимная сессия с данными)
+        return None
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return None
+    if match.view_name not in SNAPSHOT_VIEWS:
+        return None
+    return snapshot_path(request.path_info)
+
+
+def read(path):
+    try:
+        with open(path, 'rb') as file:
+            return file.read()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def rendered_at(response, started):
+    """Когда отрисована страница: ответ из кэша старше запроса.
+
+    Общий кэш страниц передает точное время в response.rendered_at,
+    у ответа cache_page оно выводится из Expires и max-age.
+    """
+    rendered = getattr(response, 'rendered_at', None)
+    if rendered is not None:
+        return min(started, rendered)
+    max_age = get_max_age(response)
+    expires = parse_http_date_safe(response.get('Expires', ''))
+    if max_age is not None and expires is not None:
+        return min(started, expires - max_age)
+    return started
+
+
+def invalidated_at():
+    try:
+        return os.stat(os.path.join(snapshot_root(), STAMP_NAME)).st_mtime
+    except FileNotFoundError:
+        return 0
+
+
+def write(path, content, rendered):
+    """Атомарно пишет снимок, если страница не старше последнего сброса."""
+    if rendered < invalidated_at():
+        return False
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=directory, suffix='.part')
+    with os.fdopen(fd, 'wb') as file:
+        file.write(content)
+    os.chmod(temp, 0o644)
+    os.replace(temp, path)
+    return True
+
+
+def _bump():
+    root = snapshot_root()
+    os.makedirs(root, exist_ok=True)
+    stamp = os.path.join(root, STAMP_NAME)
+    with open(stamp, 'a'):
+        pass
+    os.utime(stamp)
+
+
+def invalidate(*paths):
+    """Удаляет снимки страниц и ставит их перерисовку в очередь."""
+    if not is_enabled():
+        return
+    _bump()
+    for page in paths:
+        path = snapshot_path(page)
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+    enqueue(
+        'core.publish_snapshots', {'paths': sorted(set(paths))},
+        delay=getattr(settings, 'SNAPSHOT_PUBLISH_DELAY', PUBLISH_DELAY),
+    )
+
+
+def clear():
+    """Удаляет все снимки: после деплоя или скрытия пользователя."""
+    if not is_enabled():
+        return
+    _bump()
+    # Отметку сброса не удаляем: без нее запоздалая запись прошла бы
+    root = snapshot_root()
+    for name in os.listdir(root):
+        if name != STAMP_NAME:
+            path = os.path.join(root, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+
+_handler = None
+
+
+def render(path):
+    """Прогоняет анонимный GET через все middleware; снимок записывает
+    SnapshotMiddleware. Прежний снимок удаляется заранее, иначе
+    middleware отдал бы его вместо перерисовки. Возвращает код ответа."""
+    global _handler
+    target = snapshot_path(path)
+    if target is not None and os.path.exists(target):
+        os.remove(target)
+    if _handler is None:
+        handler = BaseHandler()
+        handler.load_middleware()
+        _handler = handler
+    host = getattr(settings, 'SNAPSHOT_HOST', None) or next(
+        (host for host in settings.ALLOWED_HOSTS if '*' not in host),
+        'localhost',
+    )
+    request = WSGIRequest({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': host,
+        'SERVER_PORT': '80',
+        'HTTP_HOST': host,
+        'wsgi.input': BytesIO(),
+        'wsgi.url_scheme': 'http',
+    })
+    response = _handler.get_response(request)
+    response.close()
+    return response.status_code
@@ -0,0 +1,131 @@
+"""Хранилище с адресацией по содержимому.
+
+Файл называется по sha256 содержимого и раскладывается по вложенным
+каталогам: posts/ab/cd/abcd...ef.jpg. В одном каталоге остается не
+больше нескольких сотен файлов даже при миллионах картинок, а
+одинаковые загрузки ложатся в один файл. Сколько полей ссылается на
+файл, хранит StoredFile: save() прибавляет ссылку, delete() убавляет и
+удаляет файл, когда ссылок не осталось. Файлы без строки StoredFile
+(загруженные до этого хранилища) delete() не трогает; перенести их
+можно командой rehome_images.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+from .models import StoredFile
+
+# Уровни вложенности и длина имени каталога, символов хэша
+SHARD_DEPTH = 2
+SHARD_WIDTH = 2
+
+ADDRESSED_RE = re.compile(
+    r'(^|/)' + r'[0-9a-f]{%d}/' % SHARD_WIDTH * SHARD_DEPTH
+    + r'[0-9a-f]{64}(\.\w+)?$'
+)
+
+
+def content_name(name, digest):
+    """Имя файла по хэшу: каталог upload_to, шарды, хэш, расширение."""
+    directory = os.path.dirname(name)
+    ext = os.path.splitext(name)[1].lower()
+    shards = [
+        digest[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH]
+        for level in range(SHARD_DEPTH)
+    ]
+    return '/'.join(filter(None, [directory, *shards, digest + ext]))
+
+
+def is_content_addressed(name):
+    return bool(ADDRESSED_RE.search(name))
+
+
+def file_digest(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Имя определяется содержимым в _save, суффиксы не нужны
+        return name
+
+    def _save(self, name, content):
+        name = content_name(name, file_digest(content))
+        self._add_ref(name, content.size)
+        if not self.exists(name):
+            self._write(name, content)
+        return name
+
+    def _add_ref(self, name, size):
+        with transaction.atomic():
+            if StoredFile.objects.filter(name=name).update(
+                refs=F('refs') + 1
+            ):
+                return
+            try:
+                with transaction.atomic():
+                    StoredFile.objects.create(name=name, size=size)
+            except IntegrityError:
+                # Ту же картинку параллельно загрузил кто-то еще
+                StoredFile.objects.filter(name=name).update(
+                    refs=F('refs') + 1
+                )
+
+    def _write(self, name, content):
+        """Пишет во временный файл рядом и переименовывает: параллельная
+        запись того же содержимого не оставит половину файла."""
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp, self.file_permissions_mode)
+            os.replace(temp, path)
+        except BaseException:
+            os.remove(temp)
+            raise
+
+    def delete(self, name):
+        """Убавляет ссылку; файл удаляется после коммита, если она была
+        последней."""
+        if not name:
+            return
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(
+                name=name
+            ).first()
+            if stored is None:
+                return
+            if stored.refs > 1:
+                StoredFile.objects.filter(id=stored.id).update(
+                    refs=F('refs') - 1
+                )
+                return
+            stored.delete()
+            transaction.on_commit(lambda: self._remove(name))
+
+    def _remove(self, name):
+        # Между удалением строки и коммитом файл могли загрузить заново
+        if not StoredFile.objects.filter(name=name).exists():
+            super().delete(name)
+
+    def remove_unreferenced(self, name):
+        """Удаляет файл без учета ссылок (старые имена до переноса)."""
+        super().delete(name)
+
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,9 @@
+from jobs.registry import task
+from .snapshots import render
+
+
+@task('core.publish_snapshots')
+def publish_snapshots(payload):
+    """Заново рендерит снимки страниц, сброшенные изменениями."""
+    for path in payload['paths']:
+        render(path)
@@ -0,0 +1,91 @@
+# core/template_timing.py
+"""Замер времени отрисовки шаблонов и {% include %}.
+
+Template.render и IncludeNode.render подменяются один раз при старте;
+пока замер не включен для текущего запроса, обертка сразу вызывает
+оригинал.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.base import Template
+from django.template.loader_tags import IncludeNode
+
+# Ключ кэша с флагом включения; общий для всех воркеров при общем кэше
+FLAG_KEY = 'template_timing:enabled'
+# Как часто воркер перечитывает флаг, секунд
+FLAG_REFRESH = 5
+
+_state = threading.local()
+_flag = {'value': None, 'checked': 0}
+_original_render = Template.render
+_original_include_render = IncludeNode.render
+
+
+def template_name(template):
+    origin = getattr(template, 'origin', None)
+    name = getattr(origin, 'template_name', None) or template.name
+    return name or '<string>'
+
+
+def timed_render(self, context):
+    timings = getattr(_state, 'timings', None)
+    if timings is None:
+        return _original_render(self, context)
+    kind = 'include' if getattr(_state, 'include', False) else 'template'
+    _state.include = False
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        key = (kind, template_name(self))
+        calls, total = timings.get(key, (0, 0.0))
+        timings[key] = (calls + 1, total + time.perf_counter() - start)
+
+
+def timed_include_render(self, context):
+    if getattr(_state, 'timings', None) is not None:
+        # Следующий Template.render - это подключаемый шаблон
+        _state.include = True
+    try:
+        return _original_include_render(self, context)
+    finally:
+        _state.include = False
+
+
+def install():
+    Template.render = timed_render
+    IncludeNode.render = timed_include_render
+
+
+def is_enabled():
+    """Флаг из кэша, перечитывается не чаще раза в FLAG_REFRESH секунд."""
+    now = time.monotonic()
+    if _flag['value'] is None or now - _flag['checked'] > FLAG_REFRESH:
+        value = cache.get(FLAG_KEY)
+        if value is None:
+            value = getattr(settings, 'TEMPLATE_TIMING', False)
+        _flag['value'] = value
+        _flag['checked'] = now
+    return _flag['value']
+
+
+def set_enabled(value):
+    """Включает или выключает замер без перезапуска."""
+    cache.set(FLAG_KEY, bool(value), timeout=None)
+    _flag['value'] = bool(value)
+    _flag['checked'] = time.monotonic()
+
+
+def start():
+    _state.timings = {}
+    _state.include = False
+
+
+def stop():
+    """Возвращает замеры запроса: {(вид, шаблон): (вызовов, секунд)}."""
+    timings = getattr(_state, 'timings', None) or {}
+    _state.timings = None
+    return timings
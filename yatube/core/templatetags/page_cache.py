@@ -0,0 +1,19 @@
+# core/templatetags/page_cache.py
+from django import template
+from django.utils.safestring import mark_safe
+
+from core import page_cache
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def page_cache_hole(context, template_name):
+    """Как include, но под общим кэшем страниц выводит метку, вместо
+    которой шаблон отрисуется для каждого пользователя отдельно."""
+    request = context.get('request')
+    if getattr(request, 'page_cache_holes', False):
+        return mark_safe(page_cache.marker(template_name))
+    return context.template.engine.get_template(template_name).render(
+        context
+    )
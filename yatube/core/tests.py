@@ -1,5 +1,32 @@
-from django.test import TestCase, Client
+import asyncio
+import gzip
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import (
+    TestCase, Client, RequestFactory, TransactionTestCase, override_settings
+)
 from django.core.cache import cache
+from django.core.management import call_command
+
+from . import metrics, template_timing
+from .management.commands.import_profile import run_script
+from .middleware.profiling import StackSampler
+from .models import RequestProfile, StoredFile
+from .query_budget import QueryBudgetExceeded, report, shape, track_queries
+from .ratelimit import hit, ratelimit
+from .storage import ContentAddressedStorage, is_content_addressed
+from .middleware.compression import (
+    CompressionMiddleware, brotli, choose_encoding
+)
 
 
 class PostsURLTests(TestCase):
@@ -10,3 +37,412 @@ class PostsURLTests(TestCase):
         """Ошибка 404 использует соответствующий шаблон."""
         response = Client().get('/unexisting_page/')
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class CompressionMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_choose_encoding(self):
+        """Кодировка выбирается по Accept-Encoding с учетом q."""
+        self.assertEqual(choose_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(choose_encoding('gzip;q=0'), None)
+        self.assertEqual(choose_encoding('identity'), None)
+        self.assertEqual(choose_encoding('*'), 'br' if brotli else 'gzip')
+
+    def test_html_page_is_compressed(self):
+        """Страница сжимается и корректно распаковывается."""
+        plain = Client().get('/about/author/')
+        response = Client().get(
+            '/about/author/', HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    def test_small_and_binary_responses_are_skipped(self):
+        """Короткие ответы и картинки не сжимаются."""
+        middleware = CompressionMiddleware()
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        small = middleware.process_response(request, HttpResponse('ok'))
+        self.assertFalse(small.has_header('Content-Encoding'))
+        image = middleware.process_response(
+            request, HttpResponse(b'\x00' * 5000, content_type='image/png')
+        )
+        self.assertFalse(image.has_header('Content-Encoding'))
+
+    def test_streaming_response_is_compressed_by_chunks(self):
+        """Потоковый ответ сжимается по кускам без буферизации."""
+        middleware = CompressionMiddleware()
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        chunks = [b'<p>%d</p>' % n * 100 for n in range(5)]
+        response = middleware.process_response(
+            request, StreamingHttpResponse(iter(chunks))
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        parts = list(response.streaming_content)
+        # Каждый исходный кусок дает свой сжатый кусок
+        self.assertGreaterEqual(len(parts), len(chunks))
+        self.assertEqual(gzip.decompress(b''.join(parts)), b''.join(chunks))
+
+    def test_range_response_is_not_compressed(self):
+        """Ответ на Range отдается как есть: сжатое тело не совпало бы
+        с диапазоном из Content-Range."""
+        middleware = CompressionMiddleware()
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        body = b'<svg>' + b' ' * 1000 + b'</svg>'
+        partial = StreamingHttpResponse(
+            iter([body]), status=206, content_type='image/svg+xml'
+        )
+        partial['Content-Range'] = f'bytes 0-{len(body) - 1}/5000'
+        response = middleware.process_response(request, partial)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), body)
+
+
+class ASGIApplicationTests(TestCase):
+    def request(self, path, method='GET'):
+        """Выполняет запрос к ASGI-приложению, возвращает сообщения."""
+        from yatube.asgi import application
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'testserver')],
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(application(scope, receive, send))
+        return messages
+
+    def test_django_page_through_asgi(self):
+        """Обычная страница отдается через пул потоков."""
+        start, body = self.request('/about/author/')
+        self.assertEqual(start['status'], 200)
+        self.assertEqual(body['body'], Client().get('/about/author/').content)
+
+    def test_stream_path_goes_to_sse(self):
+        """Путь потока обрабатывается SSE-приложением."""
+        messages = self.request('/follow/stream/')
+        self.assertEqual(messages[0]['status'], 401)
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_sliding_window(self):
+        """Прошлое окно учитывается пропорционально оставшемуся времени."""
+        for _ in range(10):
+            self.assertEqual(hit('test', 10, 60, now=59), 0)
+        self.assertGreater(hit('test', 10, 60, now=59.5), 0)
+        # В начале нового окна прошлые хиты еще весят почти полностью
+        self.assertGreater(hit('test', 10, 60, now=61), 0)
+        # Ближе к концу окна вклад прошлого окна почти исчез
+        self.assertEqual(hit('test', 10, 60, now=115), 0)
+
+    def test_decorator_returns_429(self):
+        """Превышение лимита дает 429 с Retry-After, GET не считается."""
+        view = ratelimit('2/m')(lambda request: HttpResponse('ok'))
+        factory = RequestFactory()
+        for method in ('get', 'get', 'get', 'post', 'post'):
+            request = getattr(factory, method)('/')
+            request.user = AnonymousUser()
+            self.assertEqual(view(request).status_code, 200)
+        request = factory.post('/')
+        request.user = AnonymousUser()
+        response = view(request)
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response['Retry-After']) > 0)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = get_user_model().objects.create_user(
+            username='staff', is_staff=True, is_superuser=True
+        )
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_sampler_collects_collapsed_stacks(self):
+        """Сэмплер пишет стеки потока в формате collapsed."""
+        sampler = StackSampler(threading.get_ident(), 0.001)
+        sampler.start()
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+        sampler.stop()
+        line = sampler.collapsed().splitlines()[0]
+        stack, count = line.rsplit(' ', 1)
+        self.assertIn('test_sampler_collects_collapsed_stacks', stack)
+        self.assertTrue(int(count) > 0)
+
+    def test_staff_header_profiles_request(self):
+        """Заголовок X-Profile от сотрудника сохраняет профиль."""
+        self.staff_client.get('/about/author/', HTTP_X_PROFILE='1')
+        Client().get('/about/author/', HTTP_X_PROFILE='1')
+        self.staff_client.get('/about/author/')
+        profile = RequestProfile.objects.get()
+        self.assertEqual(profile.url_name, 'about:author')
+        self.assertEqual(profile.path, '/about/author/')
+
+    def test_admin_downloads_merged_stacks(self):
+        """Админка отдает стеки, сгруппированные по имени URL."""
+        RequestProfile.objects.create(
+            url_name='posts:index', path='/', duration_ms=5, samples=3,
+            stacks='a;b 2\na;c 1',
+        )
+        response = self.staff_client.post(
+            '/admin/core/requestprofile/', {
+                'action': 'download_flamegraph',
+                '_selected_action': RequestProfile.objects.values_list(
+                    'pk', flat=True
+                ),
+            }
+        )
+        self.assertEqual(
+            response.content.decode().splitlines(),
+            ['posts:index;a;b 2', 'posts:index;a;c 1'],
+        )
+
+
+class TemplateTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.staff = get_user_model().objects.create_user(
+            username='staff', is_staff=True, is_superuser=True
+        )
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def tearDown(self):
+        template_timing.set_enabled(False)
+
+    def test_disabled_by_default(self):
+        """Без включения заголовок Server-Timing не добавляется."""
+        template_timing.set_enabled(False)
+        response = Client().get('/about/author/')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_toggle_adds_server_timing(self):
+        """Включенный замер разбивает время по шаблонам и include."""
+        from posts.models import Post
+        for n in range(3):
+            Post.objects.create(author=self.staff, text=f'Пост {n}')
+        self.staff_client.post(
+            '/metrics/template-timing/', {'enabled': '1'}
+        )
+        response = Client().get('/')
+        header = response['Server-Timing']
+        self.assertIn('include includes/post_card.html x3', header)
+        self.assertIn('template posts/index.html x1', header)
+        self.assertEqual(len(response.context['page_obj']), 3)
+        data = self.staff_client.get('/metrics/').json()
+        self.assertTrue(data['template_timing'])
+        self.assertEqual(
+            data['timings']['include:includes/post_card.html']['calls'], 3
+        )
+
+    def test_metrics_for_staff_only(self):
+        """Страница метрик и переключатель доступны только сотрудникам."""
+        self.assertEqual(Client().get('/metrics/').status_code, 302)
+        Client().post('/metrics/template-timing/', {'enabled': '1'})
+        self.assertFalse(template_timing.is_enabled())
+
+
+class ImportProfileTests(TestCase):
+    def test_profile_includes_app_modules(self):
+        """Профиль видит модули, которые Django грузит через import_module."""
+        out = StringIO()
+        call_command('import_profile', '--project', '--limit', '500',
+                     stdout=out)
+        modules = [line.split()[-1] for line in out.getvalue().splitlines()]
+        self.assertIn('posts.models', modules)
+        self.assertIn('posts.admin', modules)
+        self.assertIn('yatube.urls', modules)
+
+    def test_thumbnail_engine_not_loaded_at_startup(self):
+        """sorl грузится как приложение, но движок миниатюр (Pillow)
+        подключается только при первой миниатюре."""
+        loaded = run_script(
+            'import json, sys; import yatube.wsgi; '
+            'json.dump(sorted(sys.modules), sys.stdout)'
+        )
+        self.assertIn('sorl.thumbnail', loaded)
+        self.assertNotIn('PIL', loaded)
+
+
+class ContentAddressedStorageTests(TransactionTestCase):
+    # Файл удаляется в on_commit, поэтому нужны настоящие коммиты
+    def setUp(self):
+        self.root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.storage = ContentAddressedStorage(location=self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые загрузки - один файл в шардах, счетчик ссылок."""
+        first = self.storage.save('posts/a.JPG', ContentFile(b'picture'))
+        second = self.storage.save('posts/b.jpg', ContentFile(b'picture'))
+        other = self.storage.save('posts/c.jpg', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(is_content_addressed(first))
+        self.assertRegex(first, r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/\w{64}\.jpg$')
+        self.assertEqual(StoredFile.objects.get(name=first).refs, 2)
+
+        self.storage.delete(first)
+        self.assertTrue(self.storage.exists(first))
+        self.storage.delete(second)
+        self.assertFalse(self.storage.exists(first))
+        self.assertFalse(StoredFile.objects.filter(name=first).exists())
+        self.assertTrue(self.storage.exists(other))
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.storage = ContentAddressedStorage(location=self.root)
+        self.name = self.storage.save(
+            'posts/pic.gif', ContentFile(b'0123456789' * 10)
+        )
+        self.url = f'/media/{self.name}'
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_standalone_file_response(self):
+        """Без фронтенда: файл, 304 по ETag, диапазоны, вечный кэш."""
+        with self.settings(MEDIA_ROOT=self.root):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'image/gif')
+            self.assertIn('immutable', response['Cache-Control'])
+            self.assertEqual(
+                b''.join(response.streaming_content), b'0123456789' * 10
+            )
+            cached = self.client.get(
+                self.url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+            self.assertEqual(cached.status_code, 304)
+            partial = self.client.get(self.url, HTTP_RANGE='bytes=5-14')
+            self.assertEqual(partial.status_code, 206)
+            self.assertEqual(
+                b''.join(partial.streaming_content), b'5678901234'
+            )
+            for url in ('/media/posts/missing.gif', '/media/../manage.py'):
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_front_end_offload(self):
+        """За фронтендом Django отвечает только заголовком."""
+        with self.settings(MEDIA_ROOT=self.root, MEDIA_ACCEL='x-accel'):
+            response = self.client.get(self.url)
+            self.assertEqual(
+                response['X-Accel-Redirect'], f'/protected-media/{self.name}'
+            )
+            self.assertEqual(response.content, b'')
+        with self.settings(MEDIA_ROOT=self.root, MEDIA_ACCEL='x-sendfile'):
+            response = self.client.get(self.url)
+            self.assertEqual(
+                response['X-Sendfile'], self.storage.path(self.name)
+            )
+
+
+@override_settings(
+    SHARED_PAGE_CACHE=True,
+    USER_CACHE=True,
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+)
+class SharedPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        User = get_user_model()
+        self.clients = {}
+        for username in ('alice', 'bob'):
+            client = Client()
+            client.force_login(User.objects.create_user(username=username))
+            self.clients[username] = client
+
+    def test_page_shared_header_per_user(self):
+        """Страница одна на всех вошедших, шапка у каждого своя."""
+        response = self.clients['alice'].get('/')
+        self.assertContains(response, 'Пользователь: alice')
+        self.assertIn('private', response['Cache-Control'])
+        # Пользователь из сессии попадает в кэш на первом запросе
+        self.clients['bob'].get('/profile/bob/')
+        with self.assertNumQueries(0):
+            response = self.clients['bob'].get('/')
+        self.assertContains(response, 'Пользователь: bob')
+        self.assertNotContains(response, 'alice')
+        self.assertNotContains(response, 'page-cache-hole')
+        self.assertContains(response, 'Избранные авторы')
+        # Анонимы получают ту же страницу без вкладок подписок
+        response = self.client.get('/')
+        self.assertContains(response, 'Войти')
+        self.assertNotContains(response, 'Избранные авторы')
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(
+            (counters['page_cache:miss'], counters['page_cache:hit']), (1, 2)
+        )
+
+    def test_personal_pages_not_shared(self):
+        """Профиль с кнопкой подписки общим кэшем не отдается."""
+        self.clients['alice'].get('/profile/bob/')
+        response = self.clients['bob'].get('/profile/bob/')
+        self.assertIsNotNone(response.context)
+        self.assertNotIn('page_cache:hit', metrics.snapshot()['counters'])
+
+    def test_cached_pages_keep_frame_options(self):
+        """Страница из общего кэша запрещает встраивание в чужие фреймы."""
+        for client in (self.clients['alice'], self.clients['bob'], Client()):
+            response = client.get('/groups/')
+            self.assertEqual(response['X-Frame-Options'], 'SAMEORIGIN')
+        self.assertEqual(metrics.snapshot()['counters']['page_cache:hit'], 2)
+
+
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_shape_ignores_numbers_and_in_lists(self):
+        self.assertEqual(
+            shape('SELECT 1 FROM t WHERE id IN (%s, %s, %s) LIMIT 21'),
+            shape('SELECT 2 FROM t WHERE id IN (%s, %s) LIMIT 10'),
+        )
+
+    def test_repeated_queries_reported_as_n_plus_one(self):
+        users = [
+            get_user_model().objects.create_user(username=f'user{number}')
+            for number in range(3)
+        ]
+        with track_queries(budget=5) as log:
+            for user in users:
+                get_user_model().objects.get(id=user.id)
+        self.assertEqual(log.count, 3)
+        self.assertEqual(list(log.n_plus_one().values()), [3])
+        with override_settings(QUERY_BUDGET_STRICT=True):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'N+1'):
+                report('test', log)
+
+    def test_budget_breach_logged_with_stack(self):
+        with track_queries(budget=1) as log:
+            get_user_model().objects.exists()
+            get_user_model().objects.count()
+        with self.assertLogs('core.query_budget', 'WARNING') as logs:
+            report('test', log)
+        self.assertIn('2 запросов при бюджете 1', logs.output[0])
+        self.assertIn('test_budget_breach_logged_with_stack', logs.output[0])
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(counters['query_budget:test'], 1)
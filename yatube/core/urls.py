@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('', views.metrics_view, name='metrics'),
+    path(
+        'template-timing/', views.template_timing_toggle,
+        name='template_timing',
+    ),
+]
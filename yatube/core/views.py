@@ -1,5 +1,11 @@
 # core/views.py
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_GET, require_POST
+
+from . import metrics, template_timing
+from .media import media_response
 
 
 def page_not_found(request, exception):
@@ -8,5 +14,30 @@ def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
 
 
+def permission_denied(request, exception):
+    return render(request, 'core/403.html', {'path': request.path}, status=403)
+
+
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@require_GET
+def serve_media(request, path):
+    """Загруженные файлы; передачу берет на себя фронтенд, если есть."""
+    return media_response(request, path)
+
+
+@staff_member_required
+def metrics_view(request):
+    data = metrics.snapshot()
+    data['template_timing'] = template_timing.is_enabled()
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+
+
+@staff_member_required
+@require_POST
+def template_timing_toggle(request):
+    """Включает или выключает замер шаблонов: POST enabled=1|0."""
+    template_timing.set_enabled(request.POST.get('enabled') == '1')
+    return JsonResponse({'template_timing': template_timing.is_enabled()})
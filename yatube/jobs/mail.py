@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .queue import enqueue
+
+
+def message_to_payload(message):
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+    }
+
+
+def payload_to_message(payload, connection=None):
+    return EmailMultiAlternatives(connection=connection, **payload)
+
+
+def get_delivery_connection():
+    """Соединение с настоящим почтовым бэкендом."""
+    return get_connection(settings.JOBS_EMAIL_BACKEND)
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Откладывает отправку писем в очередь задач.
+
+    Письма с вложениями отправляются сразу: их не сериализовать в JSON.
+    """
+
+    def send_messages(self, email_messages):
+        immediate = []
+        for message in email_messages:
+            if message.attachments:
+                immediate.append(message)
+                continue
+            enqueue(
+                'jobs.send_mail',
+                message_to_payload(message),
+                batch_key='mail',
+            )
+        if immediate:
+            get_delivery_connection().send_messages(immediate)
+        return len(email_messages)
@@ -0,0 +1,63 @@
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.queue import release_stale, run_next, schedule_periodic
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры фоновых задач из таблицы jobs_job.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2)
+        parser.add_argument(
+            '--sleep', type=float, default=1,
+            help='Пауза при пустой очереди, в секундах.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+
+    def work(self, worker, options):
+        processed = 0
+        while True:
+            try:
+                done = run_next(worker)
+            finally:
+                close_old_connections()
+            processed += done
+            if done:
+                continue
+            if options['once']:
+                self.processed.append(processed)
+                return
+            time.sleep(options['sleep'])
+
+    def handle(self, *args, **options):
+        host = socket.gethostname()
+        workers = [f'{host}-{n}' for n in range(options['threads'])]
+        for worker in workers:
+            # Задачи, оставшиеся от прошлого запуска этого же воркера
+            release_stale(worker)
+        schedule_periodic()
+        self.processed = []
+        threads = [
+            threading.Thread(
+                target=self.work, args=(worker, options),
+                name=worker, daemon=True,
+            )
+            for worker in workers
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Остановка воркеров')
+            return
+        self.stdout.write(f'Выполнено задач: {sum(self.processed)}')
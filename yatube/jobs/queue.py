@@ -0,0 +1,128 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Job
+from .registry import get_task, tasks
+
+logger = logging.getLogger(__name__)
+
+# Задержка перед повтором: BACKOFF_BASE * 2 ** (попытка - 1), не больше
+BACKOFF_BASE = 10
+BACKOFF_MAX = 60 * 60
+# Сколько задач одного пакета выполнять за раз
+BATCH_SIZE = 50
+
+
+def enqueue(name, payload=None, delay=0, batch_key=''):
+    """Ставит задачу в очередь; выполнит ее run_workers."""
+    get_task(name)
+    return Job.objects.create(
+        name=name,
+        payload=json.dumps(payload or {}),
+        batch_key=batch_key,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def backoff(attempts):
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+def _claim(job_ids, worker):
+    """Забирает задачи; UPDATE с условием на статус атомарен и без брокера."""
+    claimed = []
+    for job_id in job_ids:
+        taken = Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker
+        )
+        if taken:
+            claimed.append(job_id)
+    return claimed
+
+
+def claim_next(worker):
+    """Следующая готовая задача вместе с ее пачкой."""
+    ready = Job.objects.filter(status=Job.QUEUED, run_at__lte=timezone.now())
+    while True:
+        head = ready.values_list('id', 'name', 'batch_key').first()
+        if head is None:
+            return []
+        job_id, name, batch_key = head
+        if not _claim([job_id], worker):
+            # Задачу забрал другой воркер
+            continue
+        jobs = [job_id]
+        if get_task(name).batch:
+            others = ready.filter(name=name, batch_key=batch_key).values_list(
+                'id', flat=True
+            )[:BATCH_SIZE - 1]
+            jobs += _claim(list(others), worker)
+        return list(Job.objects.filter(id__in=jobs))
+
+
+def _fail(jobs, error):
+    now = timezone.now()
+    for job in jobs:
+        job.attempts += 1
+        job.last_error = error
+        job.locked_by = ''
+        if job.attempts >= get_task(job.name).max_attempts:
+            job.status = Job.FAILED
+        else:
+            job.status = Job.QUEUED
+            job.run_at = now + timedelta(seconds=backoff(job.attempts))
+        job.save(update_fields=(
+            'attempts', 'last_error', 'locked_by', 'status', 'run_at'
+        ))
+
+
+def run_jobs(jobs):
+    """Выполняет пачку задач; успешные удаляются, упавшие повторяются."""
+    task = get_task(jobs[0].name)
+    payloads = [json.loads(job.payload) for job in jobs]
+    try:
+        if task.batch:
+            task(payloads)
+        else:
+            for payload in payloads:
+                task(payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Задача %s упала:\n%s', task.name, error)
+        _fail(jobs, error)
+        return False
+    Job.objects.filter(id__in=[job.id for job in jobs]).delete()
+    if task.every:
+        enqueue(task.name, delay=task.every)
+    return True
+
+
+def run_next(worker='worker'):
+    """Выполняет одну пачку; возвращает число обработанных задач."""
+    jobs = claim_next(worker)
+    if jobs:
+        run_jobs(jobs)
+    return len(jobs)
+
+
+def schedule_periodic():
+    """Ставит периодические задачи, которых еще нет в очереди."""
+    scheduled = []
+    for task in tasks.values():
+        if task.every and not Job.objects.filter(
+            name=task.name, status__in=(Job.QUEUED, Job.RUNNING)
+        ).exists():
+            enqueue(task.name)
+            scheduled.append(task.name)
+    return scheduled
+
+
+def release_stale(worker):
+    """Возвращает в очередь задачи воркера, упавшего посреди работы."""
+    return Job.objects.filter(status=Job.RUNNING, locked_by=worker).update(
+        status=Job.QUEUED, locked_by=''
+    )
@@ -0,0 +1,38 @@
+"""Реестр фоновых задач.
+
+    @task('posts.warm_thumbnail')
+    def warm_thumbnail(payload): ...
+
+Пакетная задача (batch=True) получает список payload всех задач пачки.
+Периодическая задача (every=секунд) после выполнения ставится заново;
+первый запуск ставит run_workers.
+"""
+
+
+class Task:
+    def __init__(self, name, func, batch=False, max_attempts=5, every=None):
+        self.name = name
+        self.func = func
+        self.batch = batch
+        self.max_attempts = max_attempts
+        self.every = every
+
+    def __call__(self, payload):
+        return self.func(payload)
+
+
+tasks = {}
+
+
+def task(name, batch=False, max_attempts=5, every=None):
+    def decorator(func):
+        tasks[name] = Task(name, func, batch, max_attempts, every)
+        return func
+    return decorator
+
+
+def get_task(name):
+    try:
+        return tasks[name]
+    except KeyError:
+        raise LookupError(f'Задача {name} не зарегистрирована')
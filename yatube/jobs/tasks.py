@@ -0,0 +1,11 @@
+from .mail import get_delivery_connection, payload_to_message
+from .registry import task
+
+
+@task('jobs.send_mail', batch=True)
+def send_mail(payloads):
+    """Отправляет пачку писем через одно соединение."""
+    connection = get_delivery_connection()
+    connection.send_messages([
+        payload_to_message(payload, connection) for payload in payloads
+    ])
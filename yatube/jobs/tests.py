@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import enqueue, run_next, schedule_periodic
+from .registry import task
+
+User = get_user_model()
+
+calls = []
+
+
+@task('tests.record')
+def record(payload):
+    calls.append(payload)
+
+
+@task('tests.record_batch', batch=True)
+def record_batch(payloads):
+    calls.append(payloads)
+
+
+@task('tests.periodic', every=60)
+def periodic(payload):
+    calls.append('periodic')
+
+
+@task('tests.broken', max_attempts=2)
+def broken(payload):
+    raise RuntimeError('сломано')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_job_runs_and_is_removed(self):
+        """Выполненная задача удаляется из очереди."""
+        enqueue('tests.record', {'n': 1})
+        self.assertEqual(run_next(), 1)
+        self.assertEqual(calls, [{'n': 1}])
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(run_next(), 0)
+
+    def test_delayed_job_waits(self):
+        """Отложенная задача не выполняется раньше времени."""
+        enqueue('tests.record', delay=60)
+        self.assertEqual(run_next(), 0)
+
+    def test_unknown_task_rejected(self):
+        """Нельзя поставить незарегистрированную задачу."""
+        with self.assertRaises(LookupError):
+            enqueue('tests.unknown')
+
+    def test_failed_job_retried_with_backoff(self):
+        """Упавшая задача откладывается, затем помечается ошибкой."""
+        job = enqueue('tests.broken')
+        run_next()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('сломано', job.last_error)
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        run_next()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_batch_jobs_run_together(self):
+        """Задачи одного пакета выполняются одним вызовом."""
+        for n in range(3):
+            enqueue('tests.record_batch', {'n': n}, batch_key='a')
+        enqueue('tests.record_batch', {'n': 9}, batch_key='b')
+        self.assertEqual(run_next(), 3)
+        self.assertEqual(calls, [[{'n': 0}, {'n': 1}, {'n': 2}]])
+
+    def test_periodic_job_reschedules_itself(self):
+        """Периодическая задача после выполнения ставится снова."""
+        self.assertIn('tests.periodic', schedule_periodic())
+        self.assertNotIn('tests.periodic', schedule_periodic())
+        while run_next():
+            pass
+        self.assertIn('periodic', calls)
+        job = Job.objects.get(name='tests.periodic')
+        self.assertGreater(job.run_at, timezone.now())
+
+
+@override_settings(
+    EMAIL_BACKEND='jobs.mail.QueuedEmailBackend',
+    JOBS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class QueuedEmailTests(TestCase):
+    def test_password_reset_mail_is_deferred(self):
+        """Письмо сброса пароля уходит в очередь, а не отправляется сразу."""
+        User.objects.create_user(
+            username='auth', email='auth@example.com', password='pass-1234'
+        )
+        response = Client().post(
+            '/auth/password_reset/', {'email': 'auth@example.com'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Job.objects.filter(name='jobs.send_mail').count(), 1)
+        run_next()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['auth@example.com'])
@@ -1,8 +1,28 @@
 from django.contrib import admin
-from .models import Group, Post
+from .deletion import schedule_deletion
+from .models import Deletion, Group, Post
 
 
-class PostAdmin(admin.ModelAdmin):
+class BackgroundDeletionMixin:
+    """Удаление в фоне: объект сразу скрывается, строки удаляет очередь.
+
+    Страница подтверждения не обходит все связанные объекты.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        to_delete = [str(obj) for obj in objs]
+        model_count = {self.model._meta.verbose_name_plural: len(to_delete)}
+        return to_delete, model_count, set(), []
+
+    def delete_model(self, request, obj):
+        schedule_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            schedule_deletion(obj)
+
+
+class PostAdmin(BackgroundDeletionMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -16,7 +36,7 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(BackgroundDeletionMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'title',
@@ -26,6 +46,31 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class DeletionAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'kind',
+        'label',
+        'progress',
+        'created',
+        'finished',
+    )
+    list_filter = ('kind', 'finished')
+    search_fields = ('label',)
+    readonly_fields = ('done', 'total', 'finished')
+    empty_value_display = '-пусто-'
+
+    def progress(self, obj):
+        return f'{obj.done} / {obj.total}'
+
+    progress.short_description = 'Удалено строк'
+
+    def has_add_permission(self, request):
+        return False
+
+
 admin.site.register(Post, PostAdmin)
 
 admin.site.register(Group, GroupAdmin)
+
+admin.site.register(Deletion, DeletionAdmin)
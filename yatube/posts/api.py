@@ -0,0 +1,166 @@
+import base64
+
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
+from django.views.decorators.cache import cache_page
+
+from .deletion import is_hidden, visible_posts
+from .lookups import get_group, get_user
+from .models import Comment, Deletion, Follow, Post
+from .views import POSTS_ON_PAGE
+
+
+# Публичное имя поля -> колонка, которую нужно выбрать из базы.
+# Связанные таблицы присоединяются только если поле запрошено в fields=.
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments': 'comment_count',
+}
+
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+    'post': 'post_id',
+}
+
+
+def image_url(name):
+    if not name:
+        return None
+    return Post._meta.get_field('image').storage.url(name)
+
+
+CONVERTERS = {
+    'image': image_url,
+}
+
+
+def error(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def parse_fields(request, available):
+    """Список запрошенных полей из параметра fields=."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise ValueError(f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def encode_cursor(date, pk):
+    raw = f'{date.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """Курсор - дата и id последней записи предыдущей страницы."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date, pk = raw.split('|')
+        date = parse_datetime(date)
+        pk = int(pk)
+    except ValueError:
+        raise ValueError('Некорректный курсор')
+    if date is None:
+        raise ValueError('Некорректный курсор')
+    return date, pk
+
+
+def feed_response(request, queryset, available, date_field):
+    """Страница ленты с курсорной пагинацией.
+
+    Строки выбираются через values_list и сериализуются сразу в JSON,
+    минуя создание экземпляров моделей.
+    """
+    try:
+        fields = parse_fields(request, available)
+        cursor = decode_cursor(request.GET.get('cursor'))
+    except ValueError as exc:
+        return error(str(exc), 400)
+    if cursor is not None:
+        date, pk = cursor
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__lt': date})
+            | Q(**{date_field: date, 'id__lt': pk})
+        )
+    columns = [available[name] for name in fields]
+    rows = list(
+        queryset.order_by(f'-{date_field}', '-id')
+        .values_list(date_field, 'id', *columns)[:POSTS_ON_PAGE + 1]
+    )
+    next_url = None
+    if len(rows) > POSTS_ON_PAGE:
+        rows = rows[:POSTS_ON_PAGE]
+        params = {'cursor': encode_cursor(*rows[-1][:2])}
+        if request.GET.get('fields'):
+            params['fields'] = request.GET['fields']
+        next_url = f'{request.path}?{urlencode(params)}'
+    results = []
+    for row in rows:
+        item = {}
+        for name, value in zip(fields, row[2:]):
+            convert = CONVERTERS.get(name)
+            item[name] = convert(value) if convert else value
+        results.append(item)
+    return JsonResponse({'results': results, 'next': next_url})
+
+
+@cache_page(20, key_prefix='api_index')
+def index(request):
+    """Лента всех постов в JSON."""
+    return feed_response(
+        request, visible_posts(Post.objects.all()), POST_FIELDS, 'pub_date'
+    )
+
+
+def group_post(request, slug):
+    """Лента постов группы в JSON."""
+    group = get_group(slug)
+    if group is None or is_hidden(Deletion.GROUP, group.id):
+        return error('Группа не найдена', 404)
+    post_list = visible_posts(Post.objects.filter(group_id=group.id))
+    return feed_response(request, post_list, POST_FIELDS, 'pub_date')
+
+
+def profile(request, username):
+    """Лента постов автора в JSON."""
+    author = get_user(username)
+    if author is None or is_hidden(Deletion.USER, author.id):
+        return error('Пользователь не найден', 404)
+    post_list = visible_posts(Post.objects.filter(author_id=author.id))
+    return feed_response(request, post_list, POST_FIELDS, 'pub_date')
+
+
+def follow_index(request):
+    """Лента постов избранных авторов в JSON."""
+    if not request.user.is_authenticated:
+        return error('Требуется авторизация', 401)
+    post_list = visible_posts(Post.objects.filter(
+        author_id__in=Follow.objects.filter(
+            user=request.user
+        ).values('author_id')
+    ))
+    return feed_response(request, post_list, POST_FIELDS, 'pub_date')
+
+
+def post_comments(request, post_id):
+    """Комментарии к посту в JSON."""
+    if not visible_posts(Post.objects.filter(id=post_id)).exists():
+        return error('Пост не найден', 404)
+    comment_list = Comment.objects.filter(post_id=post_id)
+    return feed_response(request, comment_list, COMMENT_FIELDS, 'created')
@@ -0,0 +1,365 @@
+"""Архив старых постов, разбитый по годам (UTC).
+
+Посты старше POSTS_ARCHIVE_AFTER_DAYS команда archive_posts переносит
+из posts_post в таблицы posts_archive_<год> с теми же id, комментарии -
+в JSON внутри архивной строки. Горячая таблица и ее индексы остаются
+маленькими, а страницы поста, профиля, группы и главной находят
+архивные посты сами: ArchiveFeed продолжает ленту архивом после
+горячих постов. Число постов таблицы (ArchivePartition.post_count) и
+ее постов каждого автора и группы (ArchiveCount) хранится отдельно,
+поэтому постраничный вывод не считает архив через COUNT. Архивные
+посты только для чтения.
+"""
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import F, Min
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.storage import content_storage
+from .models import (
+    ArchiveCount, ArchivePartition, Comment, Group, GroupStats, Post, User,
+)
+
+# Посты старше стольких дней уезжают в архив
+ARCHIVE_AFTER_DAYS = 365
+# Сколько постов переносится одной транзакцией
+BATCH_SIZE = 500
+
+_models = {}
+_lock = threading.Lock()
+
+
+class ArchivedPostBase(models.Model):
+    """Поля архивного поста; таблица своя на каждый год."""
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField('Текст поста')
+    pub_date = models.DateTimeField('Дата публикации')
+    # Без ограничений внешнего ключа: удаление автора или группы
+    # не должно упираться в архив
+    author = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+', verbose_name='Автор',
+    )
+    group = models.ForeignKey(
+        Group, on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True, related_name='+', verbose_name='Группа',
+    )
+    image = models.ImageField(
+        'Картинка', upload_to='posts/', blank=True, storage=content_storage
+    )
+    comments_json = models.TextField('Комментарии', default='[]')
+
+    archived = True
+
+    class Meta:
+        abstract = True
+        ordering = ('-pub_date',)
+
+    def __str__(self):
+        return self.text[:15]
+
+    @property
+    def comment_count(self):
+        return len(json.loads(self.comments_json))
+
+    def comment_list(self):
+        """Комментарии в виде несохраненных Comment, свежие сверху."""
+        rows = json.loads(self.comments_json)
+        authors = User.objects.in_bulk({row['author_id'] for row in rows})
+        return [
+            Comment(
+                text=row['text'],
+                created=parse_datetime(row['created']),
+                author=authors[row['author_id']],
+            )
+            for row in rows if row['author_id'] in authors
+        ]
+
+
+def partition_model(year):
+    """Модель таблицы архива за год; классы создаются один раз."""
+    with _lock:
+        model = _models.get(year)
+        if model is None:
+            table = f'posts_archive_{year}'
+            meta = type('Meta', (), {
+                'app_label': 'posts',
+                'db_table': table,
+                'managed': False,
+                'ordering': ('-pub_date',),
+                'indexes': [
+                    models.Index(
+                        fields=('author', '-pub_date'), name=f'{table}_a'
+                    ),
+                    models.Index(
+                        fields=('group', '-pub_date'), name=f'{table}_g'
+                    ),
+                ],
+            })
+            model = type(f'ArchivedPost{year}', (ArchivedPostBase,), {
+                '__module__': __name__,
+                'Meta': meta,
+            })
+            _models[year] = model
+        return model
+
+
+def ensure_partition(year):
+    """Создает таблицу архива за год, если ее еще нет.
+
+    Схема меняется вне транзакции переноса: SQLite не умеет менять ее
+    внутри atomic().
+    """
+    if ArchivePartition.objects.filter(year=year).exists():
+        return partition_model(year)
+    model = partition_model(year)
+    if model._meta.db_table not in connection.introspection.table_names():
+        with connection.schema_editor() as editor:
+            editor.create_model(model)
+    ArchivePartition.objects.get_or_create(year=year)
+    return model
+
+
+def drop_partition(year):
+    """Удаляет таблицу архива за год вместе с постами."""
+    model = partition_model(year)
+    if model._meta.db_table in connection.introspection.table_names():
+        with connection.schema_editor() as editor:
+            editor.delete_model(model)
+    ArchivePartition.objects.filter(year=year).delete()
+
+
+def partition_year(model):
+    return int(model._meta.db_table.rsplit('_', 1)[1])
+
+
+def change_counts(year, field, deltas):
+    """Меняет ArchiveCount за год на deltas {id автора или группы: +-n}.
+
+    Один UPDATE на каждую разную величину изменения; недостающие строки
+    создаются только при прибавлении.
+    """
+    by_delta = defaultdict(list)
+    for object_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(object_id)
+    counts = ArchiveCount.objects.filter(partition_id=year, field=field)
+    for delta, ids in by_delta.items():
+        counts.filter(object_id__in=ids).update(
+            post_count=Greatest(F('post_count') + delta, 0)
+        )
+    added = [object_id for object_id, delta in deltas.items() if delta > 0]
+    if added:
+        known = set(counts.filter(object_id__in=added).values_list(
+            'object_id', flat=True
+        ))
+        ArchiveCount.objects.bulk_create([
+            ArchiveCount(
+                partition_id=year, field=field, object_id=object_id,
+                post_count=deltas[object_id],
+            )
+            for object_id in added if object_id not in known
+        ])
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = getattr(
+            settings, 'POSTS_ARCHIVE_AFTER_DAYS', ARCHIVE_AFTER_DAYS
+        )
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_batch(cutoff, batch_size=BATCH_SIZE):
+    """Переносит в архив до batch_size самых старых постов до cutoff.
+
+    Таблицы нужных лет должны уже существовать (ensure_partition).
+    Возвращает число перенесенных постов.
+    """
+    with transaction.atomic():
+        posts = list(
+            Post.objects.filter(pub_date__lt=cutoff).order_by(
+                'pub_date', 'id'
+            )[:batch_size]
+        )
+        if not posts:
+            return 0
+        ids = [post.id for post in posts]
+        comments = defaultdict(list)
+        for row in Comment.objects.filter(post_id__in=ids).order_by(
+            '-created'
+        ).values('post_id', 'author_id', 'text', 'created'):
+            comments[row.pop('post_id')].append(
+                dict(row, created=row['created'].isoformat())
+            )
+        by_year = defaultdict(list)
+        for post in posts:
+            by_year[post.pub_date.year].append(post)
+        for year, items in by_year.items():
+            model = partition_model(year)
+            model.objects.bulk_create([
+                model(
+                    id=post.id,
+                    text=post.text,
+                    pub_date=post.pub_date,
+                    author_id=post.author_id,
+                    group_id=post.group_id,
+                    image=post.image.name,
+                    comments_json=json.dumps(
+                        comments[post.id], ensure_ascii=False
+                    ),
+                )
+                for post in items
+            ])
+            first, last = items[0].id, items[-1].id
+            ArchivePartition.objects.filter(year=year).update(
+                post_count=F('post_count') + len(items),
+                min_id=Least(F('min_id'), first),
+                max_id=Greatest(F('max_id'), last),
+            )
+            ArchivePartition.objects.filter(
+                year=year, min_id__isnull=True
+            ).update(min_id=first, max_id=last)
+            change_counts(year, ArchiveCount.AUTHOR, Counter(
+                post.author_id for post in items
+            ))
+            change_counts(year, ArchiveCount.GROUP, Counter(
+                post.group_id for post in items if post.group_id
+            ))
+        # Пост не удален, а перенесен: без сигналов и каскада, статистика
+        # групп продолжает его учитывать
+        GroupStats.objects.filter(latest_post_id__in=ids).update(
+            latest_post=None
+        )
+        Comment.objects.filter(post_id__in=ids)._raw_delete(connection.alias)
+        Post.objects.filter(id__in=ids)._raw_delete(connection.alias)
+    return len(posts)
+
+
+def archive_posts(cutoff, batch_size=BATCH_SIZE, pause=0, progress=None):
+    """Переносит все посты до cutoff пакетами; возвращает их число."""
+    oldest = Post.objects.filter(pub_date__lt=cutoff).aggregate(
+        oldest=Min('pub_date')
+    )['oldest']
+    if oldest is None:
+        return 0
+    for year in range(oldest.year, cutoff.year + 1):
+        ensure_partition(year)
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            return total
+        total += moved
+        if progress is not None:
+            progress(total)
+        if pause:
+            time.sleep(pause)
+
+
+def get_archived(post_id):
+    """Архивный пост по id или None."""
+    for partition in ArchivePartition.objects.filter(
+        min_id__lte=post_id, max_id__gte=post_id
+    ):
+        post = partition_model(partition.year).objects.select_related(
+            'author', 'group'
+        ).filter(id=post_id).first()
+        if post is not None:
+            return post
+    return None
+
+
+class ArchiveFeed:
+    """Лента для Paginator: горячие посты из queryset, затем архив.
+
+    Все архивные посты старше горячих, поэтому порядок по дате
+    сохраняется. Архив запрашивается, только если страница в него
+    заходит; filters - одно из полей author_id/group_id. Число постов
+    таблицы берется из ArchivePartition или ArchiveCount, а пока идет
+    удаление - за вычетом скрытых постов (их COUNT идет по индексу и
+    растет с числом скрытых, а не со всем архивом).
+    """
+
+    def __init__(self, queryset, **filters):
+        # Импорт здесь: posts.deletion сам работает с таблицами архива
+        from .deletion import hidden_posts, visible_posts
+
+        self.hidden = hidden_posts
+        self.visible = visible_posts
+        self.queryset = visible_posts(queryset)
+        self.filters = filters
+        self._partitions = None
+        self._hot_count = None
+
+    def partitions(self):
+        """[(queryset, число постов)] от новых лет к старым."""
+        if self._partitions is None:
+            if self.filters:
+                (field, object_id), = self.filters.items()
+                counts = ArchiveCount.objects.filter(
+                    field=field, object_id=object_id, post_count__gt=0
+                ).order_by('-partition').values_list(
+                    'partition', 'post_count'
+                )
+            else:
+                counts = ArchivePartition.objects.filter(
+                    post_count__gt=0
+                ).values_list('year', 'post_count')
+            self._partitions = []
+            for year, count in counts:
+                queryset = partition_model(year).objects.filter(
+                    **self.filters
+                )
+                hidden = self.hidden(queryset)
+                if hidden is not None:
+                    count = max(count - hidden.count(), 0)
+                self._partitions.append((self.visible(queryset), count))
+        return self._partitions
+
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = self.queryset.count()
+        return self._hot_count
+
+    def count(self):
+        return self.hot_count() + sum(
+            count for _, count in self.partitions()
+        )
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        hot = self.hot_count()
+        result = []
+        if start < hot:
+            result.extend(self.queryset[start:min(stop, hot)])
+        offset = max(start - hot, 0)
+        wanted = stop - max(start, hot)
+        for queryset, count in self.partitions():
+            if wanted <= 0:
+                break
+            if offset >= count:
+                offset -= count
+                continue
+            page = list(
+                queryset.select_related('author', 'group')[
+                    offset:offset + wanted
+                ]
+            )
+            result.extend(page)
+            wanted -= len(page)
+            offset = 0
+        return result
@@ -0,0 +1,161 @@
+"""Денормализованные счетчики."""
+from django.db.models import (
+    Count, F, IntegerField, Max, OuterRef, Q, Subquery
+)
+from django.db.models.functions import Coalesce, Greatest
+
+from .archive import partition_model
+from .models import (
+    ArchivePartition, Comment, Follow, FollowCounter, GroupStats, Post
+)
+
+
+def change_follow_counters(user_id, author_id, delta):
+    """Меняет счетчики подписчика и автора на delta.
+
+    Вызывается в той же транзакции, что и изменение Follow; UPDATE с F()
+    атомарен и не теряет параллельные изменения. Если счетчик разошелся
+    с Follow, он не уходит ниже нуля до сверки repair_follow_counters.
+    """
+    for pk, field in ((author_id, 'followers'), (user_id, 'following')):
+        FollowCounter.objects.get_or_create(user_id=pk)
+        FollowCounter.objects.filter(user_id=pk).update(
+            **{field: Greatest(F(field) + delta, 0)}
+        )
+
+
+def follow_counts(user):
+    """(подписчиков, подписок) без запросов, если счетчик подгружен."""
+    try:
+        counter = user.follow_counter
+    except FollowCounter.DoesNotExist:
+        return 0, 0
+    return counter.followers, counter.following
+
+
+def reconcile_follow_counters():
+    """Пересчитывает счетчики по таблице Follow; возвращает число правок."""
+    actual = {}
+    for field, column in (('followers', 'author'), ('following', 'user')):
+        rows = Follow.objects.values(column).annotate(total=Count('id'))
+        for row in rows.order_by():
+            actual.setdefault(row[column], {})[field] = row['total']
+    fixed = 0
+    for counter in FollowCounter.objects.all():
+        values = actual.pop(counter.user_id, {})
+        followers = values.get('followers', 0)
+        following = values.get('following', 0)
+        if (counter.followers, counter.following) != (followers, following):
+            FollowCounter.objects.filter(user_id=counter.user_id).update(
+                followers=followers, following=following
+            )
+            fixed += 1
+    FollowCounter.objects.bulk_create([
+        FollowCounter(user_id=user_id, **values)
+        for user_id, values in actual.items()
+    ])
+    return fixed + len(actual)
+
+
+def group_post_added(group_id, post):
+    """Пост появился в группе: счетчик +1, возможно он стал последним."""
+    GroupStats.objects.get_or_create(group_id=group_id)
+    stats = GroupStats.objects.filter(group_id=group_id)
+    stats.update(post_count=F('post_count') + 1)
+    stats.filter(
+        Q(last_post_at__isnull=True) | Q(last_post_at__lte=post.pub_date)
+    ).update(last_post_at=post.pub_date, latest_post=post.id)
+
+
+def group_post_removed(group_id, post_id):
+    """Пост ушел из группы; последний пост ищется заново только если
+    ушел именно он (при удалении поле уже обнулено SET_NULL)."""
+    stats = GroupStats.objects.filter(group_id=group_id)
+    stats.update(post_count=Greatest(F('post_count') - 1, 0))
+    if stats.filter(
+        Q(latest_post__isnull=True) | Q(latest_post=post_id)
+    ).exists():
+        refresh_latest_post(group_id)
+
+
+def refresh_latest_post(group_id):
+    latest = Post.objects.filter(group_id=group_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date').first()
+    latest_id, latest_at = latest or (None, None)
+    GroupStats.objects.filter(group_id=group_id).update(
+        latest_post=latest_id, last_post_at=latest_at
+    )
+
+
+def rebuild_group_stats():
+    """Пересчитывает статистику групп с нуля, с учетом архива постов;
+    возвращает число групп."""
+    totals = {}
+    querysets = [Post.objects.all()] + [
+        partition_model(year).objects.all()
+        for year in ArchivePartition.objects.values_list('year', flat=True)
+    ]
+    for queryset in querysets:
+        rows = queryset.filter(group__isnull=False).values(
+            'group'
+        ).annotate(total=Count('id'), last=Max('pub_date')).order_by()
+        for row in rows:
+            total, last = totals.get(row['group'], (0, row['last']))
+            totals[row['group']] = (
+                total + row['total'], max(last, row['last'])
+            )
+    GroupStats.objects.all().delete()
+    GroupStats.objects.bulk_create([
+        GroupStats(group_id=group_id, post_count=total, last_post_at=last)
+        for group_id, (total, last) in totals.items()
+    ])
+    # Последний пост ищется только среди горячих постов
+    for group_id in Post.objects.filter(group__isnull=False).values_list(
+        'group_id', flat=True
+    ).distinct().order_by():
+        refresh_latest_post(group_id)
+    return len(totals)
+
+
+def comment_added(post_id):
+    Post.objects.filter(id=post_id).update(
+        comment_count=F('comment_count') + 1
+    )
+
+
+def comments_removed(comment_ids):
+    """Уменьшает счетчики постов за комментарии, которые сейчас будут
+    удалены одним запросом (без сигналов)."""
+    removed = Comment.objects.filter(
+        id__in=comment_ids, post=OuterRef('pk')
+    ).order_by().values('post').annotate(total=Count('id')).values('total')
+    Post.objects.filter(
+        id__in=Comment.objects.filter(id__in=comment_ids).values('post_id')
+    ).update(comment_count=Greatest(
+        F('comment_count') - Subquery(removed, output_field=IntegerField()),
+        0,
+    ))
+
+
+def reconcile_comment_counts(batch_size=1000):
+    """Сверяет comment_count с Comment пачками по id постов;
+    возвращает число исправленных постов."""
+    actual = Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+        'post'
+    ).annotate(total=Count('id')).values('total')
+    fixed = 0
+    last_id = 0
+    while True:
+        ids = list(Post.objects.filter(id__gt=last_id).order_by(
+            'id'
+        ).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return fixed
+        last_id = ids[-1]
+        wrong = Post.objects.filter(id__in=ids).annotate(
+            actual=Coalesce(Subquery(actual, output_field=IntegerField()), 0)
+        ).exclude(comment_count=F('actual'))
+        for post_id, total in wrong.values_list('id', 'actual'):
+            Post.objects.filter(id=post_id).update(comment_count=total)
+            fixed += 1
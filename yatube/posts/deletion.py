@@ -0,0 +1,317 @@
+"""Фоновое удаление больших графов объектов.
+
+Удаление пользователя через Collector грузит в память все его посты,
+комментарии и подписки и держит одну длинную транзакцию. Здесь объект
+сразу скрывается с сайта (строка Deletion), а задача очереди
+posts.purge удаляет связанные строки пачками по CHUNK_SIZE, каждая
+пачка - короткая транзакция с удалением по списку id. Сам объект
+удаляется последним, когда каскаду Django уже почти нечего собирать.
+"""
+import logging
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.storage import content_storage
+from jobs.queue import enqueue
+from .archive import change_counts, partition_model, partition_year
+from .counters import comments_removed, refresh_latest_post
+from .models import (
+    ArchiveCount, ArchivePartition, Comment, Deletion, Follow, FollowCounter,
+    FollowSuggestion, Group, GroupStats, Post, User,
+)
+
+logger = logging.getLogger(__name__)
+
+# Строк в одной транзакции
+CHUNK_SIZE = 500
+# Пачек за один запуск задачи; дальше задача ставит себя заново,
+# чтобы не занимать воркер надолго
+CHUNKS_PER_JOB = 20
+# Ключ кэша со скрытыми объектами
+PENDING_KEY = 'deletion:pending'
+# Сколько держать список скрытых в кэше, секунд. Процесс, создавший или
+# завершивший удаление, сбрасывает ключ сразу, а другие воркеры с
+# локальным кэшем (и админка, и воркер очереди) увидят изменение не
+# позже чем через этот срок
+PENDING_TIMEOUT = 10
+
+KIND_BY_MODEL = {
+    User: Deletion.USER,
+    Group: Deletion.GROUP,
+    Post: Deletion.POST,
+}
+
+
+def pending():
+    """{вид: [id]} объектов, удаление которых еще идет."""
+    hidden = cache.get(PENDING_KEY)
+    if hidden is None:
+        hidden = {kind: [] for kind, _ in Deletion.KINDS}
+        for kind, object_id in Deletion.objects.filter(
+            finished__isnull=True
+        ).values_list('kind', 'object_id'):
+            hidden[kind].append(object_id)
+        cache.set(PENDING_KEY, hidden, PENDING_TIMEOUT)
+    return hidden
+
+
+def is_hidden(kind, object_id):
+    return object_id in pending()[kind]
+
+
+def hidden_posts(queryset):
+    """Посты queryset, скрытые до конца удаления; None, если ничего не
+    скрыто."""
+    hidden = pending()
+    condition = Q()
+    if hidden[Deletion.USER]:
+        condition |= Q(author_id__in=hidden[Deletion.USER])
+    if hidden[Deletion.POST]:
+        condition |= Q(id__in=hidden[Deletion.POST])
+    if not condition:
+        return None
+    return queryset.filter(condition)
+
+
+def visible_posts(queryset):
+    """Убирает из ленты посты удаляемых авторов и сами удаляемые посты.
+
+    Пока ничего не удаляется, queryset не меняется.
+    """
+    hidden = pending()
+    if hidden[Deletion.USER]:
+        queryset = queryset.exclude(author_id__in=hidden[Deletion.USER])
+    if hidden[Deletion.POST]:
+        queryset = queryset.exclude(id__in=hidden[Deletion.POST])
+    return queryset
+
+
+def partitions():
+    return [
+        partition_model(year)
+        for year in ArchivePartition.objects.values_list('year', flat=True)
+    ]
+
+
+def estimate(kind, object_id):
+    """Сколько строк предстоит удалить или обновить."""
+    if kind == Deletion.POST:
+        return Comment.objects.filter(post_id=object_id).count()
+    if kind == Deletion.GROUP:
+        return Post.objects.filter(group_id=object_id).count() + sum(
+            model.objects.filter(group_id=object_id).count()
+            for model in partitions()
+        )
+    return (
+        # Комментарии к своим постам удаляет первый шаг, второй их
+        # уже не застанет
+        Comment.objects.filter(author_id=object_id).exclude(
+            post__author_id=object_id
+        ).count()
+        + Comment.objects.filter(post__author_id=object_id).count()
+        + Follow.objects.filter(author_id=object_id).count()
+        + Follow.objects.filter(user_id=object_id).count()
+        + Post.objects.filter(author_id=object_id).count()
+        + sum(
+            model.objects.filter(author_id=object_id).count()
+            for model in partitions()
+        )
+    )
+
+
+def schedule_deletion(obj):
+    """Скрывает объект и ставит его удаление в очередь."""
+    kind = KIND_BY_MODEL[type(obj)]
+    with transaction.atomic():
+        deletion, created = Deletion.objects.get_or_create(
+            kind=kind, object_id=obj.pk,
+            defaults={
+                'label': str(obj)[:200],
+                'total': estimate(kind, obj.pk),
+            },
+        )
+        if kind == Deletion.USER and obj.is_active:
+            # Удаляемый пользователь больше не входит на сайт
+            obj.is_active = False
+            obj.save(update_fields=('is_active',))
+        if created:
+            enqueue('posts.purge', {'deletion_id': deletion.id})
+    cache.delete(PENDING_KEY)
+    return deletion
+
+
+def _ids(queryset, *fields):
+    if not fields:
+        return list(queryset.values_list('id', flat=True)[:CHUNK_SIZE])
+    return list(queryset.values_list('id', *fields)[:CHUNK_SIZE])
+
+
+def _raw_delete(model, ids):
+    model.objects.filter(id__in=ids)._raw_delete(connection.alias)
+
+
+def delete_comments(queryset):
+    ids = _ids(queryset)
+    comments_removed(ids)
+    _raw_delete(Comment, ids)
+    return len(ids)
+
+
+def delete_follows(queryset, other_field, counter_field):
+    """Удаляет подписки и уменьшает счетчики второй стороны."""
+    rows = _ids(queryset, other_field)
+    if rows:
+        FollowCounter.objects.filter(
+            user_id__in=[other for _, other in rows]
+        ).update(**{counter_field: Greatest(F(counter_field) - 1, 0)})
+        _raw_delete(Follow, [pk for pk, _ in rows])
+    return len(rows)
+
+
+def delete_suggestions(queryset):
+    ids = _ids(queryset)
+    _raw_delete(FollowSuggestion, ids)
+    return len(ids)
+
+
+def _groups_lost_posts(model, ids):
+    """Уменьшает счетчики групп за удаляемые посты; возвращает группы,
+    у которых удаляется последний пост."""
+    rows = model.objects.filter(
+        id__in=ids, group_id__isnull=False
+    ).values('group_id').annotate(total=Count('id')).order_by()
+    for row in rows:
+        GroupStats.objects.filter(group_id=row['group_id']).update(
+            post_count=Greatest(F('post_count') - row['total'], 0)
+        )
+    stale = list(GroupStats.objects.filter(
+        latest_post_id__in=ids
+    ).values_list('group_id', flat=True))
+    GroupStats.objects.filter(group_id__in=stale).update(latest_post=None)
+    return stale
+
+
+def delete_posts(model, queryset):
+    """Удаляет посты (горячие или архивные) вместе со статистикой групп.
+
+    Комментарии горячих постов к этому моменту уже удалены.
+    """
+    ids = _ids(queryset)
+    if not ids:
+        return 0
+    stale = _groups_lost_posts(model, ids)
+    if model is not Post:
+        rows = list(model.objects.filter(id__in=ids).values_list(
+            'author_id', 'group_id'
+        ))
+    images = list(model.objects.filter(id__in=ids).exclude(
+        image=''
+    ).values_list('image', flat=True))
+    _raw_delete(model, ids)
+    for name in images:
+        content_storage.delete(name)
+    for group_id in stale:
+        refresh_latest_post(group_id)
+    if model is not Post:
+        year = partition_year(model)
+        ArchivePartition.objects.filter(year=year).update(
+            post_count=Greatest(F('post_count') - len(ids), 0)
+        )
+        authors, groups = Counter(), Counter()
+        for author_id, group_id in rows:
+            authors[author_id] -= 1
+            if group_id:
+                groups[group_id] -= 1
+        change_counts(year, ArchiveCount.AUTHOR, authors)
+        change_counts(year, ArchiveCount.GROUP, groups)
+    return len(ids)
+
+
+def ungroup_posts(model, group_id):
+    ids = _ids(model.objects.filter(group_id=group_id))
+    model.objects.filter(id__in=ids).update(group_id=None)
+    if ids and model is not Post:
+        change_counts(
+            partition_year(model), ArchiveCount.GROUP, {group_id: -len(ids)}
+        )
+    return len(ids)
+
+
+def steps(deletion):
+    """Шаги удаления по порядку; шаг возвращает число строк пачки,
+    0 - шаг завершен."""
+    pk = deletion.object_id
+    if deletion.kind == Deletion.POST:
+        return [lambda: delete_comments(Comment.objects.filter(post_id=pk))]
+    if deletion.kind == Deletion.GROUP:
+        return [
+            lambda model=model: ungroup_posts(model, pk)
+            for model in [Post] + partitions()
+        ]
+    return [
+        lambda: delete_comments(Comment.objects.filter(author_id=pk)),
+        lambda: delete_comments(Comment.objects.filter(post__author_id=pk)),
+        lambda: delete_follows(
+            Follow.objects.filter(author_id=pk), 'user_id', 'following'
+        ),
+        lambda: delete_follows(
+            Follow.objects.filter(user_id=pk), 'author_id', 'followers'
+        ),
+        lambda: delete_suggestions(FollowSuggestion.objects.filter(
+            author_id=pk
+        )),
+    ] + [
+        lambda model=model: delete_posts(
+            model, model.objects.filter(author_id=pk)
+        )
+        for model in [Post] + partitions()
+    ]
+
+
+def finish(deletion):
+    """Удаляет сам объект: каскад Django собирает уже только остатки."""
+    model = {kind: model for model, kind in KIND_BY_MODEL.items()}[
+        deletion.kind
+    ]
+    with transaction.atomic():
+        obj = model.objects.filter(pk=deletion.object_id).first()
+        if obj is not None:
+            obj.delete()
+        Deletion.objects.filter(id=deletion.id).update(
+            finished=timezone.now()
+        )
+    cache.delete(PENDING_KEY)
+
+
+def purge(deletion_id, max_chunks=None):
+    """Удаляет до max_chunks пачек; True, если удаление завершено.
+
+    Каждая пачка - своя транзакция, поэтому после сбоя задача
+    продолжает с того места, где остановилась.
+    """
+    if max_chunks is None:
+        max_chunks = CHUNKS_PER_JOB
+    deletion = Deletion.objects.get(id=deletion_id)
+    if deletion.finished:
+        return True
+    chunks = 0
+    for step in steps(deletion):
+        while True:
+            if chunks == max_chunks:
+                return False
+            with transaction.atomic():
+                count = step()
+                Deletion.objects.filter(id=deletion.id).update(
+                    done=F('done') + count
+                )
+            if not count:
+                break
+            chunks += 1
+            logger.info('%s: удалено еще %s строк', deletion, count)
+    finish(deletion)
+    return True
@@ -0,0 +1,91 @@
+"""Локальная шина событий о новых постах.
+
+Подписчики - открытые SSE-соединения в цикле asyncio, публикация идет
+из обычных (синхронных) обработчиков, поэтому доставка сделана через
+loop.call_soon_threadsafe.
+
+asyncio импортируется лениво: под WSGI подписчиков нет, а импорт asyncio
+заметно удлиняет первый запрос воркера (см. import_profile).
+"""
+import threading
+from collections import defaultdict
+
+from django.urls import reverse
+
+
+# Адрес SSE-потока (posts.sse); маршрутизируется в ASGI-точке входа
+# мимо Django
+STREAM_PATH = '/follow/stream/'
+# Сколько непрочитанных событий держим на одно соединение
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    def __init__(self, author_ids, loop):
+        import asyncio
+
+        self.author_ids = frozenset(author_ids)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def _put(self, event):
+        # Медленный клиент пропустит события, но догонит их по Last-Event-ID
+        if not self.queue.full():
+            self.queue.put_nowait(event)
+
+    def deliver(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+
+class Broker:
+    """Подписки по id автора: публикация не делает join по Follow."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_author = defaultdict(set)
+
+    def subscribe(self, author_ids, loop=None):
+        import asyncio
+
+        subscription = Subscription(
+            author_ids, loop or asyncio.get_event_loop()
+        )
+        with self._lock:
+            for author_id in subscription.author_ids:
+                self._by_author[author_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for author_id in subscription.author_ids:
+                subscribers = self._by_author.get(author_id)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._by_author[author_id]
+
+    def publish(self, author_id, event):
+        with self._lock:
+            subscribers = list(self._by_author.get(author_id, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return len(subscribers)
+
+
+broker = Broker()
+
+
+def post_event(post_id, author_username, text):
+    return {
+        'id': post_id,
+        'author': author_username,
+        'text': text[:100],
+        'url': reverse('posts:post_detail', args=[post_id]),
+    }
+
+
+def publish_post(post):
+    """Оповещает подписчиков автора о новом посте."""
+    event = post_event(post.id, post.author.username, post.text)
+    return broker.publish(post.author_id, event)
@@ -0,0 +1,188 @@
+"""Выгрузка личных данных пользователя в ZIP.
+
+Архив собирает задача очереди posts.export, а не запрос: у большого
+аккаунта десятки тысяч строк и файлов. Строки читаются через
+.iterator() и пишутся в архив по одной в формате JSON Lines, картинки
+копируются из хранилища кусками, поэтому память не зависит от размера
+аккаунта. Архив пишется во временный файл и переименовывается, когда
+готов; отдается он с поддержкой Range (core.http).
+"""
+import json
+import os
+import shutil
+import zipfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from jobs.queue import enqueue
+from .deletion import partitions
+from .models import Comment, DataExport, Follow, Post
+
+# Сколько хранится готовая выгрузка, секунд
+EXPORT_TTL = 7 * 24 * 60 * 60
+# Как часто удалять просроченные выгрузки, секунд
+CLEANUP_INTERVAL = 60 * 60
+
+
+def export_root():
+    return getattr(
+        settings, 'EXPORT_ROOT', os.path.join(settings.BASE_DIR, 'exports')
+    )
+
+
+def export_path(export):
+    return os.path.join(export_root(), export.filename)
+
+
+def request_export(user):
+    """Новая выгрузка или та, что еще готовится."""
+    with transaction.atomic():
+        export = DataExport.objects.filter(
+            user=user, status=DataExport.PENDING
+        ).first()
+        if export is None:
+            export = DataExport.objects.create(user=user)
+            enqueue('posts.export', {'export_id': export.id})
+    return export
+
+
+def _write_rows(archive, name, rows):
+    with archive.open(name, 'w', force_zip64=True) as entry:
+        for row in rows:
+            entry.write(json.dumps(
+                row, cls=DjangoJSONEncoder, ensure_ascii=False
+            ).encode())
+            entry.write(b'\n')
+
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'group__slug', 'image')
+
+
+def _post_rows(user):
+    yield from Post.objects.filter(author=user).order_by('id').values(
+        *POST_FIELDS
+    ).iterator()
+    for model in partitions():
+        # Комментарии архивного поста хранятся вместе с ним
+        for row in model.objects.filter(author=user).order_by('id').values(
+            *POST_FIELDS, 'comments_json'
+        ).iterator():
+            row['archived'] = True
+            yield row
+
+
+def _comment_rows(user):
+    yield from Comment.objects.filter(author=user).order_by('id').values(
+        'id', 'post_id', 'text', 'created'
+    ).iterator()
+    # Комментарии к архивным постам лежат в comments_json; LIKE
+    # отсеивает строки без комментариев пользователя, точная проверка
+    # идет после разбора JSON
+    marker = json.dumps({'author_id': user.id})[1:-1] + ','
+    for model in partitions():
+        for post_id, comments_json in model.objects.filter(
+            comments_json__contains=marker
+        ).order_by('id').values_list('id', 'comments_json').iterator():
+            for comment in json.loads(comments_json):
+                if comment['author_id'] == user.id:
+                    yield {
+                        'post_id': post_id,
+                        'text': comment['text'],
+                        'created': comment['created'],
+                        'archived': True,
+                    }
+
+
+def _images(user):
+    yield from Post.objects.filter(author=user).exclude(
+        image=''
+    ).values_list('image', flat=True).iterator()
+    for model in partitions():
+        yield from model.objects.filter(author=user).exclude(
+            image=''
+        ).values_list('image', flat=True).iterator()
+
+
+def write_archive(user, path):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        _write_rows(archive, 'profile.json', [{
+            'username': user.username,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'email': user.email,
+            'date_joined': user.date_joined,
+        }])
+        _write_rows(archive, 'posts.jsonl', _post_rows(user))
+        _write_rows(archive, 'comments.jsonl', _comment_rows(user))
+        _write_rows(
+            archive, 'following.jsonl',
+            Follow.objects.filter(user=user).order_by('id').values(
+                'author__username'
+            ).iterator(),
+        )
+        _write_rows(
+            archive, 'followers.jsonl',
+            Follow.objects.filter(author=user).order_by('id').values(
+                'user__username'
+            ).iterator(),
+        )
+        for name in _images(user):
+            if not default_storage.exists(name):
+                continue
+            with default_storage.open(name) as source, archive.open(
+                f'images/{name}', 'w', force_zip64=True
+            ) as entry:
+                shutil.copyfileobj(source, entry)
+
+
+def build_export(export_id):
+    """Собирает архив выгрузки; повторный запуск начинает заново."""
+    export = DataExport.objects.select_related('user').filter(
+        id=export_id, status=DataExport.PENDING
+    ).first()
+    if export is None:
+        return
+    os.makedirs(export_root(), exist_ok=True)
+    filename = f'{export.user.username}-{export.id}.zip'
+    path = os.path.join(export_root(), filename)
+    partial = f'{path}.part'
+    try:
+        write_archive(export.user, partial)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    DataExport.objects.filter(id=export.id).update(
+        status=DataExport.READY,
+        filename=filename,
+        size=os.path.getsize(path),
+        finished=timezone.now(),
+    )
+
+
+def remove_file(export):
+    if export.filename:
+        try:
+            os.remove(export_path(export))
+        except FileNotFoundError:
+            pass
+
+
+def expire_exports(now=None):
+    """Удаляет готовые выгрузки старше EXPORT_TTL."""
+    now = now or timezone.now()
+    ttl = getattr(settings, 'EXPORT_TTL', EXPORT_TTL)
+    expired = DataExport.objects.filter(
+        status=DataExport.READY, finished__lt=now - timedelta(seconds=ttl)
+    )
+    count = 0
+    for export in expired.iterator():
+        # Файл удаляет обработчик post_delete
+        export.delete()
+        count += 1
+    return count
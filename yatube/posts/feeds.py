@@ -0,0 +1,234 @@
+"""RSS и Atom ленты сайта, групп и авторов.
+
+Лента строится из строк values_list (без моделей, шаблонов и миниатюр)
+и отдается потоком: элементы пишутся в XML по одному. Собранный текст
+кэшируется под версией области (site, group:<id>, author:<id>);
+сохранение или удаление поста меняет версию, поэтому кэш живет до
+следующего поста. Версия - время изменения в миллисекундах, из нее же
+получаются ETag и Last-Modified для условных GET. Версии хранятся в
+FeedVersion, общей для всех процессов, а процесс помнит их в кэше
+VERSION_TIMEOUT секунд: так условный GET обычно обходится без базы, а
+другие воркеры видят новую версию не позже этого срока.
+"""
+import time
+from datetime import datetime
+from io import StringIO
+
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import http_date
+from django.utils.text import Truncator
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .deletion import visible_posts
+from .models import FeedVersion
+
+# Постов в ленте
+FEED_SIZE = 50
+# Сколько хранится текст ленты одной версии, секунд
+CACHE_TIMEOUT = 24 * 60 * 60
+# Сколько процесс помнит версию ленты, секунд
+VERSION_TIMEOUT = 10
+# Версия всех лент сразу: меняется, когда скрываются удаляемые объекты
+GENERATION = '*'
+
+
+class StreamingFeedMixin:
+    """Пишет ленту кусками: начало, элементы по одному, конец."""
+    item_element = None
+
+    def stream(self, items):
+        buffer = StringIO()
+        handler = SimplerXMLGenerator(buffer, 'utf-8')
+
+        def flush():
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return chunk
+
+        handler.startDocument()
+        self.start(handler)
+        self.add_root_elements(handler)
+        yield flush()
+        for item in items:
+            handler.startElement(
+                self.item_element, self.item_attributes(item)
+            )
+            self.add_item_elements(handler, item)
+            handler.endElement(self.item_element)
+            yield flush()
+        self.end(handler)
+        yield flush()
+
+    def make_item(self, **kwargs):
+        # add_item нормализует поля элемента; список items не копится
+        self.add_item(**kwargs)
+        return self.items.pop()
+
+    def latest_post_date(self):
+        return self.feed['updated']
+
+
+class AtomFeed(StreamingFeedMixin, Atom1Feed):
+    item_element = 'entry'
+
+    def start(self, handler):
+        handler.startElement('feed', self.root_attributes())
+
+    def end(self, handler):
+        handler.endElement('feed')
+
+
+class RssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    item_element = 'item'
+
+    def start(self, handler):
+        handler.startElement('rss', self.rss_attributes())
+        handler.startElement('channel', self.root_attributes())
+
+    def end(self, handler):
+        self.endChannelElement(handler)
+        handler.endElement('rss')
+
+
+FORMATS = {
+    'atom': AtomFeed,
+    'rss': RssFeed,
+}
+
+
+def version_key(scope):
+    return f'feed:version:{scope}'
+
+
+def version(scope):
+    """Версия ленты: время последнего изменения, мс."""
+    scopes = [GENERATION, scope]
+    versions = cache.get_many([version_key(name) for name in scopes])
+    if len(versions) < len(scopes):
+        stored = dict(FeedVersion.objects.filter(
+            scope__in=scopes
+        ).values_list('scope', 'version'))
+        for name in scopes:
+            if name not in stored:
+                stored[name] = FeedVersion.objects.get_or_create(
+                    scope=name,
+                    defaults={'version': int(time.time() * 1000)},
+                )[0].version
+        versions = {
+            version_key(name): value for name, value in stored.items()
+        }
+        cache.set_many(versions, VERSION_TIMEOUT)
+    return max(versions.values())
+
+
+def invalidate(*scopes):
+    now = int(time.time() * 1000)
+    updated = FeedVersion.objects.filter(scope__in=scopes).update(
+        version=now
+    )
+    if updated < len(scopes):
+        for name in scopes:
+            FeedVersion.objects.update_or_create(
+                scope=name, defaults={'version': now}
+            )
+    cache.set_many(
+        {version_key(name): now for name in scopes}, VERSION_TIMEOUT
+    )
+
+
+def invalidate_all():
+    invalidate(GENERATION)
+
+
+def renamed(scope):
+    """Группа или автор переименованы. Сбрасывается своя лента и общее
+    поколение: название группы и имя автора есть и в ленте сайта, и в
+    лентах других авторов и групп."""
+    invalidate(scope, GENERATION)
+
+
+def post_changed(post, old_group_id=None):
+    """Новый, измененный или удаленный пост сбрасывает свои ленты."""
+    scopes = ['site', f'author:{post.author_id}']
+    for group_id in {post.group_id, old_group_id} - {None}:
+        scopes.append(f'group:{group_id}')
+    invalidate(*scopes)
+
+
+def rows(queryset):
+    return visible_posts(queryset).order_by('-pub_date').values_list(
+        'id', 'text', 'pub_date', 'author__username',
+        'author__first_name', 'author__last_name', 'group__title',
+    )[:FEED_SIZE].iterator()
+
+
+def items(feed, request, queryset):
+    for (post_id, text, pub_date, username, first_name, last_name,
+         group_title) in rows(queryset):
+        link = request.build_absolute_uri(
+            reverse('posts:post_detail', args=[post_id])
+        )
+        yield feed.make_item(
+            title=Truncator(text).chars(60),
+            link=link,
+            description=text,
+            unique_id=link,
+            pubdate=pub_date,
+            author_name=f'{first_name} {last_name}'.strip() or username,
+            author_link=request.build_absolute_uri(
+                reverse('posts:profile', args=[username])
+            ),
+            categories=[group_title] if group_title else (),
+        )
+
+
+def _caching(chunks, key):
+    """Отдает куски дальше и кэширует ленту, если она дописана."""
+    body = []
+    for chunk in chunks:
+        body.append(chunk)
+        yield chunk
+    cache.set(key, ''.join(body), timeout=CACHE_TIMEOUT)
+
+
+def feed_response(request, fmt, scope, queryset, title, link):
+    """Ответ с лентой: 304 по версии, кэш или поток из базы."""
+    if fmt not in FORMATS:
+        raise Http404
+    current = version(scope)
+    etag = f'"{fmt}-{current}"'
+    last_modified = current // 1000
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        feed_class = FORMATS[fmt]
+        # Ссылки в ленте абсолютные, поэтому хост - часть ключа
+        key = f'feed:{scope}:{fmt}:{request.get_host()}:{current}'
+        body = cache.get(key)
+        if body is not None:
+            response = HttpResponse(body)
+        else:
+            feed = feed_class(
+                title=title,
+                link=request.build_absolute_uri(link),
+                description=title,
+                feed_url=request.build_absolute_uri(),
+                language='ru',
+                updated=datetime.fromtimestamp(
+                    last_modified, tz=timezone.utc
+                ),
+            )
+            response = StreamingHttpResponse(_caching(
+                feed.stream(items(feed, request, queryset)), key
+            ))
+        response['Content-Type'] = feed_class.content_type
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,66 @@
+"""Перенос картинок постов в хранилище с адресацией по содержимому.
+
+Картинки, загруженные до core.storage, лежат плоско в posts/. Команда
+rehome_images перекладывает их пачками: файл сохраняется под именем по
+хэшу (одинаковые сливаются в один), строка поста получает новое имя,
+старый файл удаляется. Уже перенесенные имена пропускаются, поэтому
+прерванный перенос можно просто запустить снова.
+"""
+import time
+
+from django.db import transaction
+
+from core.storage import content_storage, is_content_addressed
+from .deletion import partitions
+from .models import Post
+
+BATCH_SIZE = 200
+
+
+def rehome_batch(model, after_id, batch_size=BATCH_SIZE):
+    """Переносит картинки пачки постов с id > after_id.
+
+    Возвращает (последний id пачки или None, перенесено, пропущено).
+    """
+    rows = list(model.objects.filter(id__gt=after_id).exclude(
+        image=''
+    ).order_by('id').values_list('id', 'image')[:batch_size])
+    if not rows:
+        return None, 0, 0
+    moved = missing = 0
+    for post_id, name in rows:
+        if is_content_addressed(name):
+            continue
+        if not content_storage.exists(name):
+            missing += 1
+            continue
+        with content_storage.open(name) as file:
+            new_name = content_storage.save(name, file)
+        with transaction.atomic():
+            model.objects.filter(id=post_id).update(image=new_name)
+        content_storage.remove_unreferenced(name)
+        moved += 1
+    return rows[-1][0], moved, missing
+
+
+def rehome_images(batch_size=BATCH_SIZE, pause=0, progress=None):
+    """Переносит картинки всех постов, горячих и архивных.
+
+    Возвращает (перенесено, пропущено из-за отсутствующих файлов).
+    """
+    moved = missing = 0
+    for model in [Post] + partitions():
+        last_id = 0
+        while True:
+            last_id, batch_moved, batch_missing = rehome_batch(
+                model, last_id, batch_size
+            )
+            if last_id is None:
+                break
+            moved += batch_moved
+            missing += batch_missing
+            if progress is not None:
+                progress(moved, missing)
+            if pause:
+                time.sleep(pause)
+    return moved, missing
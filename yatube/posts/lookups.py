@@ -0,0 +1,100 @@
+"""Кэш поиска группы по slug и пользователя по username.
+
+Страницы и ленты группы и автора начинаются с поиска строки, которая
+почти не меняется. Найденный объект кладется в кэш (cache-aside) на
+TIMEOUT, отсутствующий - отметкой MISSING на короткий MISS_TIMEOUT,
+чтобы перебор несуществующих адресов не ходил в базу. Сохранение и
+удаление группы или пользователя сбрасывают ключи прежнего и нового
+имени (posts.signals). От пользователя кэшируются только поля
+USER_FIELDS, нужные страницам: ни хэш пароля, ни счетчик подписок
+(он меняется часто и читается отдельно) в кэш не попадают.
+
+Сброс ключей виден другим воркерам только с общим кэшем
+(core.caches.is_shared). С кэшем в памяти процесса переименование и
+удаление доходят до остальных воркеров через LOCAL_TIMEOUT.
+
+Попадания и промахи считаются в core.metrics: lookup:<вид>:hit/miss.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from core import metrics
+from core.caches import is_shared
+from .models import Group, User
+
+TIMEOUT = 15 * 60
+LOCAL_TIMEOUT = 30
+MISS_TIMEOUT = 30
+# Отметка отсутствующей строки: None в кэше не отличить от промаха
+MISSING = 'missing'
+USER_FIELDS = ('id', 'username', 'first_name', 'last_name')
+
+
+def lookup_key(kind, name):
+    # username может содержать символы, недопустимые в ключах memcached
+    digest = hashlib.md5(name.encode()).hexdigest()
+    return f'lookup:{kind}:{digest}'
+
+
+def _cached(kind, name, load):
+    key = lookup_key(kind, name)
+    value = cache.get(key)
+    if value is not None:
+        metrics.incr(f'lookup:{kind}:hit')
+        return None if value == MISSING else value
+    metrics.incr(f'lookup:{kind}:miss')
+    value = load()
+    if value is None:
+        cache.set(key, MISSING, getattr(
+            settings, 'LOOKUP_MISS_TIMEOUT', MISS_TIMEOUT
+        ))
+    else:
+        cache.set(key, value, getattr(
+            settings, 'LOOKUP_TIMEOUT',
+            TIMEOUT if is_shared() else LOCAL_TIMEOUT,
+        ))
+    return value
+
+
+def get_group(slug):
+    return _cached(
+        'group', slug, lambda: Group.objects.filter(slug=slug).first()
+    )
+
+
+def get_user(username):
+    return _cached(
+        'user', username,
+        lambda: User.objects.only(*USER_FIELDS).filter(
+            username=username
+        ).first(),
+    )
+
+
+def group_or_404(slug):
+    group = get_group(slug)
+    if group is None:
+        raise Http404
+    return group
+
+
+def user_or_404(username):
+    user = get_user(username)
+    if user is None:
+        raise Http404
+    return user
+
+
+def forget(kind, *names):
+    cache.delete_many([lookup_key(kind, name) for name in names if name])
+
+
+def hit_ratio(kind):
+    """Доля попаданий по метрикам процесса или None без обращений."""
+    counters = metrics.snapshot()['counters']
+    hits = counters.get(f'lookup:{kind}:hit', 0)
+    total = hits + counters.get(f'lookup:{kind}:miss', 0)
+    return hits / total if total else None
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts.archive import BATCH_SIZE, archive_cutoff, archive_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит старые посты в годовые таблицы архива небольшими '
+        'пакетами, каждый в своей транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Возраст поста в днях (по умолчанию '
+                 'POSTS_ARCHIVE_AFTER_DAYS).',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--sleep', type=float, default=0,
+            help='Пауза между пакетами, секунд.',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['days'])
+        self.stdout.write(f'Архивируем посты старше {cutoff:%Y-%m-%d %H:%M}')
+        total = archive_posts(
+            cutoff,
+            batch_size=options['batch_size'],
+            pause=options['sleep'],
+            progress=lambda done: self.stdout.write(f'  перенесено {done}'),
+        )
+        self.stdout.write(f'Перенесено в архив: {total}')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import BLOCK_SIZE, build_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации "кого почитать" по графу подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--block-size', type=int, default=BLOCK_SIZE)
+
+    def handle(self, *args, **options):
+        total = build_suggestions(
+            options['block_size'],
+            progress=lambda done: self.stdout.write(
+                f'Обработано пользователей: {done}'
+            ),
+        )
+        self.stdout.write(f'Готово, пользователей: {total}')
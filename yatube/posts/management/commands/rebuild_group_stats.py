@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import rebuild_group_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает таблицу статистики групп по постам.'
+
+    def handle(self, *args, **options):
+        groups = rebuild_group_stats()
+        self.stdout.write(f'Пересчитано групп: {groups}')
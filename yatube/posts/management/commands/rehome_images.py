@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts.images import BATCH_SIZE, rehome_images
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов из плоского каталога posts/ в '
+        'хранилище с именами по хэшу содержимого.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--sleep', type=float, default=0,
+            help='Пауза между пакетами, секунд.',
+        )
+
+    def handle(self, *args, **options):
+        moved, missing = rehome_images(
+            batch_size=options['batch_size'],
+            pause=options['sleep'],
+            progress=lambda moved, missing: self.stdout.write(
+                f'  перенесено {moved}, нет файла {missing}'
+            ),
+        )
+        self.stdout.write(f'Перенесено картинок: {moved}')
+        if missing:
+            self.stdout.write(f'Файлов не найдено: {missing}')
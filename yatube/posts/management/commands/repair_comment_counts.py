@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_comment_counts
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счетчики комментариев постов с таблицей Comment.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fixed = reconcile_comment_counts(options['batch_size'])
+        self.stdout.write(f'Исправлено постов: {fixed}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_follow_counters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счетчики подписок с таблицей Follow и чинит расхождения.'
+
+    def handle(self, *args, **options):
+        fixed = reconcile_follow_counters()
+        self.stdout.write(f'Исправлено счетчиков: {fixed}')
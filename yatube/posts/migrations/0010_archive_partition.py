@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_group_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivePartition',
+            fields=[
+                ('year', models.PositiveSmallIntegerField(primary_key=True, serialize=False, verbose_name='Год')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('min_id', models.PositiveIntegerField(null=True, verbose_name='Минимальный id')),
+                ('max_id', models.PositiveIntegerField(null=True, verbose_name='Максимальный id')),
+            ],
+            options={
+                'ordering': ('-year',),
+            },
+        ),
+    ]
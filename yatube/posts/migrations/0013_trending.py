@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_comment_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trending',
+            fields=[
+                ('window', models.CharField(max_length=10, primary_key=True, serialize=False, verbose_name='Окно')),
+                ('post_ids', models.TextField(default='[]', verbose_name='id постов')),
+                ('last_comment_id', models.PositiveIntegerField(default=0, verbose_name='Последний учтенный комментарий')),
+                ('computed', models.DateTimeField(null=True, verbose_name='Пересчитано')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(max_length=10, verbose_name='Окно')),
+                ('post_id', models.PositiveIntegerField(verbose_name='id поста')),
+                ('log_score', models.FloatField(verbose_name='Счет, log2')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='trendingscore',
+            index=models.Index(fields=['window', '-log_score'], name='posts_trend_window_0d0a29_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='trendingscore',
+            unique_together={('window', 'post_id')},
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0014_follow_suggestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataExport',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Готовится'), ('ready', 'Готова')], default='pending', max_length=10, verbose_name='Состояние')),
+                ('filename', models.CharField(blank=True, max_length=100, verbose_name='Файл')),
+                ('size', models.BigIntegerField(default=0, verbose_name='Размер, байт')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Запрошена')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Готова')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'ordering': ('-created',),
+            },
+        ),
+    ]
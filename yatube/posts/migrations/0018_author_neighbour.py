@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_feed_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorNeighbour',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author_id', models.PositiveIntegerField(verbose_name='id автора')),
+                ('other_id', models.PositiveIntegerField(verbose_name='id похожего автора')),
+                ('similarity', models.FloatField(verbose_name='Сходство')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='authorneighbour',
+            index=models.Index(fields=['author_id', '-similarity'], name='posts_autho_author__2d493c_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_archive_counts(apps, schema_editor):
+    ArchivePartition = apps.get_model('posts', 'ArchivePartition')
+    ArchiveCount = apps.get_model('posts', 'ArchiveCount')
+    connection = schema_editor.connection
+    tables = connection.introspection.table_names()
+    for year in ArchivePartition.objects.values_list('year', flat=True):
+        table = connection.ops.quote_name(f'posts_archive_{year}')
+        if f'posts_archive_{year}' not in tables:
+            continue
+        for field in ('author_id', 'group_id'):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT {field}, COUNT(*) FROM {table} '
+                    f'WHERE {field} IS NOT NULL GROUP BY {field}'
+                )
+                ArchiveCount.objects.bulk_create([
+                    ArchiveCount(
+                        partition_id=year, field=field,
+                        object_id=object_id, post_count=total,
+                    )
+                    for object_id, total in cursor.fetchall()
+                ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_author_neighbour'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('author_id', 'Автор'), ('group_id', 'Группа')], max_length=8, verbose_name='Поле')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id автора или группы')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('partition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counts', to='posts.ArchivePartition', verbose_name='Таблица архива')),
+            ],
+            options={
+                'unique_together': {('field', 'object_id', 'partition')},
+            },
+        ),
+        migrations.RunPython(fill_archive_counts, migrations.RunPython.noop),
+    ]
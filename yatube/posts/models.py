@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import content_storage
+
 
 User = get_user_model()
 
@@ -24,10 +26,16 @@ class Post(models.Model):
         related_name='post',
         verbose_name='Группа'
     )
+    # Имя файла - хэш содержимого, одинаковые картинки хранятся один раз
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        blank=True,
+        storage=content_storage,
+    )
+    # Денормализовано для карточек ленты; сверка - repair_comment_counts
+    comment_count = models.PositiveIntegerField(
+        'Комментариев', default=0, editable=False
     )
 
     class Meta:
@@ -80,6 +88,26 @@ class Follow(models.Model):
         verbose_name='Автор',
     )
 
+    class Meta:
+        indexes = [
+            # Списки подписчиков и подписок, свежие сверху
+            models.Index(fields=('author', '-id')),
+            models.Index(fields=('user', '-id')),
+        ]
+
+
+class FollowCounter(models.Model):
+    """Счетчики подписок, чтобы не считать COUNT(*) по Follow."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='follow_counter',
+        verbose_name='Пользователь',
+    )
+    followers = models.PositiveIntegerField('Подписчиков', default=0)
+    following = models.PositiveIntegerField('Подписок', default=0)
+
 
 class Group(models.Model):
     title = models.CharField('Имя группы', max_length=200)
@@ -88,3 +116,188 @@ class Group(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class GroupStats(models.Model):
+    """Статистика группы для каталога, обновляется при изменении постов."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Группа',
+    )
+    post_count = models.PositiveIntegerField('Постов', default=0)
+    last_post_at = models.DateTimeField(
+        'Последний пост', null=True, blank=True, db_index=True
+    )
+    latest_post = models.ForeignKey(
+        Post,
+        null=True, blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        verbose_name='Последний пост',
+    )
+
+
+class ArchivePartition(models.Model):
+    """Годовая таблица архива постов (см. posts.archive)."""
+    year = models.PositiveSmallIntegerField('Год', primary_key=True)
+    post_count = models.PositiveIntegerField('Постов', default=0)
+    # Диапазон id: пост по id ищется только в подходящих таблицах
+    min_id = models.PositiveIntegerField('Минимальный id', null=True)
+    max_id = models.PositiveIntegerField('Максимальный id', null=True)
+
+    class Meta:
+        ordering = ('-year',)
+
+    def __str__(self):
+        return f'posts_archive_{self.year}'
+
+
+class ArchiveCount(models.Model):
+    """Число постов автора или группы в годовой таблице архива: лента
+    профиля и группы не считает архив через COUNT."""
+    AUTHOR = 'author_id'
+    GROUP = 'group_id'
+    FIELDS = (
+        (AUTHOR, 'Автор'),
+        (GROUP, 'Группа'),
+    )
+    partition = models.ForeignKey(
+        ArchivePartition,
+        on_delete=models.CASCADE,
+        related_name='counts',
+        verbose_name='Таблица архива',
+    )
+    field = models.CharField('Поле', max_length=8, choices=FIELDS)
+    object_id = models.PositiveIntegerField('id автора или группы')
+    post_count = models.PositiveIntegerField('Постов', default=0)
+
+    class Meta:
+        unique_together = ('field', 'object_id', 'partition')
+
+
+class Deletion(models.Model):
+    """Фоновое удаление пользователя, группы или поста (posts.deletion).
+
+    Пока строка не завершена, объект скрыт с сайта.
+    """
+    USER = 'user'
+    GROUP = 'group'
+    POST = 'post'
+    KINDS = (
+        (USER, 'Пользователь'),
+        (GROUP, 'Группа'),
+        (POST, 'Пост'),
+    )
+    kind = models.CharField('Что удаляется', max_length=10, choices=KINDS)
+    object_id = models.PositiveIntegerField('id объекта')
+    label = models.CharField('Объект', max_length=200)
+    total = models.PositiveIntegerField('Строк к удалению', default=0)
+    done = models.PositiveIntegerField('Удалено строк', default=0)
+    created = models.DateTimeField('Запланировано', auto_now_add=True)
+    finished = models.DateTimeField('Завершено', null=True, blank=True)
+
+    class Meta:
+        ordering = ('-created',)
+        unique_together = ('kind', 'object_id')
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.label}'
+
+
+class TrendingScore(models.Model):
+    """Затухающая активность комментариев поста в окне (posts.trending).
+
+    Хранится двоичный логарифм суммы весов комментариев, отсчитанных
+    от общей эпохи: порядок по нему совпадает с порядком по затухшему
+    счету, поэтому старые строки не пересчитываются.
+    """
+    window = models.CharField('Окно', max_length=10)
+    # Без внешнего ключа: посты удаляются и уходят в архив пачками
+    post_id = models.PositiveIntegerField('id поста')
+    log_score = models.FloatField('Счет, log2')
+
+    class Meta:
+        unique_together = ('window', 'post_id')
+        indexes = [models.Index(fields=('window', '-log_score'))]
+
+
+class Trending(models.Model):
+    """Готовый топ постов окна и позиция, до которой учтены комментарии."""
+    window = models.CharField('Окно', max_length=10, primary_key=True)
+    post_ids = models.TextField('id постов', default='[]')
+    last_comment_id = models.PositiveIntegerField(
+        'Последний учтенный комментарий', default=0
+    )
+    computed = models.DateTimeField('Пересчитано', null=True)
+
+
+class AuthorNeighbour(models.Model):
+    """Похожий автор (posts.recommendations), промежуточный результат
+    пересчета рекомендаций."""
+    # Без внешних ключей: таблица целиком пересоздается при пересчете
+    author_id = models.PositiveIntegerField('id автора')
+    other_id = models.PositiveIntegerField('id похожего автора')
+    similarity = models.FloatField('Сходство')
+
+    class Meta:
+        indexes = [models.Index(fields=('author_id', '-similarity'))]
+
+
+class FollowSuggestion(models.Model):
+    """Рекомендация автора пользователю (posts.recommendations)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Кому',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    score = models.FloatField('Оценка')
+    rank = models.PositiveSmallIntegerField('Место')
+
+    class Meta:
+        ordering = ('rank',)
+        unique_together = ('user', 'author')
+        indexes = [models.Index(fields=('user', 'rank'))]
+
+
+class DataExport(models.Model):
+    """Выгрузка личных данных пользователя (posts.export)."""
+    PENDING = 'pending'
+    READY = 'ready'
+    STATUSES = (
+        (PENDING, 'Готовится'),
+        (READY, 'Готова'),
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пользователь',
+    )
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUSES, default=PENDING
+    )
+    # Имя файла в каталоге EXPORT_ROOT, который не раздается как media
+    filename = models.CharField('Файл', max_length=100, blank=True)
+    size = models.BigIntegerField('Размер, байт', default=0)
+    created = models.DateTimeField('Запрошена', auto_now_add=True)
+    finished = models.DateTimeField('Готова', null=True, blank=True)
+
+    class Meta:
+        ordering = ('-created',)
+
+
+class FeedVersion(models.Model):
+    """Версия ленты RSS/Atom (posts.feeds): общая для всех процессов."""
+    scope = models.CharField('Область', max_length=50, primary_key=True)
+    # Время последнего изменения, мс
+    version = models.BigIntegerField('Версия')
@@ -0,0 +1,216 @@
+"""Рекомендации "кого почитать" по графу подписок.
+
+Сходство авторов - косинус по общим подписчикам: co(a, b) /
+sqrt(|подписчики a| * |подписчики b|). Пользователю u автор b
+рекомендуется со счетом sum(sim(a, b)) по авторам a, на которых он уже
+подписан. Матрица пользователь x автор целиком в память не читается:
+1. авторы обходятся блоками; у каждого берется не больше FOLLOWER_SAMPLE
+   последних подписчиков, у них - не больше FOLLOWING_SAMPLE последних
+   подписок (одним оконным запросом на пачку id); NEIGHBOURS ближайших
+   авторов блока пишутся в AuthorNeighbour;
+2. пользователи обходятся блоками: для блока читаются его подписки и
+   соседи только этих авторов, топ TOP_K каждого записывается в
+   FollowSuggestion одной транзакцией на блок.
+Память ограничена размером блока и выборками; списки id в IN режутся
+по IN_CHUNK, чтобы не упереться в лимит параметров SQLite.
+"""
+import math
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .deletion import pending
+from .models import (
+    AuthorNeighbour, Deletion, Follow, FollowCounter, FollowSuggestion
+)
+
+# Пользователей или авторов в блоке
+BLOCK_SIZE = 500
+# Сколько последних подписчиков автора учитывается
+FOLLOWER_SAMPLE = 1000
+# Сколько подписок каждого подписчика учитывается
+FOLLOWING_SAMPLE = 200
+# Сколько похожих авторов хранится на автора
+NEIGHBOURS = 50
+# Сколько рекомендаций хранится на пользователя
+TOP_K = 10
+# Как часто пересчитывать рекомендации, секунд
+INTERVAL = 6 * 60 * 60
+# Сколько id в одном IN
+IN_CHUNK = 500
+
+
+def _blocks(queryset, field, block_size):
+    """id по возрастанию блоками, без чтения всей колонки сразу."""
+    last = 0
+    while True:
+        ids = list(queryset.filter(**{f'{field}__gt': last}).order_by(
+            field
+        ).values_list(field, flat=True).distinct()[:block_size])
+        if not ids:
+            return
+        last = ids[-1]
+        yield ids
+
+
+def _chunks(ids):
+    ids = sorted(ids)
+    for start in range(0, len(ids), IN_CHUNK):
+        yield ids[start:start + IN_CHUNK]
+
+
+def _latest(key, value, ids, limit):
+    """{key: [value]} по подпискам: не больше limit последних на каждый
+    key, один запрос с ROW_NUMBER() на пачку id."""
+    result = defaultdict(list)
+    quote = connection.ops.quote_name
+    for chunk in _chunks(ids):
+        ranked = Follow.objects.filter(**{f'{key}__in': chunk}).annotate(
+            position=Window(
+                RowNumber(), partition_by=[F(key)], order_by=F('id').desc()
+            ),
+        ).values_list(key, value, 'position')
+        sql, params = ranked.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {quote(key)}, {quote(value)} FROM ({sql}) ranked '
+                f'WHERE {quote("position")} <= %s '
+                f'ORDER BY {quote(key)}, {quote("position")}',
+                (*params, limit),
+            )
+            for key_id, value_id in cursor:
+                result[key_id].append(value_id)
+    return result
+
+
+def _followings(user_ids):
+    """{пользователь: [все авторы]}, последние подписки первыми."""
+    result = defaultdict(list)
+    for chunk in _chunks(user_ids):
+        rows = Follow.objects.filter(user_id__in=chunk).order_by(
+            'user_id', '-id'
+        ).values_list('user_id', 'author_id')
+        for user_id, author_id in rows.iterator():
+            result[user_id].append(author_id)
+    return result
+
+
+def _follower_counts(author_ids):
+    counts = {}
+    for chunk in _chunks(author_ids):
+        counts.update(FollowCounter.objects.filter(
+            user_id__in=chunk
+        ).values_list('user_id', 'followers'))
+    return counts
+
+
+def _neighbours(author_ids):
+    """{автор: [(похожий автор, сходство)]} из AuthorNeighbour."""
+    result = defaultdict(list)
+    for chunk in _chunks(author_ids):
+        for author_id, other_id, similarity in AuthorNeighbour.objects.filter(
+            author_id__in=chunk
+        ).values_list('author_id', 'other_id', 'similarity'):
+            result[author_id].append((other_id, similarity))
+    return result
+
+
+def author_neighbours(block_size=BLOCK_SIZE):
+    """Пересчитывает AuthorNeighbour; возвращает число авторов."""
+    AuthorNeighbour.objects.all().delete()
+    total = 0
+    for block in _blocks(Follow.objects.all(), 'author_id', block_size):
+        samples = _latest('author_id', 'user_id', block, FOLLOWER_SAMPLE)
+        followings = _latest(
+            'user_id', 'author_id',
+            {user_id for sample in samples.values() for user_id in sample},
+            FOLLOWING_SAMPLE,
+        )
+        co = {author_id: Counter() for author_id in block}
+        for author_id, sample in samples.items():
+            for user_id in sample:
+                co[author_id].update(followings[user_id])
+            del co[author_id][author_id]
+        counts = _follower_counts(
+            {other for counter in co.values() for other in counter}
+        )
+        rows = []
+        for author_id, counter in co.items():
+            size = len(samples[author_id])
+            similar = [
+                (other, shared / math.sqrt(size * max(counts.get(other, 0),
+                                                      shared)))
+                for other, shared in counter.items()
+            ]
+            similar.sort(key=lambda item: item[1], reverse=True)
+            rows.extend(
+                AuthorNeighbour(
+                    author_id=author_id, other_id=other, similarity=value
+                )
+                for other, value in similar[:NEIGHBOURS]
+            )
+        AuthorNeighbour.objects.bulk_create(rows, batch_size=IN_CHUNK)
+        total += len(block)
+    return total
+
+
+def suggest(following, neighbours, user_id, followed=()):
+    """Топ TOP_K авторов [(автор, счет)] для пользователя.
+
+    following - подписки, по которым считается счет, followed - все
+    подписки пользователя, которые рекомендовать нельзя.
+    """
+    scores = Counter()
+    for author_id in following:
+        for other, similarity in neighbours.get(author_id, ()):
+            scores[other] += similarity
+    for author_id in {*following, *followed, user_id}:
+        scores.pop(author_id, None)
+    return scores.most_common(TOP_K)
+
+
+def build_suggestions(block_size=BLOCK_SIZE, progress=None):
+    """Пересчитывает FollowSuggestion; возвращает число пользователей."""
+    author_neighbours(block_size)
+    total = 0
+    for block in _blocks(Follow.objects.all(), 'user_id', block_size):
+        followings = _followings(block)
+        neighbours = _neighbours({
+            author_id for authors in followings.values()
+            for author_id in authors[:FOLLOWING_SAMPLE]
+        })
+        rows = []
+        for user_id in block:
+            authors = followings[user_id]
+            for rank, (author_id, score) in enumerate(suggest(
+                authors[:FOLLOWING_SAMPLE], neighbours, user_id, authors
+            )):
+                rows.append(FollowSuggestion(
+                    user_id=user_id, author_id=author_id,
+                    score=score, rank=rank,
+                ))
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user_id__in=block).delete()
+            FollowSuggestion.objects.bulk_create(rows)
+        total += len(block)
+        if progress is not None:
+            progress(total)
+    # Пользователи без подписок в блоки не попали: их старые
+    # рекомендации удаляются отдельно
+    FollowSuggestion.objects.exclude(
+        user_id__in=Follow.objects.values('user_id')
+    ).delete()
+    return total
+
+
+def suggestions_for(user, limit=5):
+    """Рекомендации пользователю одним запросом по индексу (user, rank)."""
+    if not user.is_authenticated:
+        return []
+    suggestions = FollowSuggestion.objects.filter(user=user)
+    hidden = pending()[Deletion.USER]
+    if hidden:
+        suggestions = suggestions.exclude(author_id__in=hidden)
+    return list(suggestions.select_related('author')[:limit])
@@ -0,0 +1,230 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.urls import reverse
+
+from core import snapshots
+from core.storage import content_storage
+from . import feeds, lookups
+from .counters import comment_added, group_post_added, group_post_removed
+from .export import remove_file
+from .models import Comment, DataExport, Deletion, Follow, Group, Post, User
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_fields(sender, instance, raw, **kwargs):
+    """Запоминаем прежние группу и картинку, чтобы заметить перенос
+    поста и замену картинки."""
+    instance._old_group_id = None
+    instance._old_image = ''
+    if instance.pk and not raw:
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, '')
+
+
+@receiver(post_save, sender=Post)
+def update_group_stats_on_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if old_group_id == instance.group_id:
+        return
+    if old_group_id is not None:
+        group_post_removed(old_group_id, instance.id)
+    if instance.group_id is not None:
+        group_post_added(instance.group_id, instance)
+
+
+@receiver(post_delete, sender=Post)
+def update_group_stats_on_delete(sender, instance, **kwargs):
+    if instance.group_id is not None:
+        group_post_removed(instance.group_id, instance.id)
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_count(sender, instance, created, raw, **kwargs):
+    # Обработчика post_delete нет намеренно: он отключил бы быстрое
+    # каскадное удаление комментариев вместе с постом. Удаление
+    # комментариев пачками уменьшает счетчики само (comments_removed).
+    if created and not raw:
+        comment_added(instance.post_id)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_feeds_on_save(sender, instance, raw, **kwargs):
+    if not raw:
+        feeds.post_changed(
+            instance, getattr(instance, '_old_group_id', None)
+        )
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_feeds_on_delete(sender, instance, **kwargs):
+    feeds.post_changed(instance)
+
+
+@receiver(post_save, sender=Deletion)
+def invalidate_feeds_on_deletion(sender, instance, created, **kwargs):
+    # Удаляемые объекты скрываются сразу, а их посты есть во многих лентах
+    if created:
+        feeds.invalidate_all()
+
+
+# Модель -> (лента объекта, поля, которые выводятся в лентах)
+FEED_FIELDS = {
+    Group: ('group', ('title',)),
+    User: ('author', ('username', 'first_name', 'last_name')),
+}
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=User)
+def remember_feed_names(sender, instance, raw, update_fields, **kwargs):
+    """Запоминаем название группы или имя автора до сохранения."""
+    _, fields = FEED_FIELDS[sender]
+    instance._old_feed_names = None
+    if raw or not instance.pk:
+        return
+    if update_fields is not None and not set(fields) & set(update_fields):
+        # Например, last_login при входе
+        return
+    instance._old_feed_names = sender.objects.filter(
+        pk=instance.pk
+    ).values_list(*fields).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=User)
+def invalidate_feeds_on_rename(sender, instance, raw, **kwargs):
+    scope, fields = FEED_FIELDS[sender]
+    old = getattr(instance, '_old_feed_names', None)
+    if raw or old is None:
+        return
+    if old != tuple(getattr(instance, field) for field in fields):
+        feeds.renamed(f'{scope}:{instance.pk}')
+
+
+@receiver(post_delete, sender=DataExport)
+def remove_export_file(sender, instance, **kwargs):
+    remove_file(instance)
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, raw, **kwargs):
+    old_image = getattr(instance, '_old_image', '')
+    if not raw and old_image and old_image != instance.image.name:
+        content_storage.delete(old_image)
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    # Картинку могут делить несколько постов: хранилище считает ссылки
+    if instance.image:
+        content_storage.delete(instance.image.name)
+
+
+def post_pages(post_id, author_id, group_ids):
+    """Страницы, на которых виден пост."""
+    pages = [reverse('posts:index'), reverse('posts:post_detail', args=[
+        post_id
+    ])]
+    username = User.objects.filter(id=author_id).values_list(
+        'username', flat=True
+    ).first()
+    if username is not None:
+        pages.append(reverse('posts:profile', args=[username]))
+    for slug in Group.objects.filter(id__in=group_ids).values_list(
+        'slug', flat=True
+    ):
+        pages.append(reverse('posts:group_post', args=[slug]))
+    return pages
+
+
+def invalidate_snapshots(pages):
+    # Перерисовывать можно только после коммита, иначе снимок увидит
+    # старые данные
+    transaction.on_commit(lambda: snapshots.invalidate(*pages))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_snapshots(sender, instance, raw=False, **kwargs):
+    if raw or not snapshots.is_enabled():
+        return
+    group_ids = {instance.group_id, getattr(instance, '_old_group_id', None)}
+    invalidate_snapshots(post_pages(
+        instance.id, instance.author_id, group_ids - {None}
+    ))
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_comment_snapshots(sender, instance, raw, **kwargs):
+    # Счетчик комментариев виден в карточке поста на всех лентах
+    if raw or not snapshots.is_enabled():
+        return
+    post = Post.objects.filter(id=instance.post_id).values(
+        'author_id', 'group_id'
+    ).first()
+    if post is not None:
+        invalidate_snapshots(post_pages(
+            instance.post_id, post['author_id'], {post['group_id']} - {None}
+        ))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_snapshots(sender, instance, raw=False, **kwargs):
+    # Профили обеих сторон показывают число подписчиков и подписок
+    if raw or not snapshots.is_enabled():
+        return
+    invalidate_snapshots([
+        reverse('posts:profile', args=[username])
+        for username in User.objects.filter(
+            id__in=(instance.user_id, instance.author_id)
+        ).values_list('username', flat=True)
+    ])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Deletion)
+def clear_snapshots(sender, instance, raw=False, **kwargs):
+    # Название группы есть в карточках всех лент, а скрытие удаляемого
+    # объекта касается многих страниц
+    if not raw and snapshots.is_enabled():
+        transaction.on_commit(snapshots.clear)
+
+
+# Модель -> (вид ключа posts.lookups, поле, по которому ищется строка)
+LOOKUP_FIELDS = {Group: ('group', 'slug'), User: ('user', 'username')}
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=User)
+def remember_lookup_name(sender, instance, raw, update_fields, **kwargs):
+    """Запоминаем прежние slug или username: после переименования ключ
+    старого имени тоже надо сбросить."""
+    _, field = LOOKUP_FIELDS[sender]
+    instance._old_lookup_name = None
+    if raw or not instance.pk:
+        return
+    if update_fields is not None and field not in update_fields:
+        # Например, last_login при входе
+        return
+    instance._old_lookup_name = sender.objects.filter(
+        pk=instance.pk
+    ).values_list(field, flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+def forget_lookup(sender, instance, **kwargs):
+    # Новый объект тоже сбрасывает ключ: там могла лежать отметка промаха
+    kind, field = LOOKUP_FIELDS[sender]
+    lookups.forget(
+        kind, getattr(instance, field),
+        getattr(instance, '_old_lookup_name', None),
+    )
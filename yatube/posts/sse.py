@@ -0,0 +1,153 @@
+"""ASGI-приложение с потоком Server-Sent Events о новых постах.
+
+Соединения висят в цикле asyncio, а не занимают по потоку каждое.
+Шина событий локальная, поэтому приложение должно работать в том же
+процессе, что и post_create.
+"""
+import asyncio
+import json
+from http.cookies import SimpleCookie
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from .events import STREAM_PATH, broker, post_event  # noqa: F401
+from .models import Follow, Post
+
+
+# Как часто слать комментарий-пинг, чтобы прокси не рвали соединение
+HEARTBEAT = 15
+# Сколько пропущенных постов досылаем при переподключении
+REPLAY_LIMIT = 50
+
+
+def _headers(scope):
+    return {
+        name.decode('latin-1').lower(): value.decode('latin-1')
+        for name, value in scope.get('headers', [])
+    }
+
+
+def _last_event_id(scope, headers):
+    """Last-Event-ID из заголовка или параметра last_event_id."""
+    value = headers.get('last-event-id')
+    if not value:
+        query = scope.get('query_string', b'').decode('latin-1')
+        for pair in query.split('&'):
+            name, _, raw = pair.partition('=')
+            if name == 'last_event_id':
+                value = raw
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _load_subscriber(cookie_header, last_event_id):
+    """Пользователь по сессии, его авторы и пропущенные посты.
+
+    Выполняется в пуле потоков: здесь синхронные запросы к базе.
+    """
+    try:
+        cookies = SimpleCookie(cookie_header)
+        morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+        engine = import_string(settings.SESSION_ENGINE)
+        session = engine.SessionStore(morsel.value if morsel else None)
+        user = get_user(SimpleNamespace(session=session))
+        if not user.is_authenticated:
+            return None, (), []
+        author_ids = list(
+            Follow.objects.filter(user=user).values_list(
+                'author_id', flat=True
+            )
+        )
+        missed = []
+        if last_event_id is not None and author_ids:
+            missed = [
+                post_event(*row) for row in Post.objects.filter(
+                    author_id__in=author_ids, id__gt=last_event_id
+                ).order_by('id').values_list(
+                    'id', 'author__username', 'text'
+                )[:REPLAY_LIMIT]
+            ]
+        return user.id, author_ids, missed
+    finally:
+        close_old_connections()
+
+
+def format_event(event):
+    data = json.dumps(event, ensure_ascii=False)
+    return f'id: {event["id"]}\nevent: post\ndata: {data}\n\n'.encode()
+
+
+async def _wait_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def application(scope, receive, send):
+    """Поток новых постов для ленты подписок."""
+    if scope['type'] != 'http':
+        return
+    headers = _headers(scope)
+    loop = asyncio.get_event_loop()
+    user_id, author_ids, missed = await loop.run_in_executor(
+        None, _load_subscriber,
+        headers.get('cookie', ''), _last_event_id(scope, headers),
+    )
+    if user_id is None:
+        await send({
+            'type': 'http.response.start',
+            'status': 401,
+            'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+        })
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    subscription = broker.subscribe(author_ids, loop)
+    disconnect = asyncio.ensure_future(_wait_disconnect(receive))
+    getter = None
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        body = b'retry: 5000\n\n' + b''.join(map(format_event, missed))
+        await send({
+            'type': 'http.response.body', 'body': body, 'more_body': True,
+        })
+        while not disconnect.done():
+            getter = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait(
+                {getter, disconnect},
+                timeout=HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if getter in done:
+                chunk = format_event(getter.result())
+            else:
+                getter.cancel()
+                chunk = b': ping\n\n'
+            getter = None
+            if disconnect.done():
+                break
+            await send({
+                'type': 'http.response.body',
+                'body': chunk,
+                'more_body': True,
+            })
+    finally:
+        broker.unsubscribe(subscription)
+        disconnect.cancel()
+        if getter is not None:
+            getter.cancel()
@@ -0,0 +1,54 @@
+from sorl.thumbnail import get_thumbnail
+
+from jobs.queue import enqueue
+from jobs.registry import task
+from .deletion import purge
+from .export import CLEANUP_INTERVAL, build_export, expire_exports
+from .models import Post
+from .recommendations import INTERVAL as SUGGESTIONS_INTERVAL
+from .recommendations import build_suggestions
+from .trending import INTERVAL, update_trending
+
+# Те же параметры, что и у {% thumbnail %} в шаблонах постов
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+@task('posts.warm_thumbnail')
+def warm_thumbnail(payload):
+    """Заранее создает миниатюру, чтобы ее не резал первый читатель."""
+    post = Post.objects.filter(id=payload['post_id']).only('image').first()
+    if post is not None and post.image:
+        get_thumbnail(post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+
+
+@task('posts.purge', max_attempts=20)
+def purge_deleted(payload):
+    """Удаляет строки удаляемого объекта пачками (см. posts.deletion)."""
+    if not purge(payload['deletion_id']):
+        # Осталось еще: ставим продолжение, воркер свободен для других задач
+        enqueue('posts.purge', payload)
+
+
+@task('posts.update_trending', every=INTERVAL)
+def update_trending_task(payload):
+    """Пересчитывает топ популярных постов по новым комментариям."""
+    update_trending()
+
+
+@task('posts.build_follow_suggestions', every=SUGGESTIONS_INTERVAL)
+def build_follow_suggestions(payload):
+    """Пересчитывает рекомендации "кого почитать" по графу подписок."""
+    build_suggestions()
+
+
+@task('posts.export', max_attempts=3)
+def export_data(payload):
+    """Собирает ZIP с личными данными пользователя (см. posts.export)."""
+    build_export(payload['export_id'])
+
+
+@task('posts.expire_exports', every=CLEANUP_INTERVAL)
+def expire_exports_task(payload):
+    """Удаляет просроченные выгрузки вместе с файлами."""
+    expire_exports()
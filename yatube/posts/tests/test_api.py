@@ -0,0 +1,105 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.user, group=cls.group, text=f'Пост {n}')
+            for n in range(13)
+        ])
+        cls.post = Post.objects.create(author=cls.reader, text='Чужой пост')
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ком')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FeedApiTests.reader)
+        cache.clear()
+
+    def collect(self, client, url):
+        """Проходит все страницы ленты по курсору."""
+        results = []
+        while url:
+            data = client.get(url).json()
+            results.extend(data['results'])
+            url = data['next']
+        return results
+
+    def test_cursor_pagination_walks_whole_feed(self):
+        """Курсор проходит ленту без пропусков и повторов."""
+        url = reverse('api:index')
+        first = self.client.get(url).json()
+        self.assertEqual(len(first['results']), 10)
+        results = self.collect(self.client, url)
+        ids = [item['id'] for item in results]
+        self.assertEqual(len(ids), Post.objects.count())
+        self.assertEqual(len(set(ids)), len(ids))
+
+    def test_fields_selector(self):
+        """fields= ограничивает набор полей в ответе."""
+        response = self.client.get(
+            reverse('api:group_post', args=[FeedApiTests.group.slug]),
+            {'fields': 'id,author'},
+        )
+        item = response.json()['results'][0]
+        self.assertEqual(set(item), {'id', 'author'})
+        self.assertEqual(item['author'], FeedApiTests.user.username)
+        response = self.client.get(reverse('api:index'), {'fields': 'nope'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_profile_and_missing_objects(self):
+        """Лента автора и 404 для несуществующих объектов."""
+        response = self.client.get(
+            reverse('api:profile', args=[FeedApiTests.reader.username])
+        )
+        self.assertEqual(len(response.json()['results']), 1)
+        for url in (
+            reverse('api:profile', args=['nobody']),
+            reverse('api:group_post', args=['nothing']),
+            reverse('api:post_comments', args=[0]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_follow_feed(self):
+        """Лента подписок доступна только авторизованному."""
+        url = reverse('api:follow_index')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        results = self.collect(self.authorized_client, url)
+        self.assertEqual(len(results), 13)
+
+    def test_post_comments(self):
+        """Комментарии к посту отдаются в JSON."""
+        response = self.client.get(
+            reverse('api:post_comments', args=[FeedApiTests.post.id])
+        )
+        item = response.json()['results'][0]
+        self.assertEqual(item['text'], 'Ком')
+        self.assertEqual(item['author'], FeedApiTests.user.username)
+
+    def test_conditional_get(self):
+        """Повторный запрос с ETag получает 304."""
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
@@ -0,0 +1,173 @@
+import json
+import os
+import tempfile
+import zipfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import deletion
+from ..archive import (
+    ArchiveFeed, archive_cutoff, archive_posts, drop_partition, get_archived,
+    partition_model,
+)
+from ..counters import rebuild_group_stats
+from ..export import write_archive
+from ..models import (
+    ArchiveCount, ArchivePartition, Comment, Deletion, Group, GroupStats,
+    Post,
+)
+
+User = get_user_model()
+
+
+class ArchiveTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        self.posts = []
+        now = timezone.now()
+        # 8 старых постов (два года назад и старше) и 4 свежих
+        for n in range(12):
+            post = Post.objects.create(
+                author=self.user, group=self.group, text=f'Пост {n}'
+            )
+            age = timedelta(days=800 - n * 10) if n < 8 else timedelta(0)
+            Post.objects.filter(id=post.id).update(pub_date=now - age)
+            self.posts.append(post)
+        Comment.objects.create(
+            post=self.posts[0], author=self.user, text='Старый комментарий'
+        )
+
+    def tearDown(self):
+        for year in ArchivePartition.objects.values_list('year', flat=True):
+            drop_partition(year)
+
+    def test_old_posts_moved_in_batches(self):
+        """Старые посты переносятся в архив пакетами."""
+        out = StringIO()
+        call_command('archive_posts', '--batch-size', '3', stdout=out)
+        self.assertIn('перенесено 6', out.getvalue())
+        self.assertIn('Перенесено в архив: 8', out.getvalue())
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(
+            sum(ArchivePartition.objects.values_list('post_count', flat=True)),
+            8,
+        )
+
+    def test_archived_post_detail(self):
+        """Архивный пост открывается по старому адресу, без формы."""
+        archive_posts(archive_cutoff())
+        response = Client().get(
+            reverse('posts:post_detail', args=[self.posts[0].id])
+        )
+        self.assertEqual(response.context['post'].text, 'Пост 0')
+        self.assertTrue(response.context['archived'])
+        self.assertContains(response, 'Старый комментарий')
+        self.assertNotContains(response, 'Добавить комментарий')
+        response = Client().get(reverse('posts:post_detail', args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_profile_pages_continue_into_archive(self):
+        """Постраничный вывод продолжается архивом в порядке дат."""
+        url = reverse('posts:profile', args=['auth'])
+        before = [
+            [post.id for post in Client().get(
+                url, {'page': page}
+            ).context['page_obj']]
+            for page in (1, 2)
+        ]
+        archive_posts(archive_cutoff())
+        cache.clear()
+        after = [
+            [post.id for post in Client().get(
+                url, {'page': page}
+            ).context['page_obj']]
+            for page in (1, 2)
+        ]
+        self.assertEqual(before, after)
+        response = Client().get(
+            reverse('posts:group_post', args=['test-slug']), {'page': 2}
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 12)
+
+    def test_group_stats_keep_archived_posts(self):
+        """Статистика групп учитывает архивные посты."""
+        archive_posts(archive_cutoff())
+        self.assertEqual(GroupStats.objects.get().post_count, 12)
+        rebuild_group_stats()
+        stats = GroupStats.objects.get()
+        self.assertEqual(stats.post_count, 12)
+        self.assertEqual(stats.latest_post_id, self.posts[-1].id)
+
+    def test_archive_pages_without_count(self):
+        """Лента профиля и группы берет число архивных постов из
+        ArchiveCount, а не через COUNT по таблицам архива."""
+        archive_posts(archive_cutoff())
+        counts = ArchiveCount.objects.values_list('field', 'post_count')
+        self.assertEqual(sum(total for _, total in counts), 16)
+        for url in (
+            reverse('posts:profile', args=['auth']),
+            reverse('posts:group_post', args=['test-slug']),
+        ):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = Client().get(url, {'page': 2})
+                self.assertEqual(
+                    response.context['page_obj'].paginator.count, 12
+                )
+                self.assertFalse([
+                    query['sql'] for query in queries
+                    if 'COUNT' in query['sql']
+                    and 'posts_archive_' in query['sql']
+                ])
+
+    def test_deleted_archived_posts_leave_counts(self):
+        """Скрытые и удаленные архивные посты уходят из числа постов."""
+        archive_posts(archive_cutoff())
+        post = self.posts[0]
+        model = type(get_archived(post.id))
+        Deletion.objects.create(kind=Deletion.POST, object_id=post.id)
+        feed = ArchiveFeed(Post.objects.all(), author_id=self.user.id)
+        self.assertEqual(feed.count(), 11)
+        self.assertNotIn(post.id, [item.id for item in feed[0:12]])
+        deletion.delete_posts(model, model.objects.filter(id=post.id))
+        for year in ArchivePartition.objects.values_list('year', flat=True):
+            deletion.ungroup_posts(partition_model(year), self.group.id)
+        cache.clear()
+        feed = ArchiveFeed(Post.objects.all(), author_id=self.user.id)
+        self.assertEqual(feed.count(), 11)
+        feed = ArchiveFeed(Post.objects.all(), group_id=self.group.id)
+        self.assertEqual(feed.count(), 4)
+
+    def test_export_includes_archived_comments(self):
+        """Выгрузка берет комментарии пользователя и из архива."""
+        reader = User.objects.create_user(username='reader')
+        Comment.objects.create(
+            post=self.posts[1], author=reader, text='Комментарий читателя'
+        )
+        archive_posts(archive_cutoff())
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'export.zip')
+            write_archive(reader, path)
+            with zipfile.ZipFile(path) as archive:
+                rows = [
+                    json.loads(line) for line in
+                    archive.read('comments.jsonl').decode().splitlines()
+                ]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['post_id'], self.posts[1].id)
+        self.assertEqual(rows[0]['text'], 'Комментарий читателя')
+        self.assertTrue(rows[0]['archived'])
@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..counters import comments_removed
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class CommentCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(CommentCountTests.user)
+
+    def count(self):
+        return Post.objects.get(id=CommentCountTests.post.id).comment_count
+
+    def test_add_comment_updates_card(self):
+        """Комментарий увеличивает счетчик, карточка показывает его
+        без запроса на каждый пост."""
+        for n in range(2):
+            self.authorized_client.post(
+                reverse('posts:add_comment', args=[CommentCountTests.post.id]),
+                {'text': f'Комментарий {n}'},
+            )
+        self.assertEqual(self.count(), 2)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Комментариев: 2')
+
+    def test_bulk_removal_decrements(self):
+        """Удаление комментариев пачкой уменьшает счетчик."""
+        ids = [
+            Comment.objects.create(
+                post=CommentCountTests.post, author=CommentCountTests.user,
+                text=f'Комментарий {n}',
+            ).id
+            for n in range(3)
+        ]
+        comments_removed(ids[:2])
+        Comment.objects.filter(id__in=ids[:2]).delete()
+        self.assertEqual(self.count(), 1)
+
+    def test_repair_command(self):
+        """Команда сверки чинит разошедшийся счетчик."""
+        Comment.objects.create(
+            post=CommentCountTests.post, author=CommentCountTests.user,
+            text='Комментарий',
+        )
+        Post.objects.filter(id=CommentCountTests.post.id).update(
+            comment_count=40
+        )
+        out = StringIO()
+        call_command('repair_comment_counts', stdout=out)
+        self.assertIn('Исправлено постов: 1', out.getvalue())
+        self.assertEqual(self.count(), 1)
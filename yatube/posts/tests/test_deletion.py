@@ -0,0 +1,151 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from jobs.models import Job
+from jobs.queue import run_next
+from .. import deletion
+from ..models import (
+    Comment, Deletion, Follow, FollowCounter, Group, GroupStats, Post
+)
+
+User = get_user_model()
+
+
+class BackgroundDeletionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        for n in range(7):
+            post = Post.objects.create(
+                author=self.author, group=self.group, text=f'Пост {n}'
+            )
+            Comment.objects.create(
+                post=post, author=self.reader, text=f'Комментарий {n}'
+            )
+        self.reader_post = Post.objects.create(
+            author=self.reader, group=self.group, text='Пост читателя'
+        )
+        Comment.objects.create(
+            post=self.reader_post, author=self.author, text='Ответ автора'
+        )
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        reader_client.get(reverse('posts:profile_follow', args=['author']))
+
+    def tearDown(self):
+        # Скрытые объекты кэшируются, а строки Deletion откатываются
+        cache.clear()
+
+    def run_all(self):
+        while run_next():
+            pass
+
+    def test_user_hidden_then_purged(self):
+        """Пользователь скрыт сразу, его строки удаляются в фоне."""
+        Comment.objects.create(
+            post=Post.objects.filter(author=self.author).first(),
+            author=self.author, text='Свой комментарий',
+        )
+        deletion.schedule_deletion(self.author)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [self.reader_post]
+        )
+        for name in ('posts:profile', 'posts:followers', 'posts:following'):
+            response = self.client.get(reverse(name, args=['author']))
+            self.assertEqual(response.status_code, 404)
+
+        self.run_all()
+        self.assertFalse(User.objects.filter(username='author').exists())
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Comment.objects.count(), 0)
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(
+            FollowCounter.objects.get(user=self.reader).following, 0
+        )
+        stats = GroupStats.objects.get(group=self.group)
+        self.assertEqual(stats.post_count, 1)
+        self.assertEqual(stats.latest_post_id, self.reader_post.id)
+        item = Deletion.objects.get()
+        self.assertIsNotNone(item.finished)
+        self.assertEqual(item.done, item.total)
+
+    def test_no_comments_while_purging(self):
+        """К постам удаляемого автора или группы не комментируют."""
+        post = Post.objects.filter(author=self.author).first()
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:add_comment', args=[post.id])
+        for obj in (self.group, self.author):
+            with self.subTest(obj=obj):
+                item = deletion.schedule_deletion(obj)
+                response = client.post(url, {'text': 'Поздний'})
+                self.assertEqual(response.status_code, 404)
+                self.assertFalse(Comment.objects.filter(text='Поздний'))
+                item.delete()
+                cache.clear()
+
+    def test_other_process_changes_seen_after_timeout(self):
+        """Удаление, созданное другим процессом мимо этого кэша, скрывает
+        объект не позже чем через PENDING_TIMEOUT."""
+        post_id = self.reader_post.id
+        self.assertFalse(deletion.is_hidden(Deletion.POST, post_id))
+        Deletion.objects.create(
+            kind=Deletion.POST, object_id=post_id, label='Пост'
+        )
+        self.assertFalse(deletion.is_hidden(Deletion.POST, post_id))
+        later = time.time() + deletion.PENDING_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertTrue(deletion.is_hidden(Deletion.POST, post_id))
+
+    @mock.patch.object(deletion, 'CHUNK_SIZE', 2)
+    @mock.patch.object(deletion, 'CHUNKS_PER_JOB', 2)
+    def test_purge_runs_in_chunks(self):
+        """Задача удаляет не больше заданного числа пачек и ставит
+        продолжение в очередь."""
+        item = deletion.schedule_deletion(self.author)
+        run_next()
+        item.refresh_from_db()
+        self.assertIsNone(item.finished)
+        self.assertEqual(Job.objects.filter(name='posts.purge').count(), 1)
+        self.assertFalse(deletion.purge(item.id, max_chunks=1))
+        self.run_all()
+        self.assertFalse(Post.objects.filter(author_id=item.object_id))
+
+    def test_group_deletion_keeps_posts(self):
+        """Посты удаляемой группы остаются, группа скрыта сразу."""
+        deletion.schedule_deletion(self.group)
+        response = self.client.get(
+            reverse('posts:group_post', args=['test-slug'])
+        )
+        self.assertEqual(response.status_code, 404)
+        self.run_all()
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.filter(group__isnull=True).count(), 8)
+
+    def test_admin_schedules_deletion(self):
+        """Удаление в админке ставит задачу вместо каскада."""
+        staff = User.objects.create_user(
+            username='staff', is_staff=True, is_superuser=True
+        )
+        client = Client()
+        client.force_login(staff)
+        response = client.post(
+            f'/admin/auth/user/{self.author.id}/delete/', {'post': 'yes'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(User.objects.filter(id=self.author.id).exists())
+        self.assertTrue(Deletion.objects.filter(
+            kind=Deletion.USER, object_id=self.author.id
+        ).exists())
@@ -0,0 +1,131 @@
+import io
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs.queue import run_next
+from ..export import expire_exports, export_path
+from ..models import Comment, DataExport, Follow, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_EXPORT_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, EXPORT_ROOT=TEMP_EXPORT_ROOT
+)
+class DataExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Мой комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.other)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_EXPORT_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(DataExportTests.user)
+
+    def download(self, **headers):
+        export = DataExport.objects.get(user=DataExportTests.user)
+        response = self.authorized_client.get(
+            reverse('posts:export_download', args=[export.id]), **headers
+        )
+        return response, b''.join(response.streaming_content)
+
+    def test_export_built_in_background(self):
+        """Запрос ставит задачу, архив содержит строки и картинки."""
+        url = reverse('posts:export_data')
+        self.authorized_client.post(url)
+        self.authorized_client.post(url)
+        export = DataExport.objects.get(user=DataExportTests.user)
+        self.assertEqual(export.status, DataExport.PENDING)
+        run_next()
+        export.refresh_from_db()
+        self.assertEqual(export.status, DataExport.READY)
+
+        response, body = self.download()
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertEqual(len(body), export.size)
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertIn('Пост с картинкой',
+                          archive.read('posts.jsonl').decode())
+            self.assertIn('Мой комментарий',
+                          archive.read('comments.jsonl').decode())
+            self.assertIn('other', archive.read('following.jsonl').decode())
+            self.assertEqual(
+                archive.read(f'images/{DataExportTests.post.image.name}'),
+                SMALL_GIF,
+            )
+        other = Client()
+        other.force_login(DataExportTests.other)
+        response = other.get(
+            reverse('posts:export_download', args=[export.id])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_range_download(self):
+        """Архив докачивается по Range."""
+        self.authorized_client.post(reverse('posts:export_data'))
+        run_next()
+        _, full = self.download()
+        response, body = self.download(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, full[10:20])
+        self.assertEqual(
+            response['Content-Range'], f'bytes 10-19/{len(full)}'
+        )
+        response, body = self.download(HTTP_RANGE='bytes=-5')
+        self.assertEqual(body, full[-5:])
+        export = DataExport.objects.get()
+        response = self.authorized_client.get(
+            reverse('posts:export_download', args=[export.id]),
+            HTTP_RANGE=f'bytes={len(full)}-',
+        )
+        self.assertEqual(response.status_code, 416)
+
+    def test_expired_export_removed(self):
+        """Просроченная выгрузка удаляется вместе с файлом."""
+        self.authorized_client.post(reverse('posts:export_data'))
+        run_next()
+        export = DataExport.objects.get()
+        path = export_path(export)
+        DataExport.objects.update(
+            finished=timezone.now() - timedelta(days=30)
+        )
+        self.assertEqual(expire_exports(), 1)
+        self.assertFalse(DataExport.objects.exists())
+        with self.assertRaises(FileNotFoundError):
+            open(path)
@@ -0,0 +1,124 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import feeds
+from ..models import FeedVersion, Group, Post
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Пост <в ленте>'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def body(self, response):
+        if response.streaming:
+            return b''.join(response.streaming_content).decode()
+        return response.content.decode()
+
+    def test_feeds_render(self):
+        """Ленты сайта, группы и автора в обоих форматах."""
+        urls = [
+            reverse('posts:feed', args=['rss']),
+            reverse('posts:feed', args=['atom']),
+            reverse('posts:group_feed', args=['test-slug', 'atom']),
+            reverse('posts:profile_feed', args=['auth', 'rss']),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('xml', response['Content-Type'])
+                body = self.body(response)
+                self.assertIn('Пост &lt;в ленте&gt;', body)
+                self.assertIn(
+                    reverse('posts:post_detail', args=[FeedTests.post.id]),
+                    body,
+                )
+        response = self.client.get(reverse('posts:feed', args=['json']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_cached_until_next_post(self):
+        """Повтор берется из кэша без запросов к базе, 304 по ETag,
+        новый пост меняет ленту."""
+        url = reverse('posts:feed', args=['atom'])
+        first = self.client.get(url)
+        self.body(first)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertFalse(second.streaming)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=first['ETag']
+            )
+        self.assertEqual(response.status_code, 304)
+
+        Post.objects.create(author=FeedTests.user, text='Свежий пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Свежий пост', self.body(response))
+        # Лента группы новым постом без группы не сбрасывается
+        group_url = reverse('posts:group_feed', args=['test-slug', 'rss'])
+        etag = self.client.get(group_url)['ETag']
+        Post.objects.create(author=FeedTests.user, text='Еще пост')
+        response = self.client.get(group_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_rename_refreshes_feeds(self):
+        """Новое название группы и имя автора сразу видны в лентах;
+        вход пользователя ленты не сбрасывает."""
+        group_url = reverse('posts:group_feed', args=['test-slug', 'rss'])
+        site_url = reverse('posts:feed', args=['rss'])
+        author_url = reverse('posts:profile_feed', args=['auth', 'rss'])
+        for url in (group_url, site_url, author_url):
+            self.body(self.client.get(url))
+        before = feeds.version('site')
+        self.client.force_login(FeedTests.user)
+        self.assertEqual(feeds.version('site'), before)
+        time.sleep(0.002)
+        group = Group.objects.get(id=FeedTests.group.id)
+        group.title = 'Новое название'
+        group.save()
+        for url in (group_url, site_url):
+            with self.subTest(url=url):
+                self.assertIn(
+                    'Новое название', self.body(self.client.get(url))
+                )
+        time.sleep(0.002)
+        user = User.objects.get(id=FeedTests.user.id)
+        user.first_name = 'Лев'
+        user.save()
+        self.assertIn('Лев', self.body(self.client.get(author_url)))
+
+    def test_version_shared_between_processes(self):
+        """Версия, измененная другим процессом, доходит до этого не позже
+        VERSION_TIMEOUT, и старый ETag больше не дает 304."""
+        url = reverse('posts:feed', args=['rss'])
+        etag = self.client.get(url)['ETag']
+        # Другой процесс сохранил пост: меняется только строка в базе
+        FeedVersion.objects.filter(scope='site').update(
+            version=feeds.version('site') + 1
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        later = time.time() + feeds.VERSION_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
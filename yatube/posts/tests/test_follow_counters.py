@@ -0,0 +1,89 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..counters import reconcile_follow_counters
+from ..models import Follow, FollowCounter
+
+User = get_user_model()
+
+
+class FollowCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [
+            User.objects.create_user(username=f'reader{n}') for n in range(12)
+        ]
+
+    def setUp(self):
+        self.clients = []
+        for reader in FollowCounterTests.readers:
+            client = Client()
+            client.force_login(reader)
+            self.clients.append(client)
+
+    def counter(self, user):
+        return FollowCounter.objects.get(user=user)
+
+    def test_follow_and_unfollow_update_counters(self):
+        """Подписка и отписка меняют оба счетчика ровно один раз."""
+        follow_url = reverse('posts:profile_follow', args=['author'])
+        unfollow_url = reverse('posts:profile_unfollow', args=['author'])
+        client = self.clients[0]
+        client.get(follow_url)
+        client.get(follow_url)
+        self.assertEqual(self.counter(FollowCounterTests.author).followers, 1)
+        self.assertEqual(
+            self.counter(FollowCounterTests.readers[0]).following, 1
+        )
+        client.get(unfollow_url)
+        self.assertEqual(self.counter(FollowCounterTests.author).followers, 0)
+        self.assertEqual(
+            self.counter(FollowCounterTests.readers[0]).following, 0
+        )
+
+    def test_profile_shows_counts(self):
+        """Счетчики выводятся на странице профиля."""
+        for client in self.clients[:3]:
+            client.get(reverse('posts:profile_follow', args=['author']))
+        response = self.client.get(reverse('posts:profile', args=['author']))
+        self.assertEqual(response.context['followers_count'], 3)
+        self.assertEqual(response.context['following_count'], 0)
+
+    def test_follower_list_pages(self):
+        """Список подписчиков разбит на страницы, свежие сверху."""
+        for client in self.clients:
+            client.get(reverse('posts:profile_follow', args=['author']))
+        url = reverse('posts:followers', args=['author'])
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertEqual(
+            response.context['page_obj'][0], FollowCounterTests.readers[-1]
+        )
+        response = self.client.get(url + '?page=2')
+        self.assertEqual(len(response.context['page_obj']), 2)
+        response = self.client.get(
+            reverse('posts:following', args=['reader0'])
+        )
+        self.assertEqual(
+            list(response.context['page_obj']), [FollowCounterTests.author]
+        )
+
+    def test_reconcile_repairs_counters(self):
+        """Команда сверки исправляет разъехавшиеся счетчики."""
+        Follow.objects.create(
+            user=FollowCounterTests.readers[0],
+            author=FollowCounterTests.author,
+        )
+        self.assertEqual(reconcile_follow_counters(), 2)
+        self.assertEqual(self.counter(FollowCounterTests.author).followers, 1)
+        FollowCounter.objects.filter(user=FollowCounterTests.author).update(
+            followers=40
+        )
+        call_command('repair_follow_counters', stdout=StringIO())
+        self.assertEqual(self.counter(FollowCounterTests.author).followers, 1)
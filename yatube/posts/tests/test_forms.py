@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -8,6 +9,7 @@ from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 
+from core.storage import content_name
 from ..models import Post, Group, Follow
 from ..forms import PostForm
 
@@ -80,7 +82,9 @@ class PostCreateEditFormTests(TestCase):
             follow=True
         )
         new_post = Post.objects.filter(text='Тестовый текст')[0]
-        image_path = 'posts/small.gif'
+        image_path = content_name(
+            'posts/small.gif', hashlib.sha256(self.small_gif).hexdigest()
+        )
         # Проверяем, сработал ли редирект
         self.assertRedirects(response, reverse(
             'posts:profile', args=[PostCreateEditFormTests.user.username]))
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..counters import rebuild_group_stats
+from ..models import Group, GroupStats, Post
+
+User = get_user_model()
+
+
+class GroupStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Другое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def stats(self, group):
+        return GroupStats.objects.get(group=group)
+
+    def test_stats_follow_post_changes(self):
+        """Статистика меняется при создании, переносе и удалении постов."""
+        first = Post.objects.create(
+            author=GroupStatsTests.user, group=GroupStatsTests.group,
+            text='Первый',
+        )
+        second = Post.objects.create(
+            author=GroupStatsTests.user, group=GroupStatsTests.group,
+            text='Второй',
+        )
+        stats = self.stats(GroupStatsTests.group)
+        self.assertEqual(stats.post_count, 2)
+        self.assertEqual(stats.latest_post_id, second.id)
+
+        second.group = GroupStatsTests.other_group
+        second.save()
+        stats = self.stats(GroupStatsTests.group)
+        self.assertEqual(stats.post_count, 1)
+        self.assertEqual(stats.latest_post_id, first.id)
+        self.assertEqual(
+            self.stats(GroupStatsTests.other_group).latest_post_id, second.id
+        )
+
+        first.delete()
+        stats = self.stats(GroupStatsTests.group)
+        self.assertEqual(stats.post_count, 0)
+        self.assertIsNone(stats.latest_post_id)
+        self.assertIsNone(stats.last_post_at)
+
+    def test_rebuild_matches_incremental(self):
+        """Полный пересчет совпадает с инкрементальным."""
+        for n in range(3):
+            Post.objects.create(
+                author=GroupStatsTests.user, group=GroupStatsTests.group,
+                text=f'Пост {n}',
+            )
+        before = self.stats(GroupStatsTests.group)
+        GroupStats.objects.all().delete()
+        self.assertEqual(rebuild_group_stats(), 1)
+        after = self.stats(GroupStatsTests.group)
+        self.assertEqual(
+            (before.post_count, before.latest_post_id, before.last_post_at),
+            (after.post_count, after.latest_post_id, after.last_post_at),
+        )
+
+    def test_directory_sorting(self):
+        """Каталог групп сортируется по активности и по названию."""
+        Post.objects.create(
+            author=GroupStatsTests.user, group=GroupStatsTests.group,
+            text='Пост',
+        )
+        url = reverse('posts:groups')
+        response = self.client.get(url)
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [GroupStatsTests.group, GroupStatsTests.other_group],
+        )
+        response = self.client.get(url, {'sort': 'title'})
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [GroupStatsTests.other_group, GroupStatsTests.group],
+        )
+        self.assertContains(response, 'Постов: 1')
@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.models import StoredFile
+from core.storage import content_storage, is_content_addressed
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class RehomeImagesTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_rehome_moves_flat_files(self):
+        """Команда переносит старые картинки под хэш и сливает копии."""
+        user = User.objects.create_user(username='auth')
+        posts = []
+        for name in ('posts/one.gif', 'posts/two.gif', 'posts/lost.gif'):
+            if name != 'posts/lost.gif':
+                path = content_storage.path(name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as file:
+                    file.write(b'same picture')
+            posts.append(Post.objects.create(
+                author=user, text=name, image=name
+            ))
+        out = StringIO()
+        call_command('rehome_images', '--batch-size', '2', stdout=out)
+        self.assertIn('Перенесено картинок: 2', out.getvalue())
+        self.assertIn('Файлов не найдено: 1', out.getvalue())
+        one, two, lost = [
+            Post.objects.get(id=post.id).image.name for post in posts
+        ]
+        self.assertEqual(one, two)
+        self.assertTrue(is_content_addressed(one))
+        self.assertEqual(lost, 'posts/lost.gif')
+        self.assertEqual(StoredFile.objects.get(name=one).refs, 2)
+        self.assertFalse(content_storage.exists('posts/one.gif'))
+        with content_storage.open(one) as file:
+            self.assertEqual(file.read(), b'same picture')
+        # Повторный запуск ничего не трогает
+        call_command('rehome_images', stdout=out)
+        self.assertIn('Перенесено картинок: 0', out.getvalue())
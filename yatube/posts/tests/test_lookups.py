@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core import metrics
+from .. import lookups
+from ..models import Group
+
+User = get_user_model()
+
+
+class LookupCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_second_lookup_hits_cache(self):
+        self.assertEqual(lookups.get_group('group'), self.group)
+        self.assertEqual(lookups.get_user('auth'), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(lookups.get_group('group'), self.group)
+            self.assertEqual(lookups.get_user('auth'), self.user)
+        self.assertEqual(lookups.hit_ratio('group'), 0.5)
+        self.assertEqual(lookups.hit_ratio('user'), 0.5)
+
+    def test_miss_is_cached_until_created(self):
+        self.assertIsNone(lookups.get_group('new'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(lookups.get_group('new'))
+        group = Group.objects.create(
+            title='Новая', slug='new', description='Описание'
+        )
+        self.assertEqual(lookups.get_group('new'), group)
+
+    def test_rename_forgets_old_and_new_names(self):
+        user = User.objects.create_user(username='old')
+        lookups.get_user('old')
+        lookups.get_user('renamed')
+        user.username = 'renamed'
+        user.save()
+        self.assertIsNone(lookups.get_user('old'))
+        self.assertEqual(lookups.get_user('renamed').username, 'renamed')
+
+    def test_delete_forgets_group(self):
+        group = Group.objects.create(
+            title='Удаляемая', slug='deleted', description='Описание'
+        )
+        lookups.get_group('deleted')
+        group.delete()
+        self.assertIsNone(lookups.get_group('deleted'))
+
+    def test_views_use_cache(self):
+        url = reverse('posts:group_post', args=['group'])
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(lookups.hit_ratio('group'), 0.5)
+        response = self.client.get(reverse('posts:profile', args=['nobody']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_cached_without_password(self):
+        lookups.get_user('auth')
+        cached = cache.get(lookups.lookup_key('user', 'auth'))
+        self.assertEqual(cached, self.user)
+        self.assertNotIn('password', cached.__dict__)
+        self.assertNotIn('email', cached.__dict__)
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, DataExport, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class ViewQueryBudgetTests(TestCase):
+    """Представления posts укладываются в бюджет и не делают N+1.
+
+    Постов, авторов и групп больше порога N+1, поэтому запрос в цикле
+    по карточкам уронил бы тест с QueryBudgetExceeded.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        groups = [
+            Group.objects.create(
+                title=f'Группа {number}', slug=f'group-{number}',
+                description='Описание',
+            )
+            for number in range(4)
+        ]
+        cls.users = [
+            User.objects.create_user(username=f'user{number}')
+            for number in range(5)
+        ]
+        cls.user = cls.users[0]
+        for number in range(12):
+            post = Post.objects.create(
+                author=cls.users[number % 5],
+                group=groups[number % 4],
+                text=f'Пост {number}',
+            )
+            for author in cls.users:
+                Comment.objects.create(
+                    post=post, author=author, text='Комментарий'
+                )
+        for author in cls.users[1:]:
+            Follow.objects.create(user=cls.user, author=author)
+            Follow.objects.create(user=author, author=cls.user)
+        cls.post = Post.objects.filter(author=cls.user).first()
+        cls.export = DataExport.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_read_views(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:trending'),
+            reverse('posts:groups'),
+            reverse('posts:group_post', args=['group-1']),
+            reverse('posts:profile', args=['user0']),
+            reverse('posts:profile', args=['user1']),
+            reverse('posts:followers', args=['user0']),
+            reverse('posts:following', args=['user0']),
+            reverse('posts:post_detail', args=[self.post.id]),
+            reverse('posts:follow_index'),
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', args=[self.post.id]),
+            reverse('posts:export_data'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_feeds(self):
+        urls = [
+            reverse('posts:feed', args=['rss']),
+            reverse('posts:group_feed', args=['group-1', 'atom']),
+            reverse('posts:profile_feed', args=['user1', 'rss']),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                # Запросы ленты идут при отдаче тела
+                b''.join(response.streaming_content)
+
+    def test_write_views(self):
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.id]),
+            {'text': 'Новый комментарий'},
+        )
+        self.client.post(reverse('posts:post_create'), {'text': 'Новый'})
+        self.client.post(
+            reverse('posts:post_edit', args=[self.post.id]),
+            {'text': 'Правка'},
+        )
+        self.client.get(reverse('posts:profile_unfollow', args=['user1']))
+        self.client.get(reverse('posts:profile_follow', args=['user1']))
+        self.client.post(reverse('posts:export_data'))
+        self.assertTrue(
+            Follow.objects.filter(user=self.user, author__username='user1')
+        )
@@ -0,0 +1,102 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import recommendations
+from ..models import Follow, FollowSuggestion
+
+User = get_user_model()
+
+
+class FollowSuggestionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.leo = User.objects.create_user(username='leo')
+        cls.anna = User.objects.create_user(username='anna')
+        cls.boris = User.objects.create_user(username='boris')
+        cls.reader = User.objects.create_user(username='reader')
+        # Читатели Льва обычно читают и Анну, Бориса - только один
+        for n in range(3):
+            fan = User.objects.create_user(username=f'fan{n}')
+            Follow.objects.create(user=fan, author=cls.leo)
+            Follow.objects.create(user=fan, author=cls.anna)
+        Follow.objects.create(user=fan, author=cls.boris)
+        Follow.objects.create(user=cls.reader, author=cls.leo)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(FollowSuggestionTests.reader)
+
+    def authors(self, user):
+        return list(FollowSuggestion.objects.filter(user=user).values_list(
+            'author__username', flat=True
+        ))
+
+    def test_co_followed_authors_ranked(self):
+        """Рекомендуются авторы с общими читателями, кроме уже
+        прочитанных; блоки меньше числа пользователей."""
+        recommendations.build_suggestions(block_size=2)
+        self.assertEqual(
+            self.authors(FollowSuggestionTests.reader), ['anna', 'boris']
+        )
+        fan = User.objects.get(username='fan2')
+        self.assertEqual(self.authors(fan), [])
+
+    @mock.patch.object(recommendations, 'FOLLOWING_SAMPLE', 2)
+    @mock.patch.object(recommendations, 'IN_CHUNK', 2)
+    def test_followed_authors_outside_sample_not_suggested(self):
+        """Счет считается по последним подпискам, но исключаются все;
+        списки id в IN режутся на пачки."""
+        reader = FollowSuggestionTests.reader
+        Follow.objects.create(user=reader, author=FollowSuggestionTests.anna)
+        Follow.objects.create(user=reader, author=FollowSuggestionTests.boris)
+        recommendations.build_suggestions(block_size=2)
+        self.assertEqual(self.authors(reader), [])
+        self.assertEqual(
+            self.authors(User.objects.get(username='fan0')), ['boris']
+        )
+
+    def test_rebuild_replaces_rows(self):
+        """Повторный пересчет не копит старые рекомендации."""
+        out = StringIO()
+        call_command('build_follow_suggestions', stdout=out)
+        Follow.objects.create(
+            user=FollowSuggestionTests.reader,
+            author=FollowSuggestionTests.anna,
+        )
+        call_command('build_follow_suggestions', stdout=out)
+        self.assertIn('Готово, пользователей: 4', out.getvalue())
+        self.assertEqual(
+            self.authors(FollowSuggestionTests.reader), ['boris']
+        )
+
+    def test_unfollowed_everyone_loses_suggestions(self):
+        """Отписавшийся от всех не сохраняет старые рекомендации."""
+        reader = FollowSuggestionTests.reader
+        recommendations.build_suggestions()
+        self.assertTrue(self.authors(reader))
+        Follow.objects.filter(user=reader).delete()
+        recommendations.build_suggestions()
+        self.assertEqual(self.authors(reader), [])
+
+    def test_follow_page_and_follow_action(self):
+        """Лента подписок показывает рекомендации, подписка убирает их."""
+        recommendations.build_suggestions()
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [item.author for item in response.context['suggestions']],
+            [FollowSuggestionTests.anna, FollowSuggestionTests.boris],
+        )
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=['anna'])
+        )
+        self.assertEqual(
+            self.authors(FollowSuggestionTests.reader), ['boris']
+        )
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import snapshots
+from jobs.models import Job
+from jobs.queue import run_next
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+TEMP_SNAPSHOT_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    STATIC_SNAPSHOTS=True,
+    SNAPSHOT_ROOT=TEMP_SNAPSHOT_ROOT,
+    SNAPSHOT_PUBLISH_DELAY=0,
+)
+class SnapshotTests(TransactionTestCase):
+    # Снимки сбрасываются после коммита
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.user, group=self.group, text='Первый пост'
+        )
+        self.url = reverse('posts:group_post', args=['test-slug'])
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_SNAPSHOT_ROOT, ignore_errors=True)
+        cache.clear()
+
+    def snapshot(self, url):
+        return snapshots.read(snapshots.snapshot_path(url))
+
+    def test_anonymous_served_from_snapshot(self):
+        """Первый анонимный запрос пишет снимок, следующие его читают;
+        вошедшие пользователи снимков не получают."""
+        response = self.client.get(self.url)
+        self.assertIsNotNone(response.context)
+        self.assertEqual(self.snapshot(self.url), response.content)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Snapshot'], 'hit')
+        self.assertIsNone(response.context)
+        self.assertEqual(response['X-Frame-Options'], 'SAMEORIGIN')
+        self.assertContains(response, 'Первый пост')
+
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        response = authorized_client.get(self.url)
+        self.assertFalse(response.has_header('X-Snapshot'))
+        response = self.client.get(self.url, {'page': 2})
+        self.assertFalse(response.has_header('X-Snapshot'))
+
+    def test_changes_republish_affected_pages(self):
+        """Новый пост сбрасывает только свои страницы, задача
+        перерисовывает их."""
+        detail_url = reverse('posts:post_detail', args=[self.post.id])
+        about_url = reverse('about:author')
+        for url in (self.url, detail_url, about_url):
+            self.client.get(url)
+        Post.objects.create(
+            author=self.user, group=self.group, text='Второй пост'
+        )
+        self.assertIsNone(self.snapshot(self.url))
+        self.assertIsNotNone(self.snapshot(detail_url))
+        self.assertIsNotNone(self.snapshot(about_url))
+        job = Job.objects.filter(name='core.publish_snapshots').last()
+        self.assertIn(self.url, job.payload)
+        while run_next():
+            pass
+        self.assertIn('Второй пост', self.snapshot(self.url).decode())
+
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        self.assertIsNone(self.snapshot(detail_url))
+        self.assertTrue(os.path.exists(snapshots.snapshot_path(about_url)))
+
+    def test_stale_page_not_written_after_invalidation(self):
+        """Отметка сброса лежит в SNAPSHOT_ROOT и видна всем процессам:
+        страница, отрисованная до сброса, снимком не становится."""
+        path = snapshots.snapshot_path(self.url)
+        rendered = time.time() - 5
+        snapshots.clear()
+        # Другой процесс: его кэш ничего не знает о сбросе
+        cache.clear()
+        self.assertFalse(snapshots.write(path, b'old', rendered))
+        self.assertIsNone(self.snapshot(self.url))
+        self.assertTrue(snapshots.write(path, b'new', time.time()))
+        self.assertEqual(self.snapshot(self.url), b'new')
+
+    @override_settings(SHARED_PAGE_CACHE=True)
+    def test_shared_cache_page_not_written_after_invalidation(self):
+        """Страница из общего кэша несет время отрисовки: старая копия
+        не становится снимком, а перерисовка не отдает старый снимок."""
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        authorized_client.get(self.url)
+        self.assertIsNone(self.snapshot(self.url))
+        Post.objects.create(
+            author=self.user, group=self.group, text='Второй пост'
+        )
+        response = self.client.get(self.url)
+        self.assertNotContains(response, 'Второй пост')
+        self.assertIsNone(self.snapshot(self.url))
+        snapshots.write(
+            snapshots.snapshot_path(self.url), b'old', time.time()
+        )
+        # Общий кэш истек, задача перерисовывает страницу
+        cache.clear()
+        self.assertEqual(snapshots.render(self.url), 200)
+        self.assertIn('Второй пост'.encode(), self.snapshot(self.url))
@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TransactionTestCase
+from django.urls import reverse
+
+from ..events import Broker, publish_post
+from ..models import Follow, Post
+from ..sse import application
+
+User = get_user_model()
+
+
+async def wait_for(predicate, timeout=2):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError('Не дождались события')
+
+
+class StreamClient:
+    """Запускает ASGI-приложение и копит отправленные сообщения."""
+
+    def __init__(self, cookie='', query=b''):
+        self.scope = {
+            'type': 'http',
+            'path': '/follow/stream/',
+            'query_string': query,
+            'headers': [(b'cookie', cookie.encode())],
+        }
+        self.messages = []
+        self.closed = asyncio.Event()
+
+    async def receive(self):
+        await self.closed.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        self.messages.append(message)
+
+    def start(self):
+        return asyncio.ensure_future(
+            application(self.scope, self.receive, self.send)
+        )
+
+    def events(self):
+        body = b''.join(m.get('body', b'') for m in self.messages)
+        return [
+            json.loads(line[len('data: '):])
+            for line in body.decode().splitlines()
+            if line.startswith('data: ')
+        ]
+
+
+class BrokerTests(TransactionTestCase):
+    def test_publish_reaches_only_author_subscribers(self):
+        """Событие получают только подписчики автора."""
+        broker = Broker()
+
+        async def scenario():
+            first = broker.subscribe([1, 2])
+            second = broker.subscribe([3])
+            self.assertEqual(broker.publish(1, {'id': 10}), 1)
+            self.assertEqual(await first.queue.get(), {'id': 10})
+            self.assertTrue(second.queue.empty())
+            broker.unsubscribe(first)
+            self.assertEqual(broker.publish(1, {'id': 11}), 0)
+
+        asyncio.run(scenario())
+
+
+class FollowStreamTests(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.old_post = Post.objects.create(author=self.author, text='Старый')
+        self.missed_post = Post.objects.create(
+            author=self.author, text='Пропущенный'
+        )
+        client = Client()
+        client.force_login(self.reader)
+        self.client = client
+        session = client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.cookie = f'{settings.SESSION_COOKIE_NAME}={session}'
+
+    def test_anonymous_gets_401(self):
+        """Без сессии поток не открывается."""
+        stream = StreamClient()
+        asyncio.run(application(stream.scope, stream.receive, stream.send))
+        self.assertEqual(stream.messages[0]['status'], 401)
+
+    def test_replay_and_live_events(self):
+        """Переподключение досылает пропущенное, новые посты приходят."""
+        query = f'last_event_id={self.old_post.id}'.encode()
+        stream = StreamClient(self.cookie, query)
+
+        async def scenario():
+            task = stream.start()
+            await wait_for(lambda: len(stream.messages) >= 2)
+            self.assertEqual(stream.messages[0]['status'], 200)
+            new_post = Post.objects.create(author=self.author, text='Новый')
+            publish_post(new_post)
+            await wait_for(lambda: len(stream.messages) >= 3)
+            stream.closed.set()
+            await task
+            return new_post
+
+        new_post = asyncio.run(scenario())
+        ids = [event['id'] for event in stream.events()]
+        self.assertEqual(ids, [self.missed_post.id, new_post.id])
+
+    def test_follow_page_streams_from_newest_post(self):
+        """Поток открывает только первая страница ленты, начиная с
+        самого нового поста."""
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {n}')
+            for n in range(10)
+        ]
+        url = reverse('posts:follow_index')
+        response = self.client.get(url)
+        self.assertEqual(response.context['stream_last_id'], posts[-1].id)
+        self.assertContains(response, 'EventSource')
+        response = self.client.get(url, {'page': 2})
+        self.assertNotIn('stream_last_id', response.context)
+        self.assertNotContains(response, 'EventSource')
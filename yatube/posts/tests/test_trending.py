@@ -0,0 +1,109 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Post, TrendingScore
+from ..trending import (
+    log_add, log_weight, top_post_ids, update_trending, update_window
+)
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.old_hit = Post.objects.create(author=cls.user, text='Было')
+        cls.new_hit = Post.objects.create(author=cls.user, text='Стало')
+        cls.quiet = Post.objects.create(author=cls.user, text='Тишина')
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, post, age):
+        comment = Comment.objects.create(
+            post=post, author=TrendingTests.user, text='Комментарий'
+        )
+        Comment.objects.filter(id=comment.id).update(
+            created=timezone.now() - age
+        )
+
+    def test_recent_activity_ranks_higher(self):
+        """Свежие комментарии весят больше старых."""
+        for _ in range(3):
+            self.comment(TrendingTests.old_hit, timedelta(days=1))
+        for _ in range(2):
+            self.comment(TrendingTests.new_hit, timedelta(minutes=5))
+        update_trending()
+        self.assertEqual(
+            top_post_ids('day'),
+            [TrendingTests.new_hit.id, TrendingTests.old_hit.id],
+        )
+        # За неделю старая активность еще весит больше
+        self.assertEqual(top_post_ids('week')[0], TrendingTests.old_hit.id)
+
+    def test_update_is_incremental(self):
+        """Повторный пересчет читает только новые комментарии."""
+        self.comment(TrendingTests.quiet, timedelta(0))
+        self.assertEqual(update_trending(), {'day': 1, 'week': 1})
+        self.assertEqual(update_trending(), {'day': 0, 'week': 0})
+        self.comment(TrendingTests.quiet, timedelta(0))
+        self.assertEqual(update_trending()['day'], 1)
+        self.assertEqual(
+            TrendingScore.objects.filter(window='day').count(), 1
+        )
+
+    def test_failed_update_resumes_after_saved_batch(self):
+        """После падения на середине уже учтенные пачки не прибавляются
+        второй раз."""
+        for _ in range(2):
+            self.comment(TrendingTests.quiet, timedelta(0))
+        bulk_update = TrendingScore.objects.bulk_update
+        calls = []
+
+        def fail_second_batch(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError
+            return bulk_update(*args, **kwargs)
+
+        with mock.patch('posts.trending.BATCH_SIZE', 1):
+            with mock.patch.object(
+                TrendingScore.objects, 'bulk_update',
+                side_effect=fail_second_batch,
+            ):
+                with self.assertRaises(RuntimeError):
+                    update_window('day')
+            self.assertEqual(update_window('day'), 1)
+        weights = [
+            log_weight(created, 6 * 60 * 60)
+            for created in Comment.objects.values_list('created', flat=True)
+        ]
+        self.assertAlmostEqual(
+            TrendingScore.objects.get(window='day').log_score,
+            log_add(*weights),
+        )
+
+    def test_page_served_from_snapshot(self):
+        """Вкладка показывает готовый топ, старые посты выбывают."""
+        self.comment(TrendingTests.new_hit, timedelta(0))
+        self.comment(TrendingTests.quiet, timedelta(days=5))
+        update_trending()
+        response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(
+            list(response.context['page_obj']), [TrendingTests.new_hit]
+        )
+        response = self.client.get(
+            reverse('posts:trending'), {'window': 'week'}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [TrendingTests.new_hit, TrendingTests.quiet],
+        )
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -9,6 +10,7 @@ from django.urls import reverse
 from django import forms
 from django.core.cache import cache
 
+from core.storage import content_name
 from ..models import Group, Post
 
 User = get_user_model()
@@ -52,6 +54,10 @@ class PostsPagesTests(TestCase):
             group=cls.group,
             image=cls.uploaded,
         )
+        # Картинка хранится под хэшем содержимого (core.storage)
+        cls.image_path = content_name(
+            'posts/small.gif', hashlib.sha256(cls.small_gif).hexdigest()
+        )
 
     @classmethod
     def tearDownClass(cls):
@@ -124,7 +130,7 @@ class PostsPagesTests(TestCase):
         response = self.client.get(reverse('posts:index'))
         # Взяли первый элемент из списка и проверили, что его содержание
         # совпадает с ожидаемым
-        image_path = 'posts/small.gif'
+        image_path = PostsPagesTests.image_path
         first_object = response.context['page_obj'][0]
         self.assertEqual(first_object.text, 'Тестовый пост')
         self.assertEqual(first_object.author, PostsPagesTests.user)
@@ -157,7 +163,9 @@ class PostsPagesTests(TestCase):
         self.assertEqual(
             response.context.get('post').author, PostsPagesTests.user
         )
-        self.assertEqual(response.context.get('post').image, 'posts/small.gif')
+        self.assertEqual(
+            response.context.get('post').image, PostsPagesTests.image_path
+        )
 
     def test_post_exists_on_index_author_group_pages(self):
         """Новый пост отображается на нужных страницах."""
@@ -218,3 +226,12 @@ class PaginatorViewsTest(TestCase):
             # Проверка: на второй странице должно быть три поста.
             response = self.client.get(reverse(url, args=args) + '?page=2')
             self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_page_links_keep_other_parameters(self):
+        """Ссылки страниц сохраняют параметры запроса, кроме page."""
+        url = reverse('posts:profile', args=[self.user.username])
+        response = self.client.get(url, {'page': 2, 'ref': 'mail'})
+        self.assertContains(response, 'href="?ref=mail&page=1"')
+        response = self.client.get(url)
+        self.assertContains(response, 'href="?page=2"')
+        self.assertNotContains(response, 'sort=')
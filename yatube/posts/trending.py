@@ -0,0 +1,128 @@
+"""Популярные посты: ранжирование по затухающей активности комментариев.
+
+Каждый комментарий весит 2 ** ((created - EPOCH) / half_life): вес
+растет со временем так же, как затухают старые. Поэтому добавить новый
+комментарий - значит прибавить его вес к сумме поста, а старые суммы
+пересчитывать не нужно. Суммы хранятся как log2 (TrendingScore), иначе
+они переполнили бы float. Периодическая задача posts.update_trending
+учитывает только комментарии после прошлого запуска и сохраняет топ
+окна в Trending; страница читает готовый топ из строки Trending через
+кэш на CACHE_TIMEOUT. Задача идет в процессе run_workers, поэтому
+ее запись в кэш может не дойти до веб-воркеров с локальным кэшем:
+короткий срок ограничивает, насколько их топ отстает.
+"""
+import json
+import math
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Comment, Trending, TrendingScore
+
+# Окно -> период полураспада веса комментария, секунд
+WINDOWS = {
+    'day': 6 * 60 * 60,
+    'week': 2 * 24 * 60 * 60,
+}
+DEFAULT_WINDOW = 'day'
+# Сколько постов хранится в топе окна
+TOP_SIZE = 100
+# Как часто пересчитывать топ, секунд
+INTERVAL = 5 * 60
+# Посты, чей затухший счет упал ниже, выбывают из таблицы
+MIN_SCORE = 0.05
+# Сколько новых комментариев читается за один запрос
+BATCH_SIZE = 5000
+# Сколько держать топ в кэше процесса, секунд
+CACHE_TIMEOUT = 60
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def cache_key(window):
+    return f'trending:{window}'
+
+
+def log_weight(created, half_life):
+    return (created - EPOCH).total_seconds() / half_life
+
+
+def log_add(a, b):
+    """log2(2 ** a + 2 ** b) без переполнения."""
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def update_window(window, now=None):
+    """Учитывает новые комментарии окна; возвращает их число."""
+    now = now or timezone.now()
+    half_life = WINDOWS[window]
+    state, _ = Trending.objects.get_or_create(window=window)
+    total = 0
+    while True:
+        rows = list(Comment.objects.filter(
+            id__gt=state.last_comment_id
+        ).order_by('id').values_list('id', 'post_id', 'created')[:BATCH_SIZE])
+        if not rows:
+            break
+        added = {}
+        for _, post_id, created in rows:
+            added[post_id] = log_add(
+                added.get(post_id), log_weight(created, half_life)
+            )
+        # Счет и позиция сохраняются вместе: упавший или повторный
+        # запуск продолжит со следующей пачки и не прибавит эту дважды
+        with transaction.atomic():
+            scores = {
+                score.post_id: score
+                for score in TrendingScore.objects.filter(
+                    window=window, post_id__in=added
+                )
+            }
+            for post_id, value in added.items():
+                score = scores.get(post_id)
+                if score is not None:
+                    score.log_score = log_add(score.log_score, value)
+            TrendingScore.objects.bulk_update(
+                scores.values(), ['log_score']
+            )
+            TrendingScore.objects.bulk_create([
+                TrendingScore(
+                    window=window, post_id=post_id, log_score=value
+                )
+                for post_id, value in added.items() if post_id not in scores
+            ])
+            state.last_comment_id = rows[-1][0]
+            state.save(update_fields=['last_comment_id'])
+        total += len(rows)
+    # Выбывшие из окна посты: их затухший счет меньше MIN_SCORE
+    TrendingScore.objects.filter(
+        window=window,
+        log_score__lt=log_weight(now, half_life) + math.log2(MIN_SCORE),
+    ).delete()
+    top = list(TrendingScore.objects.filter(window=window).order_by(
+        '-log_score'
+    ).values_list('post_id', flat=True)[:TOP_SIZE])
+    state.post_ids = json.dumps(top)
+    state.computed = now
+    state.save(update_fields=['post_ids', 'computed'])
+    cache.set(cache_key(window), top, CACHE_TIMEOUT)
+    return total
+
+
+def update_trending(now=None):
+    return {window: update_window(window, now) for window in WINDOWS}
+
+
+def top_post_ids(window):
+    """Готовый топ окна: из кэша, иначе из последнего снимка."""
+    ids = cache.get(cache_key(window))
+    if ids is None:
+        state = Trending.objects.filter(window=window).first()
+        ids = json.loads(state.post_ids) if state else []
+        cache.set(cache_key(window), ids, CACHE_TIMEOUT)
+    return ids
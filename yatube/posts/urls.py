@@ -6,8 +6,21 @@ app_name = 'posts'
 
 urlpatterns = [
     path('group/<slug:slug>/', views.group_post, name='group_post'),
+    path(
+        'group/<slug:slug>/feed/<str:fmt>/',
+        views.group_feed,
+        name='group_feed',
+    ),
+    path('groups/', views.group_index, name='groups'),
     path('', views.index, name='index'),
+    path('trending/', views.trending, name='trending'),
+    path('feed/<str:fmt>/', views.site_feed, name='feed'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/feed/<str:fmt>/',
+        views.profile_feed,
+        name='profile_feed',
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
@@ -22,9 +35,25 @@ urlpatterns = [
         views.profile_follow,
         name='profile_follow',
     ),
+    path(
+        'profile/<str:username>/followers/',
+        views.follower_list,
+        name='followers',
+    ),
+    path(
+        'profile/<str:username>/following/',
+        views.following_list,
+        name='following',
+    ),
     path(
         'profile/<str:username>/unfollow/',
         views.profile_unfollow,
         name='profile_unfollow',
     ),
+    path('export/', views.export_data, name='export_data'),
+    path(
+        'export/<int:export_id>/download/',
+        views.export_download,
+        name='export_download',
+    ),
 ]
@@ -1,27 +1,64 @@
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.cache import cache_page
 
+from core.http import file_response
+from core.query_budget import query_budget
+from core.ratelimit import ratelimit
+from jobs.queue import enqueue
+from .archive import ArchiveFeed, get_archived
+from .counters import change_follow_counters, follow_counts
+from .deletion import is_hidden, pending, visible_posts
+from .events import STREAM_PATH, publish_post
+from .export import export_path, request_export
+from .feeds import feed_response
 from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Follow
+from .lookups import group_or_404, user_or_404
+from .models import (
+    DataExport, Deletion, Post, Group, User, Follow, FollowSuggestion
+)
+from .recommendations import suggestions_for
+from .trending import DEFAULT_WINDOW, WINDOWS, top_post_ids
 
 
 POSTS_ON_PAGE = 10
 
+# Варианты сортировки каталога групп
+GROUP_SORTS = {
+    'activity': (F('stats__last_post_at').desc(nulls_last=True), 'title'),
+    'posts': (F('stats__post_count').desc(nulls_last=True), 'title'),
+    'title': ('title',),
+}
 
-def custom_paginator(request, post_list):
+
+def custom_paginator(request, post_list, count=None):
     paginator = Paginator(post_list, POSTS_ON_PAGE)
+    if count is not None:
+        # Известное заранее число объектов избавляет от COUNT(*)
+        paginator.count = count
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    # Остальные параметры (сортировка, окно топа) ссылки страниц
+    # сохраняют (includes/paginator.html)
+    query = request.GET.copy()
+    query.pop('page', None)
+    page_obj.querystring = query.urlencode()
     return page_obj
 
 
+@query_budget(8)
 @cache_page(20, key_prefix='index_page')
 def index(request):
     """Функция-обработчик главной страницы."""
     template = 'posts/index.html'
-    post_list = Post.objects.all()
+    post_list = ArchiveFeed(
+        Post.objects.select_related('author', 'group')
+    )
     context = {
         'page_obj': custom_paginator(request, post_list),
         'index': True,
@@ -29,10 +66,37 @@ def index(request):
     return render(request, template, context)
 
 
+@query_budget(4)
+def trending(request):
+    """Популярные посты из готового топа, без агрегации комментариев."""
+    window = request.GET.get('window')
+    if window not in WINDOWS:
+        window = DEFAULT_WINDOW
+    page_obj = custom_paginator(request, top_post_ids(window))
+    # Посты страницы - одним запросом, в порядке топа
+    page_ids = list(page_obj.object_list)
+    posts = visible_posts(Post.objects.filter(id__in=page_ids)).select_related(
+        'author', 'group'
+    ).in_bulk()
+    page_obj.object_list = [posts[pk] for pk in page_ids if pk in posts]
+    context = {
+        'page_obj': page_obj,
+        'trending': True,
+        'window': window,
+        'windows': WINDOWS,
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@query_budget(8)
 def group_post(request, slug):
     """Функция-обработчик страницы запрощенной группы."""
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.post.all()
+    group = group_or_404(slug)
+    if is_hidden(Deletion.GROUP, group.id):
+        raise Http404
+    post_list = ArchiveFeed(
+        group.post.select_related('author'), group_id=group.id
+    )
     context = {
         'page_obj': custom_paginator(request, post_list),
         'group': group,
@@ -40,28 +104,140 @@ def group_post(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(5)
+@cache_page(20, key_prefix='groups_page')
+def group_index(request):
+    """Каталог групп по готовой статистике, без агрегации постов."""
+    sort = request.GET.get('sort')
+    if sort not in GROUP_SORTS:
+        sort = 'activity'
+    group_list = Group.objects.select_related(
+        'stats', 'stats__latest_post'
+    ).exclude(
+        id__in=pending()[Deletion.GROUP]
+    ).order_by(*GROUP_SORTS[sort])
+    context = {
+        'page_obj': custom_paginator(request, group_list),
+        'sort': sort,
+    }
+    return render(request, 'posts/groups.html', context)
+
+
+@query_budget(10)
 def profile(request, username):
     """Здесь код запроса к модели и создание словаря контекста."""
-    author = get_object_or_404(User, username=username)
+    author = user_or_404(username)
+    if is_hidden(Deletion.USER, author.id):
+        raise Http404
+    followers_count, following_count = follow_counts(author)
     following = (
         request.user.is_authenticated
         and Follow.objects.filter(
             user=request.user, author=author
         ).exists()
     )
-    post_list = author.post.all()
+    post_list = ArchiveFeed(
+        author.post.select_related('group'), author_id=author.id
+    )
     context = {
         'page_obj': custom_paginator(request, post_list),
         'author': author,
         'following': following,
+        'followers_count': followers_count,
+        'following_count': following_count,
     }
+    if request.user == author:
+        context['suggestions'] = suggestions_for(request.user)
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(8)
+def site_feed(request, fmt):
+    return feed_response(
+        request, fmt, 'site', Post.objects.all(),
+        'Последние посты', reverse('posts:index'),
+    )
+
+
+@query_budget(8)
+def group_feed(request, slug, fmt):
+    group = group_or_404(slug)
+    if is_hidden(Deletion.GROUP, group.id):
+        raise Http404
+    return feed_response(
+        request, fmt, f'group:{group.id}', group.post.all(),
+        f'Посты группы {group.title}',
+        reverse('posts:group_post', args=[slug]),
+    )
+
+
+@query_budget(8)
+def profile_feed(request, username, fmt):
+    author = user_or_404(username)
+    if is_hidden(Deletion.USER, author.id):
+        raise Http404
+    return feed_response(
+        request, fmt, f'author:{author.id}', author.post.all(),
+        f'Посты пользователя {author.username}',
+        reverse('posts:profile', args=[username]),
+    )
+
+
+def follow_list(request, username, followers):
+    """Подписчики или подписки пользователя постранично."""
+    author = user_or_404(username)
+    if is_hidden(Deletion.USER, author.id):
+        raise Http404
+    followers_count, following_count = follow_counts(author)
+    if followers:
+        ids = Follow.objects.filter(author=author).values_list(
+            'user_id', flat=True
+        )
+        count = followers_count
+    else:
+        ids = Follow.objects.filter(user=author).values_list(
+            'author_id', flat=True
+        )
+        count = following_count
+    page_obj = custom_paginator(request, ids.order_by('-id'), count)
+    # Пользователи страницы - одним запросом, в порядке подписки
+    page_ids = list(page_obj.object_list)
+    users = User.objects.in_bulk(page_ids)
+    page_obj.object_list = [users[pk] for pk in page_ids if pk in users]
+    context = {
+        'page_obj': page_obj,
+        'author': author,
+        'followers': followers,
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+@query_budget(4)
+def follower_list(request, username):
+    return follow_list(request, username, followers=True)
+
+
+@query_budget(4)
+def following_list(request, username):
+    return follow_list(request, username, followers=False)
+
+
+@query_budget(10)
 def post_detail(request, post_id):
     """Здесь код запроса к модели и создание словаря контекста."""
-    post = get_object_or_404(Post, id=post_id)
-    comment_list = post.comments.all()
+    if is_hidden(Deletion.POST, post_id):
+        raise Http404
+    post = Post.objects.filter(id=post_id).first()
+    if post is not None:
+        comment_list = post.comments.select_related('author')
+    else:
+        # Старые посты переехали в архив и доступны только для чтения
+        post = get_archived(post_id)
+        if post is None:
+            raise Http404
+        comment_list = post.comment_list()
+    if is_hidden(Deletion.USER, post.author_id):
+        raise Http404
     form = CommentForm(
         request.POST or None,
     )
@@ -69,14 +245,24 @@ def post_detail(request, post_id):
         'post': post,
         'CommentForm': form,
         'comment_list': comment_list,
+        'archived': getattr(post, 'archived', False),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(8)
 @login_required
+@ratelimit('20/m')
 def add_comment(request, post_id):
     # Получите пост и сохраните его в переменную post.
     post = get_object_or_404(Post, id=post_id)
+    # Пока пост, автор или группа удаляются, новые комментарии не нужны
+    if (
+        is_hidden(Deletion.POST, post.id)
+        or is_hidden(Deletion.USER, post.author_id)
+        or is_hidden(Deletion.GROUP, post.group_id)
+    ):
+        raise Http404
     form = CommentForm(
         request.POST or None,
         files=request.FILES or None,
@@ -89,7 +275,9 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(10)
 @login_required
+@ratelimit('10/m')
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -99,10 +287,14 @@ def post_create(request):
         new_post = form.save(commit=False)
         new_post.author = request.user
         new_post.save()
+        publish_post(new_post)
+        if new_post.image:
+            enqueue('posts.warm_thumbnail', {'post_id': new_post.id})
         return redirect('posts:profile', username=new_post.author)
     return render(request, 'posts/create_post.html', {'form': form})
 
 
+@query_budget(15)
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -123,37 +315,93 @@ def post_edit(request, post_id):
     # эту логику
     if request.method == 'POST':
         if form.is_valid():
-            form.save()
+            post = form.save()
+            if 'image' in form.changed_data and post.image:
+                enqueue('posts.warm_thumbnail', {'post_id': post.id})
             return redirect('posts:post_detail', post_id=post_id)
         return render(request, 'posts/create_post.html', context)
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(7)
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = visible_posts(
+        Post.objects.filter(
+            author__following__user=request.user
+        ).select_related('author', 'group')
+    )
+    page_obj = custom_paginator(request, post_list)
     context = {
-        'page_obj': custom_paginator(request, post_list),
+        'page_obj': page_obj,
         'follow': True,
+        'suggestions': suggestions_for(request.user),
     }
+    if not page_obj.has_previous():
+        # Новые посты ждет только первая страница, начиная с самого
+        # нового на ней: дальние страницы показывают старые посты
+        context['stream_url'] = STREAM_PATH
+        context['stream_last_id'] = max(
+            (post.id for post in page_obj), default=0
+        )
     return render(request, 'posts/follow.html', context)
 
 
+@query_budget(18)
 @login_required
+@ratelimit('60/m', methods=None)
 def profile_follow(request, username):
     # Подписаться на автора
-    author = get_object_or_404(User, username=username)
+    author = user_or_404(username)
     if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        with transaction.atomic():
+            _, created = Follow.objects.get_or_create(
+                user=request.user, author=author
+            )
+            if created:
+                change_follow_counters(request.user.id, author.id, 1)
+                FollowSuggestion.objects.filter(
+                    user=request.user, author=author
+                ).delete()
     return redirect('posts:index')
 
 
+@query_budget(18)
 @login_required
 def profile_unfollow(request, username):
     # Дизлайк, отписка
     follow = get_object_or_404(
         Follow,
         user=request.user,
-        author__username=username)
-    follow.delete()
+        author=user_or_404(username))
+    with transaction.atomic():
+        # Параллельная отписка могла уже удалить строку
+        deleted, _ = Follow.objects.filter(id=follow.id).delete()
+        if deleted:
+            change_follow_counters(follow.user_id, follow.author_id, -1)
     return redirect('posts:profile', username)
+
+
+@query_budget(6)
+@login_required
+@ratelimit('5/h')
+def export_data(request):
+    """Выгрузка личных данных: архив собирает фоновая задача."""
+    if request.method == 'POST':
+        request_export(request.user)
+        return redirect('posts:export_data')
+    context = {
+        'exports': DataExport.objects.filter(user=request.user),
+    }
+    return render(request, 'posts/export.html', context)
+
+
+@query_budget(3)
+@login_required
+def export_download(request, export_id):
+    export = get_object_or_404(
+        DataExport, id=export_id, user=request.user, status=DataExport.READY
+    )
+    return file_response(
+        request, export_path(export), 'application/zip', export.filename
+    )
@@ -1,3 +1,16 @@
-# from django.contrib import admin
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
 
-# Register your models here.
+from posts.admin import BackgroundDeletionMixin
+
+User = get_user_model()
+
+
+class YatubeUserAdmin(BackgroundDeletionMixin, UserAdmin):
+    pass
+
+
+# Стандартную регистрацию из django.contrib.auth заменяем своей
+admin.site.unregister(User)
+admin.site.register(User, YatubeUserAdmin)
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.checks import Error
+
+from core.caches import is_shared
+
+
+def check_user_cache(app_configs, **kwargs):
+    """Кэш пользователя с локальным кэшем пропустил бы выход из аккаунта
+    и смену пароля в других воркерах."""
+    if getattr(settings, 'USER_CACHE', False) and not is_shared():
+        return [Error(
+            'USER_CACHE требует общий для воркеров кэш (memcached).',
+            hint='Задайте YATUBE_CACHE_LOCATION или выключите USER_CACHE.',
+            id='users.E001',
+        )]
+    return []
@@ -1,3 +1,60 @@
-# from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
 
-# Create your tests here.
+from .checks import check_user_cache
+from .middleware import user_cache_key
+
+User = get_user_model()
+
+
+# В тестах один процесс, поэтому LocMemCache общий для всех запросов
+@override_settings(
+    USER_CACHE=True,
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+)
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='auth', password='old-pass-1234'
+        )
+        self.client = Client()
+        self.client.login(username='auth', password='old-pass-1234')
+
+    def test_repeated_request_does_not_query_user(self):
+        """Сессия и пользователь берутся из кэша."""
+        self.client.get('/about/author/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/about/author/')
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_password_change_invalidates_cached_user(self):
+        """После смены пароля старая сессия другого клиента недействительна."""
+        self.client.get('/about/author/')
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+        other = Client()
+        other.login(username='auth', password='old-pass-1234')
+        other.post('/auth/password_change/', {
+            'old_password': 'old-pass-1234',
+            'new_password1': 'new-pass-5678',
+            'new_password2': 'new-pass-5678',
+        })
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        response = self.client.get('/about/author/')
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_logout_drops_cached_user(self):
+        """Выход из аккаунта удаляет пользователя из кэша."""
+        self.client.get('/about/author/')
+        self.client.get('/auth/logout/')
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        response = self.client.get('/about/author/')
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_local_cache_refused(self):
+        """С LocMemCache кэш пользователя не проходит проверку."""
+        errors = check_user_cache(None)
+        self.assertEqual([error.id for error in errors], ['users.E001'])
+        with self.settings(USER_CACHE=False):
+            self.assertEqual(check_user_cache(None), [])
@@ -0,0 +1,145 @@
+"""ASGI-точка входа.
+
+Django 2.2 не умеет асинхронные представления, поэтому обычные запросы
+выполняются WSGI-обработчиком в ограниченном пуле потоков, а цикл asyncio
+держит соединения: поток SSE и медленные клиенты не занимают поток.
+"""
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+django_application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+from posts import sse  # noqa: E402
+
+executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ASGI_THREADS', 8),
+    thread_name_prefix='django',
+)
+
+
+def build_environ(scope, body):
+    """WSGI environ из ASGI scope."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('127.0.0.1', 0)
+    environ = {
+        'REQUEST_METHOD': scope.get('method', 'GET'),
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI требует путь в виде latin-1 строки из байтов utf-8
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+            environ[name] = value
+            continue
+        key = 'HTTP_' + name
+        if key in environ:
+            value = environ[key] + ',' + value
+        environ[key] = value
+    return environ
+
+
+def run_django(environ):
+    """Вызов Django в потоке пула.
+
+    Обычный ответ собирается здесь же целиком и закрывается в том же
+    потоке, потоковый отдается итератором.
+    """
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in headers
+        ]
+
+    response = django_application(environ, start_response)
+    if getattr(response, 'streaming', False):
+        return started, response, None
+    try:
+        return started, None, b''.join(response)
+    finally:
+        response.close()
+
+
+async def read_body(receive):
+    body = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        body.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            return b''.join(body)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    if scope['path'] == sse.STREAM_PATH:
+        return await sse.application(scope, receive, send)
+
+    body = await read_body(receive)
+    if body is None:
+        return
+    loop = asyncio.get_event_loop()
+    started, stream, content = await loop.run_in_executor(
+        executor, run_django, build_environ(scope, body)
+    )
+    await send({
+        'type': 'http.response.start',
+        'status': started['status'],
+        'headers': started['headers'],
+    })
+    if stream is None:
+        await send({'type': 'http.response.body', 'body': content})
+        return
+    chunks = iter(stream)
+    try:
+        while True:
+            chunk = await loop.run_in_executor(executor, next, chunks, None)
+            if chunk is None:
+                break
+            await send({
+                'type': 'http.response.body',
+                'body': chunk,
+                'more_body': True,
+            })
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        await loop.run_in_executor(executor, stream.close)
@@ -31,6 +31,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'jobs.apps.JobsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -42,12 +43,21 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.compression.CompressionMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
+    # Выше снимков и общего кэша страниц: их готовые ответы не проходят
+    # через middleware ниже, а заголовок против clickjacking нужен всем
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.snapshots.SnapshotMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.CachedAuthenticationMiddleware',
+    'core.middleware.page_cache.SharedPageCacheMiddleware',
+    'core.middleware.profiling.ProfilingMiddleware',
+    'core.middleware.template_timing.TemplateTimingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.query_budget.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -76,6 +86,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Размер пула потоков, в котором yatube.asgi выполняет Django
+ASGI_THREADS = 8
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -132,13 +145,83 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-#  подключаем движок filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# письма уходят в очередь задач, run_workers отправляет их
+# через движок filebased.EmailBackend
+EMAIL_BACKEND = 'jobs.mail.QueuedEmailBackend'
+JOBS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Общий кэш воркеров: адреса memcached через запятую. Без него у каждого
+# процесса свой LocMemCache, и сброс ключа в одном не виден остальным
+CACHE_LOCATION = os.environ.get('YATUBE_CACHE_LOCATION')
+if CACHE_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': CACHE_LOCATION.split(','),
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Сессии и пользователь из кэша (users.middleware) - только с общим
+# кэшем: выход и смена пароля должны доходить до всех воркеров
+USER_CACHE = bool(CACHE_LOCATION)
+if USER_CACHE:
+    # Сессии читаются из кэша, запись идет и в кэш, и в базу
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Сжатие ответов: меньше этого размера (в байтах) ответ не сжимается
+COMPRESSION_MIN_SIZE = 500
+
+# Ограничение частоты запросов на запись (core.ratelimit)
+RATELIMIT_ENABLE = True
+
+# Сэмплирующий профайлер: доля профилируемых запросов (0 - выключен,
+# запрос сотрудника с заголовком X-Profile профилируется всегда)
+PROFILING_SAMPLE_RATE = 0
+PROFILING_INTERVAL = 0.005
+
+# Замер времени отрисовки шаблонов (заголовок Server-Timing); значение
+# по умолчанию, на лету переключается POST-запросом на /metrics/template-timing/
+TEMPLATE_TIMING = False
+
+# Посты старше стольких дней команда archive_posts переносит в архив
+POSTS_ARCHIVE_AFTER_DAYS = 365
+
+# Выгрузки личных данных (posts.export): закрытый каталог вне MEDIA_ROOT
+# и срок хранения готового архива, секунд
+EXPORT_ROOT = os.path.join(BASE_DIR, 'exports')
+EXPORT_TTL = 7 * 24 * 60 * 60
+
+# Отдача media (core.media): None - сам Django, 'x-accel' - nginx
+# (X-Accel-Redirect на internal-локацию MEDIA_ACCEL_PREFIX с alias на
+# MEDIA_ROOT), 'x-sendfile' - Apache/lighttpd
+MEDIA_ACCEL = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Статические снимки страниц для анонимов (core.snapshots); в разработке
+# выключены, чтобы правки шаблонов были видны сразу
+STATIC_SNAPSHOTS = not DEBUG
+SNAPSHOT_ROOT = os.path.join(BASE_DIR, 'snapshots')
+
+# Общий кэш страниц для вошедших с шапкой, отрисованной отдельно
+# (core.page_cache); в разработке выключен, как и снимки
+SHARED_PAGE_CACHE = not DEBUG
+SHARED_PAGE_CACHE_TIMEOUT = 20
+
+# Бюджет запросов представлений (core.query_budget): превышение и N+1 -
+# предупреждение в лог, в строгом режиме (тесты) - исключение
+QUERY_BUDGET_STRICT = False
+N_PLUS_ONE_THRESHOLD = 3
+
+# Кэш поиска группы по slug и пользователя по username (posts.lookups):
+# найденная строка и отметка промаха, секунд. Без общего кэша сброс
+# ключа не виден другим воркерам, поэтому строка живет недолго
+LOOKUP_TIMEOUT = 15 * 60 if CACHE_LOCATION else 30
+LOOKUP_MISS_TIMEOUT = 30